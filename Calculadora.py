@@ -1,8 +1,33 @@
 import streamlit as st
 import pandas as pd
-import io 
+import numpy as np
 import json 
-import time
+import os
+import io
+import copy
+
+from precificacao import (
+    termos_componente,
+    percentuais_taxas,
+    calcular_custo_total_materiais,
+    calcular_insumos_unitarios,
+    formatar_brl,
+)
+from cache_precificacao import calcular_lucro_real_cache, calcular_preco_sugerido_cache
+from catalogo_insumos import CatalogoInsumos, OPCAO_MANUAL
+from grafo_calculo import GrafoCalculo, congelar
+from tabela_colunar import tabela_insumos, tabela_materiais
+from precificacao_lote import curva_lucro, formatar_colunas_brl, variar_comissao
+from backup_binario import criar_backup_binario
+from cache_precificacao import cache_precificacao
+import instrumentacao
+from exportacao import criar_backup_json, ler_backup, convert_data_to_csv
+from banco_local import BancoLocal, ConflitoGravacao, ESPACO_PADRAO, PARTE_INSUMOS, parte_configuracao, parte_materiais
+from cenarios import avaliar_cenarios
+from preco_otimo import DemandaElasticidade, otimizar_precos
+from importacao_precos import CAMPOS, QTD_PACOTE_MINIMA, atualizar_materiais, colunas_lista_precos, detectar_mapeamento, importar_lista_precos, ler_lista_precos
+from reprecificar import reprecificar_csv
+from tarefas import CANCELADA, CONCLUIDA, RegistroTarefas
 
 # --- Configurações Iniciais e Session State ---
 st.set_page_config(
@@ -11,15 +36,61 @@ st.set_page_config(
     layout="wide" 
 )
 
-# Inicializa o Session State.
+# Instrumentação opcional (CALC_INSTRUMENTACAO=1): tempos por fase e contadores do processo
+instrumentacao.iniciar_rerun()
+if instrumentacao.ativo():
+    instrumentacao.registrar_coletor('cache_precificacao', cache_precificacao.estatisticas)
+    instrumentacao.iniciar_servidor_metricas()
+
+# Armazenamento local (SQLite), opcional: CALC_BANCO=<arquivo> liga (por padrão cada sessão só usa a memória).
+# Uma conexão por processo, reaproveitada entre reruns e sessões; ?espaco=<nome> na URL separa os dados de
+# cada loja/usuário. Sessões no mesmo espaço não se sobrescrevem: a gravação confere a versão lida (ver banco_local.py).
+@st.cache_resource
+def obter_banco():
+    caminho = os.environ.get('CALC_BANCO', '')
+    return BancoLocal(caminho) if caminho else None
+
+banco = obter_banco()
+espaco = st.query_params.get('espaco', ESPACO_PADRAO)
+
+# Tarefas em segundo plano (restauração, importação, reprecificação): um pool de threads por processo.
+@st.cache_resource
+def obter_registro_tarefas():
+    return RegistroTarefas()
+
+registro_tarefas = obter_registro_tarefas()
+
+# Partes do session state gravadas no armazenamento local
+PARTES_BANCO = {
+    'insumos_base': PARTE_INSUMOS,
+    'materiais_produto': parte_materiais(),
+    'custos_venda': parte_configuracao('custos_venda'),
+}
+
+# Inicializa o Session State (insumos e materiais em tabelas colunares; ver tabela_colunar.py).
+# Cada parte vem do banco só na primeira vez que a sessão precisa dela; sem dados salvos, usa os exemplos.
+# A versão lida fica em `versoes_banco`: é ela que a gravação confere no fim do rerun.
+def carregar_do_banco(chave, carregar):
+    if banco is None:
+        return None
+    valor, versao = banco.carregar_com_versao(carregar, PARTES_BANCO[chave], espaco)
+    st.session_state.setdefault('versoes_banco', {})[PARTES_BANCO[chave]] = versao
+    if valor is not None:
+        st.session_state.setdefault('carregados_do_banco', set()).add(chave)
+    return valor
+
 if 'insumos_base' not in st.session_state:
-    st.session_state.insumos_base = [{'nome': 'Ex: Papel Pacote', 'valor_pacote': 27.50, 'qtd_pacote': 50.0, 'unidade': 'UN'}]
+    st.session_state.insumos_base = carregar_do_banco('insumos_base', banco and banco.carregar_insumos) or tabela_insumos(
+        [{'nome': 'Ex: Papel Pacote', 'valor_pacote': 27.50, 'qtd_pacote': 50.0, 'unidade': 'UN'}]
+    )
 
 if 'materiais_produto' not in st.session_state:
-    st.session_state.materiais_produto = [{'nome': 'Ex: Material A', 'custo_unidade': 0.00, 'qtd_usada': 1.0}]
+    st.session_state.materiais_produto = carregar_do_banco('materiais_produto', banco and banco.carregar_materiais) or tabela_materiais(
+        [{'nome': 'Ex: Material A', 'custo_unidade': 0.00, 'qtd_usada': 1.0}]
+    )
 
-if 'custos_venda' not in st.session_state or 'custo_fixo_mo_embalagem' not in st.session_state.custos_venda:
-    st.session_state.custos_venda = {
+def custos_venda_padrao():
+    return {
         'custo_fixo_mo_embalagem': 0.00,
         'preco_venda': 100.00, # Valor padrão para MOCK
         'taxa_imposto': 0.0, 
@@ -30,18 +101,42 @@ if 'custos_venda' not in st.session_state or 'custo_fixo_mo_embalagem' not in st
         'custo_frete': {'tipo': 'fixo', 'valor': 15.00}
     }
 
+def completar_custos_venda(custos):
+    """Custos de venda salvos ou restaurados, com os campos ausentes (backups antigos/parciais) vindos do padrão."""
+    completos = custos_venda_padrao()
+    for chave, valor in (custos or {}).items():
+        if isinstance(completos.get(chave), dict) and isinstance(valor, dict):
+            completos[chave] = {**completos[chave], **valor}
+        else:
+            completos[chave] = valor
+    return completos
+
+if 'custos_venda' not in st.session_state:
+    st.session_state.custos_venda = completar_custos_venda(
+        carregar_do_banco('custos_venda', banco and (lambda e: banco.carregar_configuracao('custos_venda', e)))
+    )
+
 # --- Funções de Manipulação do Session State ---
 
+def obter_catalogo_insumos():
+    """Retorna o catálogo indexado de insumos, recriando-o só se a lista base foi trocada (ex.: restauração)."""
+    catalogo = st.session_state.get('catalogo_insumos')
+    if catalogo is None or catalogo.insumos is not st.session_state.insumos_base:
+        catalogo = CatalogoInsumos(st.session_state.insumos_base)
+        st.session_state.catalogo_insumos = catalogo
+    return catalogo
+
 def adicionar_insumo():
     """Adiciona um novo insumo base (pacote/unidade)"""
-    st.session_state.insumos_base.append({'nome': '', 'valor_pacote': 0.00, 'qtd_pacote': 1.0, 'unidade': 'UN'})
+    obter_catalogo_insumos().adicionar({'nome': '', 'valor_pacote': 0.00, 'qtd_pacote': 1.0, 'unidade': 'UN'})
 
 def remover_ultimo_insumo():
     """Remove o último insumo base adicionado."""
-    if len(st.session_state.insumos_base) > 1:
-        st.session_state.insumos_base.pop()
-    elif len(st.session_state.insumos_base) == 1:
-        st.session_state.insumos_base[0] = {'nome': 'Ex: Papel Pacote', 'valor_pacote': 0.00, 'qtd_pacote': 1.0, 'unidade': 'UN'}
+    catalogo = obter_catalogo_insumos()
+    if len(catalogo) > 1:
+        catalogo.remover_ultimo()
+    elif len(catalogo) == 1:
+        catalogo.substituir(0, {'nome': 'Ex: Papel Pacote', 'valor_pacote': 0.00, 'qtd_pacote': 1.0, 'unidade': 'UN'})
 
 def adicionar_material_produto():
     """Adiciona um item à lista de materiais usados na montagem do produto."""
@@ -54,200 +149,425 @@ def remover_ultimo_material_produto():
     elif len(st.session_state.materiais_produto) == 1:
         st.session_state.materiais_produto[0] = {'nome': 'Ex: Material A', 'custo_unidade': 0.00, 'qtd_usada': 1.0}
 
+# Prefixos das chaves dos widgets ligados a cada parte dos dados
+WIDGETS_INSUMOS = ('insumo_nome_', 'insumo_pacote_', 'insumo_qtd_', 'insumo_unidade_')
+WIDGETS_MATERIAIS = ('material_sel_', 'material_nome_', 'material_custo_', 'material_qtd_')
+WIDGETS_CUSTOS_VENDA = ('custo_fixo_mo_embalagem_input', 'taxa_imposto_input', 'taxa_comissao_', 'taxa_por_item_', 'custo_frete_')
+
+def descartar_widgets(prefixos):
+    """Os widgets guardam o valor antigo: descarta o estado deles para exibirem os dados novos."""
+    for chave in [c for c in st.session_state if str(c).startswith(prefixos)]:
+        del st.session_state[chave]
+
+def recarregar_do_banco():
+    """Conflito de gravação: descarta as edições da sessão e relê o que está salvo."""
+    for chave in ('insumos_base', 'materiais_produto', 'custos_venda', 'catalogo_insumos',
+                  'versoes_banco', 'versoes_salvas', 'carregados_do_banco', 'conflito_banco'):
+        st.session_state.pop(chave, None)
+    descartar_widgets(WIDGETS_INSUMOS + WIDGETS_MATERIAIS + WIDGETS_CUSTOS_VENDA)
+
+def sobrescrever_banco():
+    """Conflito de gravação: mantém as edições da sessão e grava por cima da outra versão."""
+    st.session_state.versoes_banco.update(st.session_state.pop('conflito_banco', {}))
+
+def importar_precos_fornecedor(arquivo, mapeamento):
+    """Agenda a importação da lista de preços; o upsert roda numa cópia do catálogo, em segundo plano."""
+    st.session_state.pop('resumo_importacao', None)
+    iniciar_tarefa(
+        'importacao', f"Importar {arquivo.name}", _tarefa_importacao,
+        io.BytesIO(arquivo.getvalue()), arquivo.name, mapeamento, copiar_insumos(st.session_state.insumos_base)
+    )
 
-# --- Funções de Backup e Restauração ---
 
-def criar_backup_json():
-    """Compila os dados importantes do session state em uma string JSON."""
-    backup_data = {
-        'insumos_base': st.session_state.insumos_base,
-        'materiais_produto': st.session_state.materiais_produto,
-        'custos_venda': st.session_state.custos_venda
-    }
-    # Retorna o JSON formatado em string
-    return json.dumps(backup_data, indent=4)
+# --- Cenários (Aba 5) ---
+
+COLUNAS_CENARIOS = ['Cenário', 'Comissão (%)', 'Taxa por Item (+R$)', 'Frete (+R$)', 'Imposto (%)', 'Custo Fixo (R$)', 'Insumo', 'Novo Valor do Pacote (R$)']
+
+def cenarios_da_tabela(tabela, custos_venda):
+    """Converte as linhas do editor da Aba 5 em cenários (células vazias mantêm o valor atual)."""
+    cenarios = []
+    for linha in tabela.to_dict('records'):
+        if pd.isna(linha.get('Cenário')) or not str(linha['Cenário']).strip():
+            continue
+        sobreposicoes = {}
+        if pd.notna(linha.get('Comissão (%)')):
+            sobreposicoes['taxa_comissao'] = {'tipo': 'percentual', 'valor': float(linha['Comissão (%)'])}
+        # Acréscimos em R$ somam um termo fixo ao componente atual (modelo afim)
+        for coluna, componente in (('Taxa por Item (+R$)', 'taxa_por_item'), ('Frete (+R$)', 'custo_frete')):
+            if pd.notna(linha.get(coluna)):
+                percentual, fixo = termos_componente(custos_venda[componente])
+                sobreposicoes[componente] = {'percentual': percentual, 'fixo': fixo + float(linha[coluna])}
+        if pd.notna(linha.get('Imposto (%)')):
+            sobreposicoes['taxa_imposto'] = float(linha['Imposto (%)'])
+        if pd.notna(linha.get('Custo Fixo (R$)')):
+            sobreposicoes['custo_fixo_mo_embalagem'] = float(linha['Custo Fixo (R$)'])
+        precos_insumos = {}
+        if pd.notna(linha.get('Insumo')) and pd.notna(linha.get('Novo Valor do Pacote (R$)')):
+            precos_insumos[linha['Insumo']] = float(linha['Novo Valor do Pacote (R$)'])
+        cenarios.append({'nome': str(linha['Cenário']).strip(), 'custos_venda': sobreposicoes, 'precos_insumos': precos_insumos})
+    return cenarios
+
+def lista_materiais_produto(catalogo, materiais):
+    """Materiais do produto em triplas (produto, insumo, qtd) + custo dos itens manuais."""
+    bom_insumo, bom_qtd, custo_manual = [], [], 0.0
+    for material in materiais.para_dicts():
+        i = catalogo.posicao(material['nome'])
+        if i is None:
+            custo_manual += material['custo_unidade'] * material['qtd_usada']
+        else:
+            bom_insumo.append(i)
+            bom_qtd.append(material['qtd_usada'])
+    return np.zeros(len(bom_insumo), dtype=np.int64), bom_insumo, bom_qtd, custo_manual
+
+
+# --- Paginação dos Editores da Aba 2 ---
+
+TAMANHO_PAGINA = 25
+
+def linhas_visiveis(tabela, chave):
+    """Busca por nome + seletor de página. Retorna só as posições da página atual.
+
+    Apenas essas linhas ganham widgets; as demais continuam intactas na tabela.
+    """
+    col_busca, col_pagina, col_info = st.columns([2, 1, 1.5])
+    with col_busca:
+        termo = st.text_input("🔎 Buscar por nome", key=f"busca_{chave}")
+    indices = tabela.buscar('nome', termo) if termo else range(len(tabela))
+
+    total_paginas = max(1, -(-len(indices) // TAMANHO_PAGINA))
+    with col_pagina:
+        pagina = st.number_input("Página", min_value=1, max_value=total_paginas, value=1, step=1, key=f"pagina_{chave}")
+    inicio = (min(pagina, total_paginas) - 1) * TAMANHO_PAGINA
+    visiveis = [int(i) for i in indices[inicio:inicio + TAMANHO_PAGINA]]
+    with col_info:
+        if visiveis:
+            st.caption(f"Mostrando {inicio + 1}–{inicio + len(visiveis)} de {len(indices)} (página {pagina}/{total_paginas})")
+        else:
+            st.caption("Nenhum item encontrado.")
+    return visiveis
+
+
+# --- Funções de Backup e Restauração ---
 
 def restaurar_estado(uploaded_file):
-    """Lê o arquivo JSON e atualiza o session state."""
+    """Agenda a leitura do backup (JSON ou binário); o session state é atualizado quando ela termina."""
     if uploaded_file is not None:
-        try:
-            # Lê o conteúdo do arquivo
-            file_content = uploaded_file.getvalue().decode("utf-8")
-            data = json.loads(file_content)
-            
-            # Atualiza o Session State com os dados do arquivo
-            st.session_state.insumos_base = data.get('insumos_base', [])
-            st.session_state.materiais_produto = data.get('materiais_produto', [])
-            st.session_state.custos_venda = data.get('custos_venda', {})
-            
-            # Confirmação visual antes do rerun
-            with st.spinner("Restaurando configurações..."):
-                time.sleep(1) 
+        st.session_state.pop('aviso_restauracao', None)
+        iniciar_tarefa('restauracao', f"Restaurar {uploaded_file.name}", _tarefa_restauracao, io.BytesIO(uploaded_file.getvalue()))
+
+def reprecificar_catalogo(arquivo, separador, exato):
+    """Agenda a reprecificação do CSV de produtos com os insumos e taxas atuais."""
+    st.session_state.pop('aviso_reprecificacao', None)
+    st.session_state.pop('resultado_reprecificacao', None)
+    iniciar_tarefa(
+        'reprecificacao', f"Reprecificar {arquivo.name}", _tarefa_reprecificacao,
+        io.BytesIO(arquivo.getvalue()), separador, exato,
+        copiar_insumos(st.session_state.insumos_base),
+        copy.deepcopy(st.session_state.custos_venda),
+        st.session_state.get('lucro_fixo_desejado'),
+    )
 
-            st.success("✅ Configurações restauradas com sucesso! Recarregando a aplicação...")
-            # Força o reran para atualizar a tela com os novos dados
-            st.experimental_rerun()
-            
-        except json.JSONDecodeError:
-            st.error("❌ Erro ao ler o arquivo. Certifique-se de que é um arquivo JSON válido gerado pela calculadora.")
-        except Exception as e:
-            st.error(f"❌ Ocorreu um erro ao restaurar os dados: {e}")
 
+# --- Tarefas em Segundo Plano (ver tarefas.py) ---
+# As funções `_tarefa_*` rodam fora da thread do script: recebem cópias, não tocam no
+# session state e devolvem o resultado. `processar_tarefas` o aplica no rerun seguinte.
+
+INTERVALO_TAREFAS = 1.0  # segundos entre atualizações do painel de progresso
+
+def copiar_insumos(insumos):
+    """Cópia independente da tabela de insumos (a sessão pode seguir editando a original)."""
+    copia = tabela_insumos()
+    colunas, strings = insumos.exportar_colunas()
+    copia.importar_colunas(colunas, strings, insumos.categorias())
+    return copia
+
+def iniciar_tarefa(tipo, nome, funcao, *args):
+    tarefa = registro_tarefas.submeter(nome, funcao, *args)
+    st.session_state.setdefault('tarefas', {})[tarefa.id] = tipo
+    return tarefa
+
+def _tarefa_restauracao(tarefa, conteudo):
+    tarefa.progresso(0, 1, "Lendo o backup...")
+    data = ler_backup(conteudo)
+    tarefa.progresso(1, 1, "Backup lido.")
+    return data
+
+def _tarefa_importacao(tarefa, conteudo, nome_arquivo, mapeamento, insumos):
+    tamanho = len(conteudo.getbuffer())
+    catalogo = CatalogoInsumos(insumos)
+    resumo = importar_lista_precos(
+        catalogo,
+        ler_lista_precos(conteudo, mapeamento, nome_arquivo=nome_arquivo),
+        progresso=lambda linhas: tarefa.progresso(conteudo.tell(), tamanho, f"{linhas} linhas lidas"),
+    )
+    # Só as linhas que a importação mudou: a sessão pode ter editado o catálogo enquanto isso
+    linhas = [dict(insumos[catalogo.posicao(nome)]) for nome in resumo['insumos_alterados']]
+    return linhas, resumo
+
+def _tarefa_reprecificacao(tarefa, conteudo, separador, exato, insumos, custos_venda, lucro_padrao):
+    tamanho = len(conteudo.getbuffer())
+    saida = io.StringIO()
+    total = reprecificar_csv(
+        conteudo, saida,
+        custos_venda=custos_venda,
+        insumos_unitarios=calcular_insumos_unitarios(insumos),
+        lucro_padrao=lucro_padrao,
+        tamanho_bloco=10_000,
+        sep_entrada=separador,
+        decimal_entrada=',' if separador == ';' else '.',
+        exato=exato,
+        progresso=lambda linhas: tarefa.progresso(conteudo.tell(), tamanho, f"{linhas} produtos reprecificados"),
+    )
+    return total, saida.getvalue().encode('utf-8')
+
+def _aplicar_restauracao(data):
+    st.session_state.insumos_base = data['insumos_base']
+    st.session_state.materiais_produto = data['materiais_produto']
+    # Aplicado depois da inicialização do topo do script: completa aqui o que faltar no backup
+    st.session_state.custos_venda = completar_custos_venda(data['custos_venda'])
+    descartar_widgets(WIDGETS_INSUMOS + WIDGETS_MATERIAIS + WIDGETS_CUSTOS_VENDA)
+    return "✅ Configurações restauradas com sucesso!"
+
+def _aplicar_importacao(resultado):
+    """Upsert, por nome, só das linhas importadas no catálogo atual (preserva o que foi editado durante a tarefa)."""
+    linhas, resumo = resultado
+    catalogo = obter_catalogo_insumos()
+    for insumo in linhas:
+        i = catalogo.posicao(insumo['nome'])
+        if i is None:
+            catalogo.adicionar(insumo)
+        else:
+            catalogo.atualizar(i, valor_pacote=insumo['valor_pacote'], qtd_pacote=insumo['qtd_pacote'], unidade=insumo['unidade'])
+    atualizados = atualizar_materiais(st.session_state.materiais_produto, catalogo, resumo['insumos_alterados'])
+    descartar_widgets(WIDGETS_INSUMOS)
+    return (
+        f"✅ {resumo['novos']} insumos novos, {resumo['alterados']} atualizados, "
+        f"{resumo['sem_mudanca']} sem mudança, {resumo['invalidas']} linhas ignoradas. "
+        f"{len(atualizados)} materiais do produto recalculados."
+    )
 
-# --- Função de Cálculo Principal (Direto) ---
+def _aplicar_reprecificacao(resultado):
+    total, csv_bytes = resultado
+    st.session_state.resultado_reprecificacao = csv_bytes
+    return f"✅ {total} produtos reprecificados."
+
+# tipo -> (aplica o resultado e devolve a mensagem, chave do aviso no session state, texto do erro)
+TIPOS_TAREFA = {
+    'restauracao': (_aplicar_restauracao, 'aviso_restauracao', "Ocorreu um erro ao restaurar os dados"),
+    'importacao': (_aplicar_importacao, 'resumo_importacao', "Não foi possível importar a lista"),
+    'reprecificacao': (_aplicar_reprecificacao, 'aviso_reprecificacao', "Não foi possível reprecificar o arquivo"),
+}
+
+def processar_tarefas():
+    """Aplica ao session state o resultado das tarefas da sessão que terminaram desde o último rerun."""
+    tarefas = st.session_state.get('tarefas', {})
+    for id_tarefa, tipo in list(tarefas.items()):
+        tarefa = registro_tarefas.obter(id_tarefa)
+        if tarefa is not None and not tarefa.finalizada:
+            continue
+        del tarefas[id_tarefa]
+        if tarefa is None:
+            continue
+        registro_tarefas.esquecer(id_tarefa)
+        aplicar, chave_aviso, texto_erro = TIPOS_TAREFA[tipo]
+        if tarefa.estado == CONCLUIDA:
+            with instrumentacao.fase(f'aplicar_{tipo}'):
+                st.session_state[chave_aviso] = ('ok', aplicar(tarefa.resultado))
+        elif tarefa.estado == CANCELADA:
+            st.session_state[chave_aviso] = ('aviso', f"⏹️ {tarefa.nome}: cancelado, nada foi alterado.")
+        elif tipo == 'restauracao' and isinstance(tarefa.erro, (json.JSONDecodeError, UnicodeDecodeError)):
+            st.session_state[chave_aviso] = ('erro', "❌ Erro ao ler o arquivo. Certifique-se de que é um arquivo JSON válido gerado pela calculadora.")
+        else:
+            st.session_state[chave_aviso] = ('erro', f"❌ {texto_erro}: {tarefa.erro}")
+
+def mostrar_aviso(chave):
+    """Mostra o aviso guardado em `chave` por `processar_tarefas`."""
+    if chave in st.session_state:
+        status, mensagem = st.session_state[chave]
+        {'ok': st.success, 'aviso': st.warning}.get(status, st.error)(mensagem)
+
+def painel_tarefas():
+    """Progresso das tarefas da sessão; quando alguma termina, recarrega a página para aplicar o resultado."""
+    tarefas = [registro_tarefas.obter(id_tarefa) for id_tarefa in st.session_state.get('tarefas', {})]
+    if any(tarefa is None or tarefa.finalizada for tarefa in tarefas):
+        st.rerun()
+    for tarefa in tarefas:
+        col_barra, col_botao = st.columns([5, 1])
+        with col_barra:
+            fracao = tarefa.fracao
+            st.progress(
+                fracao if fracao is not None else 0.0,
+                text=f"⏳ {tarefa.nome}: {tarefa.mensagem or 'na fila...'} ({tarefa.duracao:.0f}s)"
+            )
+        with col_botao:
+            st.button(
+                "⏹️ Cancelar",
+                key=f"cancelar_tarefa_{tarefa.id}",
+                on_click=tarefa.cancelar,
+                disabled=tarefa.cancelamento_pedido,
+                use_container_width=True
+            )
 
-def calcular_lucro_real(venda, custo_material_total, custo_fixo_mo_embalagem, tx_imposto, taxas_mp):
-    
-    def calcular_custo_flexivel(tipo, valor, venda):
-        if tipo == 'percentual':
-            return venda * (valor / 100)
-        return valor
-    
-    valor_taxa_comissao = calcular_custo_flexivel(
-        taxas_mp['taxa_comissao']['tipo'],
-        taxas_mp['taxa_comissao']['valor'],
-        venda
-    )
 
-    valor_taxa_por_item = calcular_custo_flexivel(
-        taxas_mp['taxa_por_item']['tipo'],
-        taxas_mp['taxa_por_item']['valor'],
-        venda
+# --- Exportação Sob Demanda (cache por hash do conteúdo) ---
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _exportacao_em_cache(tipo, chave, _gerar):
+    """Serializa uma única vez por conteúdo; `_gerar` não entra no hash do cache."""
+    with instrumentacao.fase(f'exportacao_{tipo}'):
+        return _gerar()
+
+def preparar_exportacao(tipo, chave):
+    """Marca a exportação como pedida para o conteúdo atual (hash `chave`)."""
+    st.session_state[f'exportacao_{tipo}'] = chave
+
+def exportacao_pedida(tipo, chave):
+    """True se o usuário pediu a exportação e o conteúdo não mudou desde então."""
+    return st.session_state.get(f'exportacao_{tipo}') == chave
+
+
+# --- Grafo de Cálculo (recalcula só o que depende do que mudou) ---
+
+PRECO_MOCK = 100.00
+ROTULOS_TAXAS = {'taxa_imposto': 'Imposto', 'taxa_comissao': 'Comissão', 'taxa_por_item': 'Taxa por Item', 'custo_frete': 'Frete'}
+
+def _calcular_resultado_final(preco_status, custo_material_total, custos_venda):
+    """Detalhamento do preço sugerido (Aba 1), no formato usado pela exportação da Aba 4."""
+    preco_sugerido, status = preco_status
+    if status == 'inválido':
+        return None
+    (
+        custo_total_sugerido, 
+        lucro_bruto_sugerido, 
+        lucro_real_sugerido, 
+        valor_imposto_sugerido, 
+        custo_producao_base_sugerido,
+        valor_comissao_sugerida,
+        valor_item_sugerido,
+        valor_frete_sugerido
+    ) = calcular_lucro_real_cache(
+        preco_sugerido,
+        custo_material_total,
+        custos_venda['custo_fixo_mo_embalagem'], 
+        custos_venda['taxa_imposto'],
+        custos_venda
     )
+    return {
+        'custo_total_sugerido': custo_total_sugerido,
+        'lucro_real_sugerido': lucro_real_sugerido,
+        'custo_producao_base_sugerido': custo_producao_base_sugerido,
+        'valor_imposto_sugerido': valor_imposto_sugerido,
+        'valor_comissao_sugerida': valor_comissao_sugerida,
+        'valor_item_sugerido': valor_item_sugerido,
+        'valor_frete_sugerido': valor_frete_sugerido,
+        'custo_material_total': custo_material_total,
+        'margem_real_sugerida': (lucro_real_sugerido / preco_sugerido) * 100 if preco_sugerido > 0 else 0.0
+    }
+
+def _chave_resumo(resultado_final, preco_status):
+    if resultado_final is None:
+        return None
+    return hash(congelar((resultado_final, preco_status)))
 
-    # CHAVE CORRIGIDA: 'custo_frete'
-    valor_custo_frete = calcular_custo_flexivel(
-        taxas_mp['custo_frete']['tipo'],
-        taxas_mp['custo_frete']['valor'], 
-        venda
+PONTOS_CURVA = 1000
+
+def _calcular_curva_lucro(custo_material_total, custos_venda, comissoes_comparadas):
+    """Curva de lucro da Aba 3: perfil atual + variações de comissão, numa única chamada vetorizada."""
+    perfis = [custos_venda] + variar_comissao(custos_venda, comissoes_comparadas)
+    custo_base = custo_material_total + custos_venda['custo_fixo_mo_embalagem']
+    equilibrio, status = calcular_preco_sugerido_cache(
+        custo_material_total, custos_venda['custo_fixo_mo_embalagem'], custos_venda['taxa_imposto'], custos_venda, 0.0
     )
-    
-    valor_taxa_imposto = venda * (tx_imposto / 100) 
-    custos_marketplace_total = valor_taxa_comissao + valor_taxa_por_item + valor_custo_frete
-    custo_producao_base = custo_material_total + custo_fixo_mo_embalagem 
-    custo_total_venda = custo_producao_base + custos_marketplace_total + valor_taxa_imposto
-    lucro_bruto = venda - custo_producao_base
-    lucro_real = venda - custo_total_venda
-    
-    return (
-        custo_total_venda, 
-        lucro_bruto, 
-        lucro_real, 
-        valor_taxa_imposto,
-        custo_producao_base,
-        valor_taxa_comissao,
-        valor_taxa_por_item,
-        valor_custo_frete
+    preco_maximo = max(3 * (equilibrio if status == 'ok' else custo_base), 10.0)
+    return curva_lucro(
+        np.linspace(0.0, preco_maximo, PONTOS_CURVA),
+        custo_material_total,
+        custos_venda['custo_fixo_mo_embalagem'],
+        custos_venda['taxa_imposto'],
+        perfis
     )
 
-# --- Função de Cálculo Reverso (Lucro Fixo Desejado) ---
-
-def calcular_preco_sugerido_lucro_fixo(custo_material_total, custo_fixo_mo_embalagem, tx_imposto, taxas_mp, lucro_fixo_desejado):
-    """Calcula o preço de venda ideal baseado em um lucro fixo desejado (R$)."""
-    
-    # 1. Componentes Percentuais
-    comissao_percentual = 0.0
-    if taxas_mp['taxa_comissao']['tipo'] == 'percentual':
-        comissao_percentual = taxas_mp['taxa_comissao']['valor'] / 100
-        
-    # 2. Componentes Fixos
-    custo_base_producao = custo_material_total + custo_fixo_mo_embalagem
-    
-    custos_fixos_mp = 0.0
-    if taxas_mp['taxa_por_item']['tipo'] == 'fixo':
-        custos_fixos_mp += taxas_mp['taxa_por_item']['valor']
-    if taxas_mp['custo_frete']['tipo'] == 'fixo':
-        custos_fixos_mp += taxas_mp['custo_frete']['valor']
-    if taxas_mp['taxa_comissao']['tipo'] == 'fixo':
-        custos_fixos_mp += taxas_mp['taxa_comissao']['valor']
-
-    # Numerador: Custo total fixo a ser coberto + Lucro desejado
-    numerador = custo_base_producao + custos_fixos_mp + lucro_fixo_desejado
-    
-    # 3. Denominador (Percentuais que reduzem a receita)
-    imposto_percentual = tx_imposto / 100
-    
-    denominador = 1 - (comissao_percentual + imposto_percentual)
-    
-    if denominador <= 0:
-        return 0.0, 'inválido'
-        
-    preco_sugerido = numerador / denominador
-    
-    return preco_sugerido, 'ok'
-
-
-# --- Função de Formatação (Padrão BRL) ---
-
-def formatar_brl(valor):
-    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
-# --- FUNÇÃO PARA CONVERTER O RESULTADO EM CSV ---
-def convert_data_to_csv(data_dict, preco_sugerido, margem_real):
-    df_data = {
-        'Metrica': [
-            'Preco Sugerido (Venda)', 
-            'Custo Total da Venda', 
-            'Custo de Producao (Base)', 
-            'Lucro Real (Desejado)',
-            'Margem Real (%)',
-            'Custo: Materiais',
-            'Custo: Imposto',
-            'Custo: Comissao Marketplace',
-            'Custo: Taxa por Item + Frete'
-        ],
-        'Valor': [
-            preco_sugerido,
-            data_dict['custo_total_sugerido'],
-            data_dict['custo_producao_base_sugerido'],
-            data_dict['lucro_real_sugerido'],
-            margem_real,
-            data_dict['custo_material_total'],
-            data_dict['valor_imposto_sugerido'],
-            data_dict['valor_comissao_sugerida'],
-            data_dict['valor_item_sugerido'] + data_dict['valor_frete_sugerido']
-        ]
-    }
-    df = pd.DataFrame(df_data)
-    
-    # Gera o CSV e codifica em UTF-8
-    buffer = io.StringIO()
-    # Usando ';' como separador para melhor compatibilidade com Excel em PT-BR
-    df.to_csv(buffer, index=False, sep=';', encoding='utf-8') 
-    return buffer.getvalue().encode('utf-8')
+def _registrar_no(grafo, nome, funcao, dependencias):
+    """Registra o nó no grafo, cronometrando cada recálculo como a fase `calculo_<nome>`."""
+    grafo.no(nome, instrumentacao.medido(f'calculo_{nome}', funcao), dependencias)
+
+def obter_grafo_calculo():
+    """Retorna o grafo de cálculo da sessão (entradas -> custos -> preço -> exportações)."""
+    grafo = st.session_state.get('grafo_calculo')
+    if grafo is None:
+        grafo = GrafoCalculo()
+        _registrar_no(grafo, 'custo_material_total', calcular_custo_total_materiais, ['materiais_produto'])
+        _registrar_no(
+            grafo,
+            'custos_mock',
+            lambda custo_material, custos_venda: calcular_lucro_real_cache(
+                PRECO_MOCK, custo_material, custos_venda['custo_fixo_mo_embalagem'], custos_venda['taxa_imposto'], custos_venda
+            ),
+            ['custo_material_total', 'custos_venda']
+        )
+        _registrar_no(
+            grafo,
+            'preco_sugerido',
+            lambda custo_material, custos_venda, lucro_fixo: calcular_preco_sugerido_cache(
+                custo_material, custos_venda['custo_fixo_mo_embalagem'], custos_venda['taxa_imposto'], custos_venda, lucro_fixo
+            ),
+            ['custo_material_total', 'custos_venda', 'lucro_fixo_desejado']
+        )
+        _registrar_no(grafo, 'curva_lucro', _calcular_curva_lucro, ['custo_material_total', 'custos_venda', 'comissoes_comparadas'])
+        _registrar_no(grafo, 'resultado_final', _calcular_resultado_final, ['preco_sugerido', 'custo_material_total', 'custos_venda'])
+        # Exportações: o grafo só guarda o hash do conteúdo; os bytes são gerados sob demanda
+        _registrar_no(grafo, 'chave_resumo', _chave_resumo, ['resultado_final', 'preco_sugerido'])
+        _registrar_no(
+            grafo,
+            'chave_backup',
+            lambda insumos, materiais, custos_venda: hash(congelar((insumos, materiais, custos_venda))),
+            ['insumos_base', 'materiais_produto', 'custos_venda']
+        )
+        st.session_state.grafo_calculo = grafo
+    return grafo
 
 
 # --- Título Principal ---
 
 st.title("💰 Calculadora de Preço Ideal por Lucro Desejado")
 st.caption("Ajuste os **Materiais** e as **Taxas de Venda** e use a Aba 1 para definir seu Preço.")
+# Preenchido no fim do rerun se a gravação no armazenamento local encontrar um conflito
+aviso_banco = st.empty()
+
+# Tarefas em segundo plano: resultados prontos entram antes de qualquer cálculo;
+# as que ainda rodam ganham um painel que se atualiza sozinho, sem travar a página.
+with instrumentacao.fase('tarefas'):
+    processar_tarefas()
+if st.session_state.get('tarefas'):
+    st.fragment(run_every=INTERVALO_TAREFAS)(painel_tarefas)()
 
 # --------------------------------------------------------------------------
 # --- CÁLCULO E PREPARAÇÃO DE DADOS ANTES DAS ABAS ---
 # --------------------------------------------------------------------------
 
 # 1. CÁLCULO DE INSUMOS BASE
-insumos_unitarios = {}
-for insumo in st.session_state.insumos_base:
-    qtd_pacote = insumo.get('qtd_pacote', 1.0) 
-    if qtd_pacote > 0:
-        custo_unitario = insumo['valor_pacote'] / qtd_pacote
-    else:
-        custo_unitario = 0.0
-        
-    insumos_unitarios[insumo['nome']] = custo_unitario
+with instrumentacao.fase('catalogo_insumos'):
+    catalogo_insumos = obter_catalogo_insumos()
+    # Custos dos materiais seguem o catálogo em todas as linhas, não só nas da página visível da Aba 2
+    catalogo_insumos.aplicar_custos(st.session_state.materiais_produto)
+instrumentacao.incrementar('linhas_processadas', len(catalogo_insumos), tabela='insumos')
+instrumentacao.incrementar('linhas_processadas', len(st.session_state.materiais_produto), tabela='materiais')
+
+# 2. ENTRADAS DO GRAFO (versões só mudam se o conteúdo mudou)
+grafo = obter_grafo_calculo()
+grafo.entrada('insumos_base', st.session_state.insumos_base)
+grafo.entrada('materiais_produto', st.session_state.materiais_produto)
+grafo.entrada('custos_venda', st.session_state.custos_venda)
+if 'versoes_salvas' not in st.session_state:
+    # O que acabou de vir do banco já está salvo: não regrava no fim do primeiro rerun
+    st.session_state.versoes_salvas = {
+        nome: grafo.versao(nome) for nome in st.session_state.get('carregados_do_banco', ())
+    }
 
-# 2. CÁLCULO DO CUSTO TOTAL DE MATERIAIS DO PRODUTO
-custo_total_materiais_produto = 0.0
-for material in st.session_state.materiais_produto:
-    custo_unitario = material.get('custo_unidade', 0.00)
-    qtd_usada = material.get('qtd_usada', 0.00)
-    custo_total_materiais_produto += custo_unitario * qtd_usada
+# 3. CÁLCULO DO CUSTO TOTAL DE MATERIAIS DO PRODUTO
+custo_total_materiais_produto = grafo.valor('custo_material_total')
 
-# 3. CÁLCULO MOCK (Para exibição na Aba 3)
-PRECO_MOCK = 100.00
-
-# Execução do cálculo mock (usando o preço de R$ 100 para calcular custos fixos/percentuais para a Aba 3)
+# 4. CÁLCULO MOCK (usando o preço de R$ 100 para calcular custos fixos/percentuais para a Aba 3)
 (
     _, 
     _, 
@@ -257,25 +577,19 @@ PRECO_MOCK = 100.00
     valor_comissao,
     valor_item,
     valor_frete
-) = calcular_lucro_real(
-    PRECO_MOCK, 
-    custo_total_materiais_produto,
-    st.session_state.custos_venda['custo_fixo_mo_embalagem'], 
-    st.session_state.custos_venda['taxa_imposto'],
-    st.session_state.custos_venda
-)
+) = grafo.valor('custos_mock')
 
 # --------------------------------------------------------------------------
 # --- DEFINIÇÃO DAS ABAS ---
 # --------------------------------------------------------------------------
 
-tab1, tab2, tab3, tab4 = st.tabs(["1. Preço Sugerido (Lucro R$)", "2. Materiais & Custos", "3. Taxas de Venda", "4. Backup & Exportação"])
+tab1, tab2, tab3, tab4, tab5 = st.tabs(["1. Preço Sugerido (Lucro R$)", "2. Materiais & Custos", "3. Taxas de Venda", "4. Backup & Exportação", "5. Cenários (E se...?)"])
 
 
 # ==========================================================================
 # --- ABA 1: PREÇO SUGERIDO ---
 # ==========================================================================
-with tab1:
+with tab1, instrumentacao.fase('render_aba1'):
     
     st.header("🎯 Defina o Lucro Desejado em Reais (R$)")
     st.caption("O sistema irá calcular o preço de venda que cobre todos os custos (materiais e taxas) e garante o lucro exato abaixo.")
@@ -294,51 +608,35 @@ with tab1:
     )
     
     # --- Cálculo Reverso ---
-    preco_sugerido, status = calcular_preco_sugerido_lucro_fixo(
-        custo_total_materiais_produto,
-        st.session_state.custos_venda['custo_fixo_mo_embalagem'],
-        st.session_state.custos_venda['taxa_imposto'],
-        st.session_state.custos_venda,
-        lucro_fixo_desejado
-    )
+    grafo.entrada('lucro_fixo_desejado', lucro_fixo_desejado)
+    preco_sugerido, status = grafo.valor('preco_sugerido')
     
     if status == 'inválido':
-        st.error("⚠️ **Erro de Cálculo:** As taxas de comissão e imposto juntas ultrapassam 100%. Verifique as taxas na Aba 3.")
+        percentuais = percentuais_taxas(st.session_state.custos_venda['taxa_imposto'], st.session_state.custos_venda)
+        detalhe = ", ".join(
+            f"{ROTULOS_TAXAS[componente]} {percentual:,.2f}%" for componente, percentual in percentuais.items() if percentual
+        )
+        st.error(
+            f"⚠️ **Erro de Cálculo:** As taxas percentuais sobre o preço somam {sum(percentuais.values()):,.2f}% "
+            f"({detalhe}) e chegam a 100% ou mais: nenhum preço cobre os custos. "
+            "Reduza imposto, comissão, taxa por item ou frete percentuais na Aba 3."
+        )
     else:
         
         st.subheader("2. Preço de Venda Ideal Sugerido")
         
-        # Recalcula o lucro e os custos usando o preço sugerido (para exibição detalhada)
-        (
-            custo_total_sugerido, 
-            lucro_bruto_sugerido, 
-            lucro_real_sugerido, 
-            valor_imposto_sugerido, 
-            custo_producao_base_sugerido,
-            valor_comissao_sugerida,
-            valor_item_sugerido,
-            valor_frete_sugerido
-        ) = calcular_lucro_real(
-            preco_sugerido,
-            custo_total_materiais_produto,
-            st.session_state.custos_venda['custo_fixo_mo_embalagem'], 
-            st.session_state.custos_venda['taxa_imposto'],
-            st.session_state.custos_venda
-        )
-        
-        margem_real_sugerida = (lucro_real_sugerido / preco_sugerido) * 100 if preco_sugerido > 0 else 0.0
+        # Detalhamento dos custos no preço sugerido (memoizado no grafo)
+        resultado_final = grafo.valor('resultado_final')
+        custo_total_sugerido = resultado_final['custo_total_sugerido']
+        lucro_real_sugerido = resultado_final['lucro_real_sugerido']
+        valor_imposto_sugerido = resultado_final['valor_imposto_sugerido']
+        custo_producao_base_sugerido = resultado_final['custo_producao_base_sugerido']
+        valor_comissao_sugerida = resultado_final['valor_comissao_sugerida']
+        valor_item_sugerido = resultado_final['valor_item_sugerido']
+        valor_frete_sugerido = resultado_final['valor_frete_sugerido']
+        margem_real_sugerida = resultado_final['margem_real_sugerida']
 
         # Armazenar os resultados no Session State para uso na Aba 4
-        resultado_final = {
-            'custo_total_sugerido': custo_total_sugerido,
-            'lucro_real_sugerido': lucro_real_sugerido,
-            'custo_producao_base_sugerido': custo_producao_base_sugerido,
-            'valor_imposto_sugerido': valor_imposto_sugerido,
-            'valor_comissao_sugerida': valor_comissao_sugerida,
-            'valor_item_sugerido': valor_item_sugerido,
-            'valor_frete_sugerido': valor_frete_sugerido,
-            'custo_material_total': custo_total_materiais_produto
-        }
         st.session_state['resultado_final'] = resultado_final
         st.session_state['preco_sugerido'] = preco_sugerido
         st.session_state['margem_real_sugerida'] = margem_real_sugerida
@@ -387,11 +685,47 @@ with tab1:
         
         st.markdown(f"**Total (Custo Base + Venda + Lucro) = {formatar_brl(preco_sugerido)}**")
 
+        # --- Preço Ótimo pela Demanda (preco_otimo.py) ---
+        with st.expander("📈 Preço que Maximiza o Lucro Total (Demanda)"):
+            st.caption(
+                "Em vez de um lucro fixo por unidade, informe quantas unidades você vende no preço sugerido e a "
+                "elasticidade da demanda (ex.: -2 = preço 1% maior, cerca de 2% menos vendas)."
+            )
+            col_unidades, col_elasticidade = st.columns(2)
+            with col_unidades:
+                unidades_referencia = st.number_input(
+                    f"Unidades vendidas (por mês) a {formatar_brl(preco_sugerido)}",
+                    min_value=1.0, value=100.0, step=10.0, format="%.0f",
+                    key="demanda_unidades"
+                )
+            with col_elasticidade:
+                elasticidade = st.number_input(
+                    "Elasticidade da demanda",
+                    min_value=-10.0, max_value=-0.1, value=-2.0, step=0.1, format="%.1f",
+                    key="demanda_elasticidade",
+                    help="Abaixo de -1 a demanda é sensível ao preço; entre -1 e 0, o ótimo fica no limite da busca (3x o preço sugerido)."
+                )
+            otimo = otimizar_precos(
+                {'custo_material_total': np.array([custo_total_materiais_produto])},
+                DemandaElasticidade(preco_sugerido, unidades_referencia, elasticidade),
+                st.session_state.custos_venda
+            )
+            lucro_total_atual = lucro_real_sugerido * unidades_referencia
+            col_preco_otimo, col_unidades_otimo, col_lucro_otimo = st.columns(3)
+            with col_preco_otimo:
+                st.metric("Preço Ótimo", formatar_brl(otimo['preco_otimo'][0]), delta=formatar_brl(otimo['preco_otimo'][0] - preco_sugerido))
+                st.caption(f"Lucro por unidade: {formatar_brl(otimo['lucro_unitario'][0])}")
+            with col_unidades_otimo:
+                st.metric("Unidades Esperadas", f"{otimo['unidades'][0]:,.0f}", delta=f"{otimo['unidades'][0] - unidades_referencia:,.0f}")
+            with col_lucro_otimo:
+                st.metric("Lucro Total", formatar_brl(otimo['lucro_total'][0]), delta=formatar_brl(otimo['lucro_total'][0] - lucro_total_atual))
+            st.caption(f"No preço sugerido: {formatar_brl(lucro_total_atual)} de lucro total com {unidades_referencia:,.0f} unidades.")
+
 
 # ==========================================================================
 # --- ABA 2: MATERIAIS & CUSTOS --- 
 # ==========================================================================
-with tab2:
+with tab2, instrumentacao.fase('render_aba2'):
     
     # --- CUSTO DO MATERIAL (PACOTES) COM SELETOR ML/UN ---
     st.header("Custo do Material (Pacotes e Embalagens)")
@@ -403,62 +737,93 @@ with tab2:
     with col_i_remove:
         st.button("➖ Remover Último Material", on_click=remover_ultimo_insumo, use_container_width=True, type="secondary")
 
-    for i, insumo in enumerate(st.session_state.insumos_base):
+    with st.expander("📥 Importar Lista de Preços do Fornecedor (CSV/XLSX)"):
+        arquivo_precos = st.file_uploader(
+            "Lista de preços: insumos com o mesmo nome são atualizados, os demais são adicionados.",
+            type=["csv", "xlsx"],
+            key="upload_lista_precos",
+            help="Linhas sem nome, com valor negativo, Qtd/Pacote menor que 1 ou unidade diferente de UN/ML são ignoradas."
+        )
+        if arquivo_precos is not None:
+            try:
+                colunas_arquivo = colunas_lista_precos(arquivo_precos)
+            except (ValueError, ImportError) as e:
+                st.error(f"❌ Não foi possível ler o cabeçalho do arquivo: {e}")
+                colunas_arquivo = []
+            if colunas_arquivo:
+                sugerido = detectar_mapeamento(colunas_arquivo)
+                opcoes_coluna = ['(não usar)'] + colunas_arquivo
+                mapeamento = {}
+                for col_mapa, campo in zip(st.columns(len(CAMPOS)), CAMPOS):
+                    with col_mapa:
+                        escolha = st.selectbox(
+                            campo,
+                            options=opcoes_coluna,
+                            index=opcoes_coluna.index(sugerido[campo]) if campo in sugerido else 0,
+                            key=f"mapa_precos_{campo}"
+                        )
+                    if escolha != '(não usar)':
+                        mapeamento[campo] = escolha
+                st.button("📥 Importar Lista", on_click=importar_precos_fornecedor, args=(arquivo_precos, mapeamento), type="primary")
+        mostrar_aviso('resumo_importacao')
+
+    for pos, i in enumerate(linhas_visiveis(catalogo_insumos.insumos, 'insumos')):
+        insumo = catalogo_insumos.insumos[i]
         col_nome, col_pacote, col_qtd, col_unidade_tipo, col_unidade_custo = st.columns([2, 1.5, 1, 1, 1.5])
         
         # 1. Nome do Material
         with col_nome:
-            insumo['nome'] = st.text_input(
+            nome = st.text_input(
                 "Nome", 
                 value=insumo['nome'],
                 key=f"insumo_nome_{i}",
-                label_visibility="collapsed" if i > 0 else "visible"
+                label_visibility="collapsed" if pos > 0 else "visible"
             )
 
         # 2. Valor do Pacote
         with col_pacote:
-            insumo['valor_pacote'] = st.number_input(
+            valor_pacote = st.number_input(
                 "R$ Pacote", 
                 min_value=0.00, 
                 value=insumo['valor_pacote'], 
                 step=0.01, 
                 format="%.2f",
                 key=f"insumo_pacote_{i}",
-                label_visibility="collapsed" if i > 0 else "visible"
+                label_visibility="collapsed" if pos > 0 else "visible"
             )
 
         # 3. Quantidade no Pacote
         with col_qtd:
-            insumo['qtd_pacote'] = st.number_input(
+            qtd_pacote = st.number_input(
                 "Qtd/Pacote", 
-                min_value=1.0, 
+                min_value=QTD_PACOTE_MINIMA, 
                 value=insumo.get('qtd_pacote', 1.0), 
                 step=1.0,
                 key=f"insumo_qtd_{i}",
-                label_visibility="collapsed" if i > 0 else "visible"
+                label_visibility="collapsed" if pos > 0 else "visible"
             )
 
         # 4. Seletor de Unidade (UN/ML)
         with col_unidade_tipo:
-            if 'unidade' not in insumo:
-                insumo['unidade'] = 'UN'
-                
-            insumo['unidade'] = st.selectbox(
+            unidade = st.selectbox(
                 "Tipo",
                 options=['UN', 'ML'],
-                index=0 if insumo['unidade'] == 'UN' else 1,
+                index=0 if insumo.get('unidade', 'UN') == 'UN' else 1,
                 key=f"insumo_unidade_{i}",
-                label_visibility="collapsed" if i > 0 else "visible"
+                label_visibility="collapsed" if pos > 0 else "visible"
             )
+
+        # Só a entrada alterada tem o custo recalculado (e o índice refeito, se mudou o nome)
+        catalogo_insumos.atualizar(i, nome=nome, valor_pacote=valor_pacote, qtd_pacote=qtd_pacote, unidade=unidade)
             
         # Cálculo do Custo Unitário/ML
-        custo_unitario = insumos_unitarios.get(insumo['nome'], 0.00)
+        custo_unitario = catalogo_insumos.custo_unitario_posicao(i)
         unidade_label = "R$/UN" if insumo['unidade'] == 'UN' else "R$/ML"
         
         # 5. Custo Unitário Calculado
         with col_unidade_custo:
             st.markdown(f"R$ **{custo_unitario:,.4f}**")
-            if i == 0:
+            if pos == 0:
                  st.caption(unidade_label)
 
 
@@ -474,45 +839,42 @@ with tab2:
     with col_m_remove:
         st.button("➖ Remover Último Material", on_click=remover_ultimo_material_produto, use_container_width=True, key="btn_remove_prod", type="secondary")
 
-    opcoes_insumos = list(insumos_unitarios.keys())
-    opcoes_insumos.append("Outro (Manual)")
+    opcoes_insumos = catalogo_insumos.opcoes()
+    catalogo_insumos.aplicar_custos(st.session_state.materiais_produto)
 
-    for i, material in enumerate(st.session_state.materiais_produto):
+    for pos, i in enumerate(linhas_visiveis(st.session_state.materiais_produto, 'materiais')):
+        material = st.session_state.materiais_produto[i]
         col_nome, col_custo, col_qtd, col_total = st.columns([2, 1.5, 1, 1.5])
 
         # 1. Campo de Seleção ou Entrada Manual
         with col_nome:
-            if insumos_unitarios and len(insumos_unitarios) > 0:
+            if len(catalogo_insumos) > 0:
                 selecao = st.selectbox(
                     "Material",
                     options=opcoes_insumos,
-                    index=opcoes_insumos.index(material['nome']) if material['nome'] in opcoes_insumos else len(opcoes_insumos) - 1,
+                    index=catalogo_insumos.indice_opcao(material['nome']),
                     key=f"material_sel_{i}",
-                    label_visibility="collapsed" if i > 0 else "visible"
+                    label_visibility="collapsed" if pos > 0 else "visible"
                 )
                 material['nome'] = selecao
                 
-                if selecao != "Outro (Manual)":
-                    material['custo_unidade'] = insumos_unitarios.get(selecao, 0.00)
+                if selecao != OPCAO_MANUAL:
+                    material['custo_unidade'] = catalogo_insumos.custo_unitario(selecao)
                 
             else:
                 material['nome'] = st.text_input(
                     "Material", 
                     value=material['nome'],
                     key=f"material_nome_{i}",
-                    label_visibility="collapsed" if i > 0 else "visible"
+                    label_visibility="collapsed" if pos > 0 else "visible"
                 )
             
-            unidade_tipo_uso = 'UN'
-            for insumo in st.session_state.insumos_base:
-                if insumo['nome'] == material['nome']:
-                    unidade_tipo_uso = insumo['unidade']
-                    break
+            unidade_tipo_uso = catalogo_insumos.unidade(material['nome'])
 
 
         # 2. Campo de Custo Unitário (Editável ou Preenchido)
         with col_custo:
-            if material['nome'] == "Outro (Manual)" or not insumos_unitarios or len(insumos_unitarios) == 0:
+            if material['nome'] == OPCAO_MANUAL or len(catalogo_insumos) == 0:
                 custo_unidade = st.number_input(
                     "R$ Unidade/ML",
                     min_value=0.00,
@@ -520,12 +882,12 @@ with tab2:
                     step=0.01,
                     format="%.2f",
                     key=f"material_custo_{i}",
-                    label_visibility="collapsed" if i > 0 else "visible"
+                    label_visibility="collapsed" if pos > 0 else "visible"
                 )
                 material['custo_unidade'] = custo_unidade
             else:
                 st.markdown(f"R$ **{material['custo_unidade']:,.4f}**")
-                if i == 0:
+                if pos == 0:
                     st.caption("Custo Unitário/ML")
 
         # 3. Campo de Quantidade Usada
@@ -536,7 +898,7 @@ with tab2:
                 value=material['qtd_usada'],
                 step=0.01,
                 key=f"material_qtd_{i}",
-                label_visibility="collapsed" if i > 0 else "visible"
+                label_visibility="collapsed" if pos > 0 else "visible"
             )
         
         # 4. Cálculo do Custo Total por Item
@@ -544,7 +906,7 @@ with tab2:
         
         with col_total:
             st.markdown(f"**R$ {custo_total_item:,.2f}**")
-            if i == 0:
+            if pos == 0:
                 st.caption("Custo Total")
 
     st.markdown("---")
@@ -566,7 +928,7 @@ with tab2:
 # ==========================================================================
 # --- ABA 3: TAXAS DE VENDA --- 
 # ==========================================================================
-with tab3:
+with tab3, instrumentacao.fase('render_aba3'):
     st.header("Taxas de Venda (Marketplace, Impostos e Frete)")
 
     # Impostos (sempre em %)
@@ -633,12 +995,39 @@ with tab3:
 
     st.markdown("##### Custo de Frete (Pago por Você)")
     custo_flexivel_ui('custo_frete', 'Frete', valor_frete)
+    st.markdown("---")
+
+    # --- Curva de Lucro por Preço ---
+    st.subheader("📈 Curva de Lucro por Preço")
+    st.caption("Lucro real em cada preço de venda com as taxas acima. O ponto de equilíbrio é o preço em que o lucro real é zero.")
+
+    comissoes_comparadas = st.multiselect(
+        "Comparar com outras comissões (%)",
+        options=[5.0, 10.0, 12.0, 14.0, 16.0, 18.0, 20.0, 25.0, 30.0],
+        format_func=lambda x: f"{x:.0f}%",
+        key="curva_comissoes"
+    )
+
+    # Reaplica as taxas editadas acima antes de ler a curva
+    grafo.entrada('custos_venda', st.session_state.custos_venda)
+    grafo.entrada('comissoes_comparadas', sorted(comissoes_comparadas))
+    curva = grafo.valor('curva_lucro')
+
+    nomes_perfis = ["Taxas atuais"] + [f"Comissão {c:.0f}%" for c in sorted(comissoes_comparadas)]
+    df_curva = pd.DataFrame(curva['lucro_real'].T, index=curva['precos'], columns=nomes_perfis)
+    df_curva.index.name = "Preço de Venda (R$)"
+    st.line_chart(df_curva, x_label="Preço de Venda (R$)", y_label="Lucro Real (R$)")
+
+    cols_equilibrio = st.columns(len(nomes_perfis))
+    for col, nome_perfil, equilibrio in zip(cols_equilibrio, nomes_perfis, curva['ponto_equilibrio']):
+        with col:
+            st.metric(f"Equilíbrio ({nome_perfil})", formatar_brl(equilibrio) if np.isfinite(equilibrio) else "—")
 
 
 # ==========================================================================
 # --- ABA 4: BACKUP & EXPORTAÇÃO ---
 # ==========================================================================
-with tab4:
+with tab4, instrumentacao.fase('render_aba4'):
     
     st.header("💾 Backup, Restauração e Exportação")
     st.caption("Use esta aba para salvar (Exportar) todas as configurações e carregar (Importar) backups existentes.")
@@ -647,53 +1036,115 @@ with tab4:
     
     st.info("O arquivo de backup salva **todos os materiais, insumos e taxas** configurados nas abas 2 e 3.")
     
-    backup_json_string = criar_backup_json()
+    chave_backup = grafo.valor('chave_backup')
     
-    st.download_button(
-        label="⬇️ Baixar Backup de Configurações (.json)",
-        data=backup_json_string.encode('utf-8'),
-        file_name="calculadora_backup.json",
-        mime="application/json",
-        use_container_width=True,
-        type="primary"
-    )
+    if exportacao_pedida('backup', chave_backup):
+        backup_json_bytes = _exportacao_em_cache(
+            'backup',
+            chave_backup,
+            lambda: criar_backup_json(
+                st.session_state.insumos_base,
+                st.session_state.materiais_produto,
+                st.session_state.custos_venda
+            ).encode('utf-8')
+        )
+        st.download_button(
+            label="⬇️ Baixar Backup de Configurações (.json)",
+            data=backup_json_bytes,
+            file_name="calculadora_backup.json",
+            mime="application/json",
+            use_container_width=True,
+            type="primary"
+        )
+    else:
+        st.button(
+            "📦 Preparar Backup de Configurações (.json)",
+            on_click=preparar_exportacao,
+            args=('backup', chave_backup),
+            use_container_width=True,
+            type="primary"
+        )
+
+    # Formato binário compacto, mais rápido de gerar e restaurar para catálogos grandes
+    if exportacao_pedida('backup_binario', chave_backup):
+        backup_binario_bytes = _exportacao_em_cache(
+            'backup_binario',
+            chave_backup,
+            lambda: criar_backup_binario(
+                st.session_state.insumos_base,
+                st.session_state.materiais_produto,
+                st.session_state.custos_venda
+            )
+        )
+        st.download_button(
+            label="⬇️ Baixar Backup Compacto (.calcbk)",
+            data=backup_binario_bytes,
+            file_name="calculadora_backup.calcbk",
+            mime="application/octet-stream",
+            use_container_width=True,
+            type="secondary"
+        )
+    else:
+        st.button(
+            "📦 Preparar Backup Compacto (.calcbk)",
+            on_click=preparar_exportacao,
+            args=('backup_binario', chave_backup),
+            use_container_width=True,
+            type="secondary"
+        )
+    st.caption("O backup compacto (binário) é menor e restaura mais rápido em catálogos grandes. O JSON continua compatível com versões anteriores.")
     
     st.markdown("---")
     
     st.subheader("2. 📥 Importar Configurações (Restauração)")
     
     uploaded_file = st.file_uploader(
-        "Selecione um arquivo .json de backup gerado pela calculadora.", 
-        type="json",
+        "Selecione um arquivo de backup (.json ou .calcbk) gerado pela calculadora.", 
+        type=["json", "calcbk"],
         key="upload_backup"
     )
     
     if uploaded_file is not None:
         st.button("🔄 Restaurar Configurações", on_click=restaurar_estado, args=(uploaded_file,), type="secondary")
+    mostrar_aviso('aviso_restauracao')
         
     st.markdown("---")
 
     st.subheader("3. 📑 Exportar Resultado Final e Impressão")
     
-    # Verifica se o cálculo da Aba 1 foi executado (se as chaves existem)
-    if 'resultado_final' in st.session_state and 'preco_sugerido' in st.session_state:
+    # O resumo só existe se o cálculo da Aba 1 for válido
+    chave_resumo = grafo.valor('chave_resumo')
+    if chave_resumo is not None:
         
         col_csv, col_print = st.columns([1, 2])
         
         with col_csv:
-            csv_data = convert_data_to_csv(
-                st.session_state.resultado_final,
-                st.session_state.preco_sugerido,
-                st.session_state.margem_real_sugerida
-            )
-            st.download_button(
-                label="⬇️ Baixar Resumo de Custos (CSV)",
-                data=csv_data,
-                file_name=f"resumo_preco_{st.session_state.lucro_fixo_desejado:.2f}.csv",
-                mime="text/csv",
-                use_container_width=True,
-                type="secondary"
-            )
+            if exportacao_pedida('resumo', chave_resumo):
+                csv_data = _exportacao_em_cache(
+                    'resumo',
+                    chave_resumo,
+                    lambda: convert_data_to_csv(
+                        st.session_state.resultado_final,
+                        st.session_state.preco_sugerido,
+                        st.session_state.margem_real_sugerida
+                    )
+                )
+                st.download_button(
+                    label="⬇️ Baixar Resumo de Custos (CSV)",
+                    data=csv_data,
+                    file_name=f"resumo_preco_{st.session_state.lucro_fixo_desejado:.2f}.csv",
+                    mime="text/csv",
+                    use_container_width=True,
+                    type="secondary"
+                )
+            else:
+                st.button(
+                    "📦 Preparar Resumo de Custos (CSV)",
+                    on_click=preparar_exportacao,
+                    args=('resumo', chave_resumo),
+                    use_container_width=True,
+                    type="secondary"
+                )
             st.caption("Salva o cálculo da Aba 1 em formato de planilha.")
             
         with col_print:
@@ -705,3 +1156,165 @@ with tab4:
             
     else:
         st.warning("⚠️ O cálculo principal na Aba 1 deve ser executado pelo menos uma vez para gerar os dados de exportação (CSV).")
+
+    st.markdown("---")
+
+    st.subheader("4. 🔁 Reprecificar Catálogo (CSV de Produtos)")
+    st.caption(
+        "Um produto por linha, com `custo_material_total` ou colunas `qtd:<nome do insumo>` (mesmo formato do "
+        "`reprecificar.py`). Insumos, taxas e lucro desejado atuais valem para as colunas ausentes. "
+        "Roda em segundo plano: você pode continuar editando enquanto o arquivo é processado."
+    )
+    arquivo_produtos = st.file_uploader("CSV de produtos", type=["csv"], key="upload_reprecificacao")
+    if arquivo_produtos is not None:
+        col_sep, col_exato = st.columns(2)
+        with col_sep:
+            separador_produtos = st.radio(
+                "Formato do CSV",
+                options=[',', ';'],
+                format_func=lambda sep: "Separador ',' e decimal '.'" if sep == ',' else "Separador ';' e decimal ','",
+                horizontal=True,
+                key="separador_reprecificacao"
+            )
+        with col_exato:
+            exato = st.checkbox("Cálculo exato em centavos", key="exato_reprecificacao")
+        st.button(
+            "🔁 Reprecificar",
+            on_click=reprecificar_catalogo,
+            args=(arquivo_produtos, separador_produtos, exato),
+            type="primary"
+        )
+    mostrar_aviso('aviso_reprecificacao')
+    if 'resultado_reprecificacao' in st.session_state:
+        st.download_button(
+            label="⬇️ Baixar Preços Recalculados (CSV)",
+            data=st.session_state.resultado_reprecificacao,
+            file_name="precos_recalculados.csv",
+            mime="text/csv",
+            type="secondary"
+        )
+
+
+# ==========================================================================
+# --- ABA 5: CENÁRIOS (E SE...?) ---
+# ==========================================================================
+with tab5, instrumentacao.fase('render_aba5'):
+    st.header("🔀 Comparação de Cenários")
+    st.caption(
+        "Cada linha é um cenário: preencha só o que muda em relação às Abas 2 e 3 (células vazias mantêm o valor atual). "
+        "Todos os cenários são calculados juntos e comparados com a situação atual."
+    )
+
+    if 'cenarios_tabela' not in st.session_state:
+        st.session_state.cenarios_tabela = pd.DataFrame(
+            [{'Cenário': 'Comissão 18% + Frete +R$ 2', 'Comissão (%)': 18.0, 'Frete (+R$)': 2.0}],
+            columns=COLUNAS_CENARIOS
+        )
+
+    tabela_cenarios = st.data_editor(
+        st.session_state.cenarios_tabela,
+        num_rows="dynamic",
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            'Insumo': st.column_config.SelectboxColumn('Insumo', options=[nome for nome in catalogo_insumos.opcoes() if nome != OPCAO_MANUAL]),
+            'Comissão (%)': st.column_config.NumberColumn(min_value=0.0, max_value=100.0, format="%.2f"),
+            'Imposto (%)': st.column_config.NumberColumn(min_value=0.0, max_value=100.0, format="%.2f"),
+        },
+        key="editor_cenarios"
+    )
+
+    try:
+        cenarios = cenarios_da_tabela(tabela_cenarios, st.session_state.custos_venda)
+        bom_sku, bom_insumo, bom_qtd, custo_manual = lista_materiais_produto(catalogo_insumos, st.session_state.materiais_produto)
+        comparacao = avaliar_cenarios(
+            catalogo_insumos, bom_sku, bom_insumo, bom_qtd, 1,
+            st.session_state.custos_venda, cenarios,
+            st.session_state.get('lucro_fixo_desejado', 5.0),
+            custo_material_extra=custo_manual,
+        )
+    except KeyError as e:
+        st.error(f"❌ {e.args[0]}")
+    else:
+        resumo_cenarios = pd.DataFrame({
+            'Cenário': comparacao['cenarios'],
+            'Preço Sugerido': comparacao['preco_sugerido'][:, 0],
+            'Δ Preço': comparacao['delta_preco'][:, 0],
+            'Lucro no Preço Atual': comparacao['lucro_no_preco_atual'][:, 0],
+            'Δ Lucro': comparacao['delta_lucro'][:, 0],
+            'Margem no Preço Atual (%)': comparacao['margem_no_preco_atual'][:, 0].round(2),
+        })
+        resumo_cenarios.loc[~comparacao['valido'][:, 0], 'Preço Sugerido'] = np.nan
+        st.dataframe(
+            formatar_colunas_brl(resumo_cenarios, ['Preço Sugerido', 'Δ Preço', 'Lucro no Preço Atual', 'Δ Lucro']),
+            use_container_width=True,
+            hide_index=True
+        )
+        st.caption(
+            "**Preço Sugerido**: preço que mantém o lucro desejado da Aba 1 no cenário. "
+            "**Lucro no Preço Atual**: quanto sobra se o preço sugerido hoje for mantido."
+        )
+
+
+# ==========================================================================
+# --- GRAVAÇÃO NO ARMAZENAMENTO LOCAL ---
+# ==========================================================================
+# As edições do rerun já foram aplicadas: reavalia as entradas do grafo e grava,
+# numa única transação, só as partes cuja versão mudou desde a última gravação.
+if banco:
+    with instrumentacao.fase('gravacao_banco'):
+        grafo.entrada('insumos_base', st.session_state.insumos_base)
+        grafo.entrada('materiais_produto', st.session_state.materiais_produto)
+        grafo.entrada('custos_venda', st.session_state.custos_venda)
+        versoes_salvas = st.session_state.versoes_salvas
+        alteradas = {
+            nome: grafo.versao(nome)
+            for nome in ('insumos_base', 'materiais_produto', 'custos_venda')
+            if versoes_salvas.get(nome) != grafo.versao(nome)
+        }
+        if alteradas:
+            versoes_banco = st.session_state.setdefault('versoes_banco', {})
+            try:
+                versoes_banco.update(banco.salvar(
+                    espaco,
+                    insumos=st.session_state.insumos_base if 'insumos_base' in alteradas else None,
+                    materiais=st.session_state.materiais_produto if 'materiais_produto' in alteradas else None,
+                    configuracao={'custos_venda': st.session_state.custos_venda} if 'custos_venda' in alteradas else None,
+                    versoes=versoes_banco,
+                ))
+            except ConflitoGravacao as conflito:
+                # Outra sessão gravou depois da nossa leitura: nada foi gravado; o usuário decide
+                st.session_state.conflito_banco = conflito.versoes
+                with aviso_banco.container():
+                    st.warning(
+                        "⚠️ **Dados alterados em outra sessão.** Suas últimas edições não foram salvas "
+                        "porque outra sessão gravou os mesmos dados depois que você os carregou."
+                    )
+                    col_recarregar, col_manter = st.columns(2)
+                    with col_recarregar:
+                        st.button("🔄 Recarregar dados salvos", on_click=recarregar_do_banco, use_container_width=True)
+                    with col_manter:
+                        st.button("💾 Manter minhas edições", on_click=sobrescrever_banco, use_container_width=True)
+            else:
+                st.session_state.pop('conflito_banco', None)
+                versoes_salvas.update(alteradas)
+
+
+# ==========================================================================
+# --- PAINEL DE DESEMPENHO (só com a instrumentação ativa) ---
+# ==========================================================================
+fases_rerun = instrumentacao.finalizar_rerun()
+if fases_rerun:
+    with st.sidebar:
+        st.header("⏱️ Desempenho do Rerun")
+        st.dataframe(
+            pd.DataFrame(fases_rerun, columns=['Fase', 'Segundos']).set_index('Fase').style.format({'Segundos': '{:.4f}'}),
+            use_container_width=True
+        )
+        estatisticas_cache = cache_precificacao.estatisticas()
+        st.caption(
+            f"Cache de precificação: {estatisticas_cache['acertos']} acertos / {estatisticas_cache['faltas']} faltas "
+            f"({estatisticas_cache['taxa_acerto']:.0%})"
+        )
+        with st.expander("Métricas do processo (Prometheus)"):
+            st.code(instrumentacao.texto_prometheus(), language=None)
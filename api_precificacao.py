@@ -0,0 +1,415 @@
+"""API HTTP de precificação (ASGI) para outros sistemas da loja (loja virtual, ERP).
+
+Expõe o mesmo cálculo da Aba 1 (`calcular_preco_sugerido_lucro_fixo`) sem a
+interface do Streamlit. Os perfis de taxas são carregados uma única vez por
+processo e ficam pré-processados em memória entre as requisições.
+
+Rotas:
+    GET  /saude      status e perfis carregados
+    GET  /perfis     perfis de taxas (dicts no formato de perfis_taxas.py)
+    POST /preco      um produto (objeto JSON) -> objeto JSON
+    POST /precos     vários produtos: lista JSON (ou {"itens": [...]}) ou NDJSON
+                     (Content-Type: application/x-ndjson, um produto por linha).
+                     NDJSON é lido e respondido em blocos, sem carregar o corpo
+                     todo; a resposta sai em NDJSON se a entrada for NDJSON ou se
+                     o cliente pedir (Accept: application/x-ndjson). Em NDJSON
+                     de entrada o status 200 sai antes do fim: um erro no meio
+                     vira uma última linha {"erro": ...}.
+    GET  /metrics    métricas Prometheus (com CALC_INSTRUMENTACAO=1)
+
+Campos de cada produto:
+    custo_material_total       obrigatório (R$)
+    lucro_fixo_desejado        obrigatório (R$)
+    custo_fixo_mo_embalagem    opcional, padrão vem do perfil (ou 0)
+    perfil                     nome do perfil; opcional se houver 'padrao' ou um só perfil
+    sku                        opcional, devolvido na resposta
+
+Perfis: arquivo JSON (--perfis ou CALC_PERFIS) com uma lista de perfis (cada um
+com 'nome') ou um dict {nome: perfil}; e, se houver armazenamento local
+(CALC_BANCO), os custos de venda salvos pela calculadora viram o perfil 'padrao'.
+
+Exemplos:
+    python api_precificacao.py --perfis perfis.json --porta 8600 --workers 4
+    uvicorn api_precificacao:app --port 8600
+    curl -s localhost:8600/preco -d '{"custo_material_total": 12.5, "lucro_fixo_desejado": 5}'
+
+Requer um servidor ASGI (`pip install uvicorn`); o módulo em si só usa a
+biblioteca padrão e NumPy. Ver carga_api.py para o teste de carga.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+
+import numpy as np
+
+import instrumentacao
+from banco_local import BancoLocal, ESPACO_PADRAO
+from perfis_taxas import PerfilTaxas
+from precificacao import calcular_lucro_real, calcular_preco_sugerido_lucro_fixo
+from precificacao_lote import COMPONENTES_MP
+
+PERFIL_PADRAO = 'padrao'
+LIMITE_CORPO = 64 * 1024 * 1024      # bytes aceitos em /preco e /precos com JSON (NDJSON é lido em blocos)
+BLOCO_NDJSON = 5_000                 # produtos por bloco calculado/enviado em NDJSON
+MINIMO_THREAD = 2_000                # lotes a partir deste tamanho são calculados fora do loop de eventos
+
+CAMPOS_RESULTADO = (
+    'preco_sugerido', 'valido', 'lucro_real', 'margem_real', 'custo_total_venda', 'custo_producao_base',
+    'valor_taxa_imposto', 'valor_taxa_comissao', 'valor_taxa_por_item', 'valor_custo_frete',
+)
+
+
+class ErroRequisicao(ValueError):
+    """Entrada inválida (vira HTTP 400, ou um item com 'erro' no lote)."""
+
+
+# --- Perfis ---
+
+def carregar_perfis(caminho=None, banco=None, espaco=ESPACO_PADRAO):
+    """{nome: perfil} a partir do arquivo JSON e/ou dos custos de venda salvos no armazenamento local."""
+    perfis = {}
+    if banco is not None:
+        custos_venda = banco.carregar_configuracao('custos_venda', espaco)
+        if custos_venda:
+            perfis[PERFIL_PADRAO] = {'nome': PERFIL_PADRAO, **custos_venda}
+    if caminho:
+        with open(caminho, encoding='utf-8') as f:
+            dados = json.load(f)
+        if isinstance(dados, dict):
+            dados = [{'nome': nome, **perfil} for nome, perfil in dados.items()]
+        for perfil in dados:
+            perfis[perfil['nome']] = perfil
+    return perfis
+
+
+def _perfil_simples(perfil):
+    """Sem faixas nem mínimo/teto: vale a fórmula fechada de precificacao.py."""
+    return not any(
+        chave in perfil[componente] for componente in COMPONENTES_MP for chave in ('faixas', 'minimo', 'maximo')
+    )
+
+
+class _PerfilCarregado:
+    __slots__ = ('perfil', 'taxas', 'simples', 'tx_imposto', 'custo_fixo')
+
+    def __init__(self, perfil):
+        self.perfil = perfil
+        self.taxas = PerfilTaxas(perfil)
+        self.simples = _perfil_simples(perfil)
+        self.tx_imposto = float(perfil.get('taxa_imposto', 0.0))
+        self.custo_fixo = float(perfil.get('custo_fixo_mo_embalagem', 0.0))
+
+
+class ServicoPrecificacao:
+    """Perfis pré-processados uma vez e o cálculo de preços (unitário e em lote) sobre eles."""
+
+    def __init__(self, perfis):
+        self.perfis = {nome: _PerfilCarregado(perfil) for nome, perfil in perfis.items()}
+
+    def _perfil(self, item):
+        nome = item.get('perfil')
+        if nome is None:
+            if PERFIL_PADRAO in self.perfis:
+                nome = PERFIL_PADRAO
+            elif len(self.perfis) == 1:
+                nome = next(iter(self.perfis))
+            else:
+                raise ErroRequisicao("Informe o 'perfil' (nenhum perfil padrão carregado).")
+        if nome not in self.perfis:
+            raise ErroRequisicao(f"Perfil '{nome}' não existe.")
+        return nome, self.perfis[nome]
+
+    def _entrada(self, item):
+        """(nome do perfil, perfil, custo de material, custo fixo, lucro desejado) de um produto."""
+        if not isinstance(item, dict):
+            raise ErroRequisicao("Cada produto deve ser um objeto JSON.")
+        nome, carregado = self._perfil(item)
+        try:
+            custo_material = float(item['custo_material_total'])
+            lucro = float(item['lucro_fixo_desejado'])
+            custo_fixo = float(item.get('custo_fixo_mo_embalagem', carregado.custo_fixo))
+        except KeyError as e:
+            raise ErroRequisicao(f"Campo '{e.args[0]}' ausente.") from None
+        except (TypeError, ValueError):
+            raise ErroRequisicao("Valores devem ser numéricos.") from None
+        # float() aceita 'nan'/'inf' (e o JSON, NaN/Infinity): a resposta sairia inválida e com "valido": true
+        if not all(math.isfinite(v) for v in (custo_material, custo_fixo, lucro)):
+            raise ErroRequisicao("Valores devem ser números finitos.")
+        return nome, carregado, custo_material, custo_fixo, lucro
+
+    def precificar(self, item):
+        """Um produto. Perfis simples usam as funções escalares da Aba 1; com faixas, PerfilTaxas."""
+        nome, carregado, custo_material, custo_fixo, lucro = self._entrada(item)
+        if not carregado.simples:
+            return self.precificar_lote([item])[0]
+
+        preco, status = calcular_preco_sugerido_lucro_fixo(custo_material, custo_fixo, carregado.tx_imposto, carregado.perfil, lucro)
+        (custo_total_venda, _, lucro_real, valor_taxa_imposto, custo_producao_base,
+         valor_taxa_comissao, valor_taxa_por_item, valor_custo_frete) = calcular_lucro_real(
+            preco, custo_material, custo_fixo, carregado.tx_imposto, carregado.perfil
+        )
+        resultado = {'sku': item['sku']} if 'sku' in item else {}
+        resultado.update({
+            'perfil': nome,
+            'preco_sugerido': preco,
+            'valido': status == 'ok',
+            'lucro_real': lucro_real,
+            'margem_real': lucro_real / preco * 100 if preco > 0 else 0.0,
+            'custo_total_venda': custo_total_venda,
+            'custo_producao_base': custo_producao_base,
+            'valor_taxa_imposto': valor_taxa_imposto,
+            'valor_taxa_comissao': valor_taxa_comissao,
+            'valor_taxa_por_item': valor_taxa_por_item,
+            'valor_custo_frete': valor_custo_frete,
+        })
+        return resultado
+
+    def precificar_lote(self, itens):
+        """Vários produtos, vetorizado por perfil. Itens inválidos voltam com 'erro' na mesma posição."""
+        n = len(itens)
+        custo_material, custo_fixo, lucro = np.zeros(n), np.zeros(n), np.zeros(n)
+        nomes, erros, grupos = [None] * n, {}, {}
+        for i, item in enumerate(itens):
+            try:
+                nomes[i], _, custo_material[i], custo_fixo[i], lucro[i] = self._entrada(item)
+            except ErroRequisicao as e:
+                erros[i] = str(e)
+            else:
+                grupos.setdefault(nomes[i], []).append(i)
+
+        colunas = {campo: np.zeros(n, dtype=bool if campo == 'valido' else np.float64) for campo in CAMPOS_RESULTADO}
+        for nome, indices in grupos.items():
+            perfil = self.perfis[nome].taxas
+            indices = np.array(indices)
+            preco, valido = perfil.preco_sugerido(custo_material[indices] + custo_fixo[indices], lucro[indices])
+            detalhamento = perfil.lucro_real(preco, custo_material[indices], custo_fixo[indices])
+            colunas['preco_sugerido'][indices] = preco
+            colunas['valido'][indices] = valido
+            colunas['margem_real'][indices] = np.divide(
+                detalhamento['lucro_real'] * 100, preco, out=np.zeros(len(indices)), where=preco > 0
+            )
+            for campo in CAMPOS_RESULTADO[2:]:
+                if campo != 'margem_real':
+                    colunas[campo][indices] = detalhamento[campo]
+
+        listas = [colunas[campo].tolist() for campo in CAMPOS_RESULTADO]
+        resultados = []
+        for i, (item, valores) in enumerate(zip(itens, zip(*listas))):
+            resultado = {'sku': item['sku']} if isinstance(item, dict) and 'sku' in item else {}
+            if i in erros:
+                resultado['erro'] = erros[i]
+            else:
+                resultado['perfil'] = nomes[i]
+                resultado.update(zip(CAMPOS_RESULTADO, valores))
+            resultados.append(resultado)
+        return resultados
+
+
+# --- HTTP (ASGI puro, sem framework) ---
+
+def _json(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _cabecalho(scope, nome):
+    for chave, valor in scope['headers']:
+        if chave == nome:
+            return valor.decode('latin-1').lower()
+    return ''
+
+
+async def _responder(send, status, corpo, tipo=b'application/json'):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', tipo), (b'content-length', str(len(corpo)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': corpo})
+
+
+async def _ler_corpo(receive):
+    partes, tamanho = [], 0
+    while True:
+        mensagem = await receive()
+        if mensagem['type'] == 'http.disconnect':
+            raise ConnectionError("Cliente desconectou.")
+        parte = mensagem.get('body', b'')
+        tamanho += len(parte)
+        if tamanho > LIMITE_CORPO:
+            raise ErroRequisicao(f"Corpo maior que {LIMITE_CORPO} bytes; envie em NDJSON.")
+        partes.append(parte)
+        if not mensagem.get('more_body', False):
+            return b''.join(partes)
+
+
+async def _linhas_ndjson(receive):
+    """Gera as linhas (bytes) do corpo NDJSON conforme os pedaços chegam."""
+    resto = b''
+    while True:
+        mensagem = await receive()
+        if mensagem['type'] == 'http.disconnect':
+            raise ConnectionError("Cliente desconectou.")
+        *linhas, resto = (resto + mensagem.get('body', b'')).split(b'\n')
+        for linha in linhas:
+            yield linha
+        if not mensagem.get('more_body', False):
+            if resto:
+                yield resto
+            return
+
+
+def _decodificar_ndjson(linhas):
+    itens = []
+    for linha in linhas:
+        try:
+            itens.append(json.loads(linha))
+        except ValueError:
+            itens.append(None)  # vira um item com 'erro' na resposta
+    return itens
+
+
+class AplicacaoPrecificacao:
+    """Aplicação ASGI. Os perfis são carregados na inicialização (lifespan) ou na primeira requisição."""
+
+    def __init__(self, perfis=None):
+        self._perfis = perfis
+        self.servico = None
+
+    def carregar(self):
+        if self.servico is None:
+            perfis = self._perfis
+            if perfis is None:
+                caminho_banco = os.environ.get('CALC_BANCO', '')
+                banco = BancoLocal(caminho_banco) if caminho_banco and os.path.exists(caminho_banco) else None
+                try:
+                    perfis = carregar_perfis(os.environ.get('CALC_PERFIS'), banco, os.environ.get('CALC_ESPACO', ESPACO_PADRAO))
+                finally:
+                    if banco is not None:
+                        banco.fechar()
+            self.servico = ServicoPrecificacao(perfis)
+        return self.servico
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        servico = self.carregar()
+        rota = (scope['method'], scope['path'].rstrip('/') or '/')
+        instrumentacao.incrementar('api_requisicoes', rota=rota[1])
+        try:
+            if rota == ('POST', '/preco'):
+                item = json.loads(await _ler_corpo(receive) or b'null')
+                await _responder(send, 200, _json(servico.precificar(item)))
+            elif rota == ('POST', '/precos'):
+                await self._precos(scope, receive, send, servico)
+            elif rota == ('GET', '/saude'):
+                await _responder(send, 200, _json({'status': 'ok', 'perfis': list(servico.perfis)}))
+            elif rota == ('GET', '/perfis'):
+                await _responder(send, 200, _json([p.perfil for p in servico.perfis.values()]))
+            elif rota == ('GET', '/metrics'):
+                await _responder(send, 200, instrumentacao.texto_prometheus().encode('utf-8'), b'text/plain; version=0.0.4')
+            else:
+                await _responder(send, 404, _json({'erro': 'Rota não encontrada.'}))
+        except ValueError as e:
+            # ErroRequisicao e JSON malformado (json.JSONDecodeError)
+            await _responder(send, 400, _json({'erro': str(e)}))
+        except ConnectionError:
+            pass
+
+    async def _precos(self, scope, receive, send, servico):
+        entrada_ndjson = 'ndjson' in _cabecalho(scope, b'content-type')
+        if not entrada_ndjson:
+            dados = json.loads(await _ler_corpo(receive) or b'[]')
+            itens = dados.get('itens') if isinstance(dados, dict) else dados
+            if not isinstance(itens, list):
+                raise ErroRequisicao("Envie uma lista de produtos (ou {\"itens\": [...]}).")
+            resultados = await _calcular(servico, itens)
+            if 'ndjson' in _cabecalho(scope, b'accept'):
+                await _responder(send, 200, _linhas_json(resultados), b'application/x-ndjson')
+            else:
+                await _responder(send, 200, _json({'resultados': resultados}))
+            return
+
+        # NDJSON: cada bloco é calculado e enviado assim que chega (resposta em chunked).
+        # Depois do http.response.start não dá mais para trocar o status: um erro no meio
+        # do fluxo vira uma última linha {"erro": ...} e a resposta é encerrada.
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-type', b'application/x-ndjson')]})
+        bloco = []
+        try:
+            async for linha in _linhas_ndjson(receive):
+                if linha.strip():
+                    bloco.append(linha)
+                if len(bloco) >= BLOCO_NDJSON:
+                    await send({'type': 'http.response.body', 'body': _linhas_json(await _calcular(servico, _decodificar_ndjson(bloco))), 'more_body': True})
+                    bloco = []
+            corpo = _linhas_json(await _calcular(servico, _decodificar_ndjson(bloco))) if bloco else b''
+        except ConnectionError:
+            raise
+        except ValueError as e:
+            await send({'type': 'http.response.body', 'body': _json({'erro': str(e)}) + b'\n'})
+            return
+        except Exception:
+            # Erro inesperado: fecha a resposta e deixa o servidor registrar a exceção
+            await send({'type': 'http.response.body', 'body': _json({'erro': 'Erro interno; resposta incompleta.'}) + b'\n'})
+            raise
+        await send({'type': 'http.response.body', 'body': corpo})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            mensagem = await receive()
+            if mensagem['type'] == 'lifespan.startup':
+                try:
+                    self.carregar()
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif mensagem['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+async def _calcular(servico, itens):
+    # Lotes grandes são NumPy puro: numa thread, o loop segue atendendo outras requisições
+    if len(itens) >= MINIMO_THREAD:
+        return await asyncio.to_thread(servico.precificar_lote, itens)
+    return servico.precificar_lote(itens)
+
+
+def _linhas_json(resultados):
+    return b''.join(_json(r) + b'\n' for r in resultados)
+
+
+app = AplicacaoPrecificacao()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API HTTP de precificação (ASGI).")
+    parser.add_argument('--perfis', help="JSON com os perfis de taxas (lista ou {nome: perfil}).")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8600)
+    parser.add_argument('--workers', type=int, default=1, help="Processos do servidor (cada um carrega os perfis uma vez).")
+    args = parser.parse_args(argv)
+
+    try:
+        import uvicorn
+    except ImportError:
+        print("Erro: a API requer um servidor ASGI (pip install uvicorn).", file=sys.stderr)
+        return 1
+    if args.perfis:
+        os.environ['CALC_PERFIS'] = args.perfis
+    if not app.carregar().perfis:
+        print("Erro: nenhum perfil de taxas carregado (use --perfis ou CALC_BANCO).", file=sys.stderr)
+        return 1
+    uvicorn.run('api_precificacao:app', host=args.host, port=args.porta, workers=args.workers,
+                log_level='warning', access_log=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+# --- Backup Binário (Colunar) ---
+#
+# Alternativa compacta ao backup JSON da Aba 4 para catálogos grandes. As
+# tabelas colunares (tabela_colunar.py) são gravadas como blocos de arrays, sem
+# passar registro a registro por dicts/JSON. O JSON continua sendo o formato
+# padrão e a restauração aceita os dois.
+#
+# Layout (versão 1):
+#   MAGIC (6 bytes) | versão (uint16 LE) | corpo comprimido com zlib:
+#     tamanho do cabeçalho (uint32 LE) | cabeçalho JSON (custos_venda + schema)
+#     para cada tabela, na ordem do cabeçalho:
+#       para cada campo de texto: tamanhos (uint32[k]) | strings UTF-8 concatenadas
+#       para cada coluna: bytes crus do array (little-endian)
+
+import json
+import struct
+import zlib
+
+import numpy as np
+
+from tabela_colunar import tabela_insumos, tabela_materiais
+
+MAGIC = b'CALCBK'
+VERSAO = 1
+TAMANHO_LEITURA = 1 << 16
+
+TABELAS = {
+    'insumos_base': tabela_insumos,
+    'materiais_produto': tabela_materiais,
+}
+
+
+def e_backup_binario(conteudo):
+    """True se os bytes iniciais são de um backup binário."""
+    return bytes(conteudo[:len(MAGIC)]) == MAGIC
+
+
+def _como_tabela(nome, dados):
+    if hasattr(dados, 'exportar_colunas'):
+        return dados
+    return TABELAS[nome](dados)
+
+
+def criar_backup_binario(insumos_base, materiais_produto, custos_venda, nivel=6):
+    """Gera os bytes do backup binário. Aceita tabelas colunares ou listas de dicts."""
+    cabecalho = {'custos_venda': custos_venda, 'tabelas': []}
+    blocos = []
+    for nome, dados in (('insumos_base', insumos_base), ('materiais_produto', materiais_produto)):
+        tabela = _como_tabela(nome, dados)
+        colunas, strings = tabela.exportar_colunas()
+        descricao = {
+            'nome': nome,
+            'linhas': len(tabela),
+            'colunas': [{'campo': campo, 'dtype': colunas[campo].dtype.newbyteorder('<').str} for campo in tabela.campos],
+            'strings': {campo: len(lista) for campo, lista in strings.items()},
+            'categorias': tabela.categorias(),
+        }
+        cabecalho['tabelas'].append(descricao)
+
+        for campo, lista in strings.items():
+            codificadas = [s.encode('utf-8') for s in lista]
+            blocos.append(np.array([len(s) for s in codificadas], dtype='<u4').tobytes())
+            blocos.append(b''.join(codificadas))
+        for coluna in descricao['colunas']:
+            blocos.append(colunas[coluna['campo']].astype(coluna['dtype'], copy=False).tobytes())
+
+    cabecalho_bytes = json.dumps(cabecalho, separators=(',', ':')).encode('utf-8')
+    compressor = zlib.compressobj(nivel)
+    partes = [MAGIC, struct.pack('<H', VERSAO)]
+    partes.append(compressor.compress(struct.pack('<I', len(cabecalho_bytes)) + cabecalho_bytes))
+    for bloco in blocos:
+        partes.append(compressor.compress(bloco))
+    partes.append(compressor.flush())
+    return b''.join(partes)
+
+
+class _LeitorComprimido:
+    """Lê quantidades exatas de bytes descomprimindo o arquivo aos poucos."""
+
+    def __init__(self, arquivo):
+        self._arquivo = arquivo
+        self._descompressor = zlib.decompressobj()
+        self._buffer = bytearray()
+
+    def ler(self, n):
+        while len(self._buffer) < n:
+            pedaco = self._arquivo.read(TAMANHO_LEITURA)
+            if not pedaco:
+                self._buffer += self._descompressor.flush()
+                if len(self._buffer) < n:
+                    raise ValueError("Backup binário truncado.")
+                break
+            self._buffer += self._descompressor.decompress(pedaco)
+        dados = bytes(self._buffer[:n])
+        del self._buffer[:n]
+        return dados
+
+
+def carregar_backup_binario(arquivo):
+    """Lê um backup binário de um arquivo aberto em modo binário (ou BytesIO).
+
+    Retorna um dict com 'insumos_base' e 'materiais_produto' (tabelas colunares)
+    e 'custos_venda', no mesmo formato usado pelo session state.
+    """
+    if arquivo.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Arquivo não é um backup binário da calculadora.")
+    (versao,) = struct.unpack('<H', arquivo.read(2))
+    if versao > VERSAO:
+        raise ValueError(f"Versão {versao} do backup binário não suportada (máximo: {VERSAO}).")
+
+    leitor = _LeitorComprimido(arquivo)
+    (tamanho,) = struct.unpack('<I', leitor.ler(4))
+    cabecalho = json.loads(leitor.ler(tamanho).decode('utf-8'))
+
+    data = {'custos_venda': cabecalho.get('custos_venda', {})}
+    for descricao in cabecalho['tabelas']:
+        n = descricao['linhas']
+        strings = {}
+        for campo, k in descricao['strings'].items():
+            tamanhos = np.frombuffer(leitor.ler(4 * k), dtype='<u4')
+            blob = leitor.ler(int(tamanhos.sum()))
+            fins = np.cumsum(tamanhos).tolist()
+            strings[campo] = [blob[i:f].decode('utf-8') for i, f in zip([0] + fins[:-1], fins)]
+        colunas = {}
+        for coluna in descricao['colunas']:
+            dtype = np.dtype(coluna['dtype'])
+            colunas[coluna['campo']] = np.frombuffer(leitor.ler(n * dtype.itemsize), dtype=dtype)
+
+        tabela = TABELAS[descricao['nome']]()
+        tabela.importar_colunas(colunas, strings, descricao.get('categorias'))
+        data[descricao['nome']] = tabela
+    return data
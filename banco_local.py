@@ -0,0 +1,209 @@
+# --- Armazenamento Local Persistente (SQLite) ---
+#
+# Guarda insumos, materiais do produto e custos de venda entre sessões, para
+# não depender do download/upload do backup JSON a cada visita. Cada "espaço"
+# (ex.: um por loja ou por usuário) tem seus próprios dados. A conexão é única
+# por processo (a interface a guarda com st.cache_resource) e protegida por uma
+# trava; cada rerun grava numa única transação, só as partes que mudaram.
+#
+# Cada parte (insumos, materiais de um produto, cada chave de configuração) tem
+# um número de versão, incrementado a cada gravação. Quem grava informa a
+# versão que leu; se outra sessão gravou nesse meio-tempo, nada é gravado e
+# ConflitoGravacao informa as partes em conflito (em vez de sobrescrever as
+# edições da outra sessão com uma cópia desatualizada).
+
+import json
+import sqlite3
+import threading
+
+import numpy as np
+
+from tabela_colunar import tabela_insumos, tabela_materiais
+
+ESPACO_PADRAO = 'padrao'
+PRODUTO_PADRAO = 'produto_atual'
+PARTE_INSUMOS = 'insumos'
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS insumos (
+    espaco TEXT NOT NULL,
+    posicao INTEGER NOT NULL,
+    nome TEXT NOT NULL,
+    valor_pacote REAL NOT NULL,
+    qtd_pacote REAL NOT NULL,
+    unidade TEXT NOT NULL,
+    PRIMARY KEY (espaco, posicao)
+);
+CREATE INDEX IF NOT EXISTS idx_insumos_nome ON insumos (espaco, nome);
+
+CREATE TABLE IF NOT EXISTS materiais (
+    espaco TEXT NOT NULL,
+    produto_id TEXT NOT NULL,
+    posicao INTEGER NOT NULL,
+    nome TEXT NOT NULL,
+    custo_unidade REAL NOT NULL,
+    qtd_usada REAL NOT NULL,
+    PRIMARY KEY (espaco, produto_id, posicao)
+);
+CREATE INDEX IF NOT EXISTS idx_materiais_nome ON materiais (espaco, nome);
+
+CREATE TABLE IF NOT EXISTS configuracao (
+    espaco TEXT NOT NULL,
+    chave TEXT NOT NULL,
+    valor TEXT NOT NULL,
+    PRIMARY KEY (espaco, chave)
+);
+
+CREATE TABLE IF NOT EXISTS versoes (
+    espaco TEXT NOT NULL,
+    parte TEXT NOT NULL,
+    versao INTEGER NOT NULL,
+    PRIMARY KEY (espaco, parte)
+);
+"""
+
+
+def parte_materiais(produto_id=PRODUTO_PADRAO):
+    return f'materiais/{produto_id}'
+
+
+def parte_configuracao(chave):
+    return f'configuracao/{chave}'
+
+
+class ConflitoGravacao(Exception):
+    """Outra sessão gravou as partes depois da versão lida; `versoes` tem as versões atuais delas."""
+
+    def __init__(self, versoes):
+        self.versoes = versoes
+        super().__init__(f"Partes alteradas por outra sessão: {', '.join(versoes)}")
+
+
+class BancoLocal:
+    """Conexão SQLite compartilhada com leituras por parte e gravações em lote."""
+
+    def __init__(self, caminho):
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._trava = threading.RLock()
+        with self._trava, self._conexao:
+            self._conexao.execute('PRAGMA journal_mode=WAL')
+            self._conexao.execute('PRAGMA synchronous=NORMAL')
+            self._conexao.executescript(ESQUEMA)
+
+    def fechar(self):
+        with self._trava:
+            self._conexao.close()
+
+    # --- Leitura (cada parte é carregada só quando pedida) ---
+
+    def _consultar(self, sql, parametros):
+        with self._trava:
+            return self._conexao.execute(sql, parametros).fetchall()
+
+    def carregar_insumos(self, espaco=ESPACO_PADRAO):
+        """Tabela colunar de insumos do espaço, ou None se nada foi salvo ainda."""
+        linhas = self._consultar(
+            'SELECT nome, valor_pacote, qtd_pacote, unidade FROM insumos WHERE espaco = ? ORDER BY posicao',
+            (espaco,)
+        )
+        if not linhas:
+            return None
+        nomes, valores, qtds, unidades = zip(*linhas)
+        distintas = list(dict.fromkeys(unidades))
+        codigos_unidade = {unidade: i for i, unidade in enumerate(distintas)}
+        tabela = tabela_insumos()
+        tabela.importar_colunas(
+            {
+                'nome': np.arange(len(nomes)),
+                'valor_pacote': np.array(valores, dtype=np.float64),
+                'qtd_pacote': np.array(qtds, dtype=np.float64),
+                'unidade': np.array([codigos_unidade[u] for u in unidades]),
+            },
+            {'nome': list(nomes)},
+            {'unidade': distintas},
+        )
+        return tabela
+
+    def carregar_materiais(self, espaco=ESPACO_PADRAO, produto_id=PRODUTO_PADRAO):
+        """Tabela colunar de materiais do produto, ou None se nada foi salvo ainda."""
+        linhas = self._consultar(
+            'SELECT nome, custo_unidade, qtd_usada FROM materiais WHERE espaco = ? AND produto_id = ? ORDER BY posicao',
+            (espaco, produto_id)
+        )
+        if not linhas:
+            return None
+        nomes, custos, qtds = zip(*linhas)
+        tabela = tabela_materiais()
+        tabela.importar_colunas(
+            {
+                'nome': np.arange(len(nomes)),
+                'custo_unidade': np.array(custos, dtype=np.float64),
+                'qtd_usada': np.array(qtds, dtype=np.float64),
+            },
+            {'nome': list(nomes)},
+        )
+        return tabela
+
+    def carregar_configuracao(self, chave, espaco=ESPACO_PADRAO):
+        """Valor JSON salvo em `chave` (ex.: 'custos_venda'), ou None."""
+        linhas = self._consultar('SELECT valor FROM configuracao WHERE espaco = ? AND chave = ?', (espaco, chave))
+        return json.loads(linhas[0][0]) if linhas else None
+
+    def versao(self, parte, espaco=ESPACO_PADRAO):
+        """Versão gravada da parte (0 se nunca foi gravada)."""
+        linhas = self._consultar('SELECT versao FROM versoes WHERE espaco = ? AND parte = ?', (espaco, parte))
+        return linhas[0][0] if linhas else 0
+
+    def carregar_com_versao(self, carregar, parte, espaco=ESPACO_PADRAO):
+        """(valor, versão) de `carregar(espaco)` lidos sem gravação de outra sessão no meio."""
+        with self._trava:
+            return carregar(espaco), self.versao(parte, espaco)
+
+    # --- Gravação em lote ---
+
+    def salvar(self, espaco=ESPACO_PADRAO, insumos=None, materiais=None, configuracao=None, produto_id=PRODUTO_PADRAO,
+               versoes=None):
+        """Grava numa única transação as partes informadas (as omitidas ficam como estão).
+
+        `versoes` ({parte: versão lida}) liga a verificação de conflito: se alguma
+        parte gravada estiver em outra versão no banco, nada é gravado e sobe
+        ConflitoGravacao. Retorna {parte: nova versão} das partes gravadas.
+        """
+        partes = ([PARTE_INSUMOS] if insumos is not None else []) \
+            + ([parte_materiais(produto_id)] if materiais is not None else []) \
+            + [parte_configuracao(chave) for chave in (configuracao or {})]
+        with self._trava, self._conexao:
+            atuais = {parte: self.versao(parte, espaco) for parte in partes}
+            if versoes is not None:
+                conflitos = {parte: v for parte, v in atuais.items() if versoes.get(parte, 0) != v}
+                if conflitos:
+                    raise ConflitoGravacao(conflitos)
+            if insumos is not None:
+                self._conexao.execute('DELETE FROM insumos WHERE espaco = ?', (espaco,))
+                self._conexao.executemany(
+                    'INSERT INTO insumos VALUES (?, ?, ?, ?, ?, ?)',
+                    ((espaco, i, r['nome'], r['valor_pacote'], r['qtd_pacote'], r['unidade'])
+                     for i, r in enumerate(_registros(insumos)))
+                )
+            if materiais is not None:
+                self._conexao.execute('DELETE FROM materiais WHERE espaco = ? AND produto_id = ?', (espaco, produto_id))
+                self._conexao.executemany(
+                    'INSERT INTO materiais VALUES (?, ?, ?, ?, ?, ?)',
+                    ((espaco, produto_id, i, r['nome'], r['custo_unidade'], r['qtd_usada'])
+                     for i, r in enumerate(_registros(materiais)))
+                )
+            for chave, valor in (configuracao or {}).items():
+                self._conexao.execute(
+                    'INSERT OR REPLACE INTO configuracao VALUES (?, ?, ?)',
+                    (espaco, chave, json.dumps(valor))
+                )
+            self._conexao.executemany(
+                'INSERT OR REPLACE INTO versoes VALUES (?, ?, ?)',
+                ((espaco, parte, versao + 1) for parte, versao in atuais.items())
+            )
+        return {parte: versao + 1 for parte, versao in atuais.items()}
+
+
+def _registros(dados):
+    # Tabelas colunares viram dicts de uma vez (evita uma visão por célula)
+    return dados.para_dicts() if hasattr(dados, 'para_dicts') else dados
@@ -0,0 +1,289 @@
+"""Benchmarks das funções de precificação e do caminho de rerun da aplicação.
+
+Mede tempo por chamada (menor e mediana de várias repetições, com o GC
+desligado, como o `timeit`) e pico de memória (tracemalloc) de:
+    - chamadas escalares de calcular_lucro_real / calcular_preco_sugerido_lucro_fixo
+    - agregação de insumos e materiais com 10 / 1k / 100k linhas
+    - backup JSON e binário (criação e leitura) e o resumo CSV da Aba 4
+    - precificação vetorizada do catálogo (float e modo exato em centavos)
+    - busca do preço ótimo com demanda de elasticidade constante (grade e seção áurea)
+    - formatação BRL valor a valor e em lote
+    - uma execução completa e sem interface de Calculadora.py (AppTest do Streamlit)
+
+Exemplos:
+    python benchmark.py
+    python benchmark.py --salvar bench_base.json
+    python benchmark.py --comparar bench_base.json --limite 1.25
+    python benchmark.py --filtro backup --tamanhos 10 1000
+
+Com --filtro, só os dados sintéticos dos casos selecionados são gerados. A
+execução via AppTest roda sem armazenamento local (CALC_BANCO vazio), para
+medir sempre o caminho frio.
+
+Com --comparar, a saída é 1 se algum caso ficar mais lento (ou usar mais
+memória) que `limite` vezes a referência. Diferenças absolutas muito pequenas
+(TOLERANCIA_TEMPO_S / TOLERANCIA_MEMORIA_BYTES) são tratadas como ruído.
+"""
+import argparse
+import functools
+import gc
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from catalogo_insumos import CatalogoInsumos
+from exportacao import convert_data_to_csv, criar_backup_json, ler_backup
+from backup_binario import criar_backup_binario
+from precificacao import (
+    calcular_custo_total_materiais,
+    calcular_insumos_unitarios,
+    calcular_lucro_real,
+    calcular_preco_sugerido_lucro_fixo,
+    formatar_brl,
+)
+from precificacao_centavos import precificar_catalogo_centavos
+from precificacao_lote import formatar_brl_lote, precificar_catalogo
+from preco_otimo import DemandaElasticidade, otimizar_precos
+from tabela_colunar import tabela_insumos, tabela_materiais
+
+TAMANHOS_PADRAO = (10, 1_000, 100_000)
+TEMPO_MINIMO_LOTE = 0.05
+# Diferenças absolutas abaixo destes valores são ruído e nunca contam como regressão
+TOLERANCIA_TEMPO_S = 50e-6
+TOLERANCIA_MEMORIA_BYTES = 64 * 1024
+
+CUSTOS_VENDA = {
+    'custo_fixo_mo_embalagem': 2.50,
+    'preco_venda': 100.00,
+    'taxa_imposto': 4.0,
+    'taxa_comissao': {'tipo': 'percentual', 'valor': 15.0},
+    'taxa_por_item': {'tipo': 'fixo', 'valor': 3.00},
+    'custo_frete': {'tipo': 'fixo', 'valor': 15.00},
+}
+
+
+def medir(funcao, repeticoes=5):
+    """Retorna (menor, mediana) do tempo por chamada e o pico de memória de uma chamada."""
+    # Calibra quantas chamadas por lote para cada lote durar pelo menos TEMPO_MINIMO_LOTE
+    chamadas = 1
+    while True:
+        inicio = time.perf_counter()
+        for _ in range(chamadas):
+            funcao()
+        if time.perf_counter() - inicio >= TEMPO_MINIMO_LOTE or chamadas >= 1_000_000:
+            break
+        chamadas *= 10
+
+    gc_ativo = gc.isenabled()
+    gc.disable()
+    try:
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            for _ in range(chamadas):
+                funcao()
+            tempos.append((time.perf_counter() - inicio) / chamadas)
+    finally:
+        if gc_ativo:
+            gc.enable()
+
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(tempos), statistics.median(tempos), pico
+
+
+# --- Dados sintéticos ---
+
+def gerar_insumos(n):
+    return [
+        {'nome': f'Insumo {i}', 'valor_pacote': 10.0 + i % 97, 'qtd_pacote': float(1 + i % 50), 'unidade': 'ML' if i % 3 else 'UN'}
+        for i in range(n)
+    ]
+
+
+def gerar_materiais(n):
+    return [{'nome': f'Insumo {i}', 'custo_unidade': 0.05 * (1 + i % 40), 'qtd_usada': float(1 + i % 5)} for i in range(n)]
+
+
+def resultado_exemplo():
+    preco, _ = calcular_preco_sugerido_lucro_fixo(12.0, 2.5, 4.0, CUSTOS_VENDA, 5.0)
+    custo_total, _, lucro_real, imposto, base, comissao, item, frete = calcular_lucro_real(preco, 12.0, 2.5, 4.0, CUSTOS_VENDA)
+    return preco, {
+        'custo_total_sugerido': custo_total,
+        'lucro_real_sugerido': lucro_real,
+        'custo_producao_base_sugerido': base,
+        'valor_imposto_sugerido': imposto,
+        'valor_comissao_sugerida': comissao,
+        'valor_item_sugerido': item,
+        'valor_frete_sugerido': frete,
+        'custo_material_total': 12.0,
+    }
+
+
+# --- Casos ---
+#
+# Cada grupo é (gera os dados, {nome: caso(dados)}); os dados de um grupo só são
+# gerados se algum caso dele passar pelo filtro.
+
+def _dados_tabelas(n):
+    insumos, materiais = gerar_insumos(n), gerar_materiais(n)
+    return {
+        'insumos': insumos,
+        'materiais': materiais,
+        'insumos_tabela': tabela_insumos(insumos),
+        'materiais_tabela': tabela_materiais(materiais),
+    }
+
+
+def _dados_backup(n):
+    dados = _dados_tabelas(n)
+    dados['backup_json'] = criar_backup_json(dados['insumos_tabela'], dados['materiais_tabela'], CUSTOS_VENDA).encode('utf-8')
+    dados['backup_binario'] = criar_backup_binario(dados['insumos_tabela'], dados['materiais_tabela'], CUSTOS_VENDA)
+    return dados
+
+
+def _dados_catalogo(n):
+    return {
+        'catalogo': {
+            'custo_material_total': np.linspace(1.0, 200.0, n),
+            'custo_fixo_mo_embalagem': 2.5,
+            'lucro_fixo_desejado': np.full(n, 5.0),
+        },
+        'demanda': DemandaElasticidade(np.linspace(50.0, 400.0, n), 100.0, np.linspace(-4.0, -1.2, n)),
+    }
+
+
+def _grupos(n):
+    return [
+        (lambda: _dados_tabelas(n), {
+            f'insumos/calcular_insumos_unitarios[{n}]': lambda d: calcular_insumos_unitarios(d['insumos']),
+            f'insumos/CatalogoInsumos[{n}]': lambda d: CatalogoInsumos(d['insumos']),
+            f'materiais/custo_total_dicts[{n}]': lambda d: calcular_custo_total_materiais(d['materiais']),
+            f'materiais/custo_total_colunar[{n}]': lambda d: calcular_custo_total_materiais(d['materiais_tabela']),
+        }),
+        (lambda: _dados_backup(n), {
+            f'backup/criar_backup_json[{n}]': lambda d: criar_backup_json(d['insumos_tabela'], d['materiais_tabela'], CUSTOS_VENDA),
+            f'backup/ler_backup_json[{n}]': lambda d: ler_backup(io.BytesIO(d['backup_json'])),
+            f'backup/criar_backup_binario[{n}]': lambda d: criar_backup_binario(d['insumos_tabela'], d['materiais_tabela'], CUSTOS_VENDA),
+            f'backup/ler_backup_binario[{n}]': lambda d: ler_backup(io.BytesIO(d['backup_binario'])),
+        }),
+        (lambda: _dados_catalogo(n), {
+            f'lote/precificar_catalogo[{n}]': lambda d: precificar_catalogo(d['catalogo'], CUSTOS_VENDA),
+            f'lote/precificar_catalogo_centavos[{n}]': lambda d: precificar_catalogo_centavos(d['catalogo'], CUSTOS_VENDA),
+            f'otimizacao/otimizar_precos_grade[{n}]': lambda d: otimizar_precos(d['catalogo'], d['demanda'], CUSTOS_VENDA, metodo='grade'),
+            f'otimizacao/otimizar_precos_aurea[{n}]': lambda d: otimizar_precos(d['catalogo'], d['demanda'], CUSTOS_VENDA, metodo='aurea'),
+        }),
+        (lambda: {'valores': np.linspace(-1e6, 1e6, n)}, {
+            f'formatacao/formatar_brl[{n}]': lambda d: [formatar_brl(v) for v in d['valores']],
+            f'formatacao/formatar_brl_lote[{n}]': lambda d: formatar_brl_lote(d['valores']),
+        }),
+    ]
+
+
+def _execucao_app(_):
+    from streamlit.testing.v1 import AppTest
+    return AppTest.from_file('Calculadora.py', default_timeout=60).run()
+
+
+def casos(tamanhos, incluir_app=True, filtro=None):
+    """Gera (nome, função sem argumentos) de cada caso cujo nome contém `filtro` (todos, sem filtro)."""
+    grupos = [
+        (lambda: {}, {
+            'escalar/calcular_lucro_real': lambda d: calcular_lucro_real(50.0, 12.0, 2.5, 4.0, CUSTOS_VENDA),
+            'escalar/calcular_preco_sugerido_lucro_fixo': lambda d: calcular_preco_sugerido_lucro_fixo(12.0, 2.5, 4.0, CUSTOS_VENDA, 5.0),
+        }),
+        (resultado_exemplo, {
+            'exportacao/convert_data_to_csv': lambda d: convert_data_to_csv(d[1], d[0], 10.0),
+        }),
+    ]
+    grupos += [grupo for n in tamanhos for grupo in _grupos(n)]
+    if incluir_app:
+        try:
+            import streamlit.testing.v1  # noqa: F401
+        except ImportError:
+            print("Streamlit não instalado: caso 'app/execucao_completa' ignorado.", file=sys.stderr)
+        else:
+            # Caminho frio: sem armazenamento local, que leria (e gravaria) dados de execuções anteriores
+            os.environ['CALC_BANCO'] = ''
+            grupos.append((lambda: None, {'app/execucao_completa': _execucao_app}))
+
+    for gerar, casos_grupo in grupos:
+        selecionados = {nome: caso for nome, caso in casos_grupo.items() if not filtro or filtro in nome}
+        if not selecionados:
+            continue
+        dados = gerar()
+        for nome, caso in selecionados.items():
+            yield nome, functools.partial(caso, dados)
+
+
+# --- Saída e comparação ---
+
+def formatar_tempo(segundos):
+    for unidade, fator in (('s', 1), ('ms', 1e-3), ('µs', 1e-6)):
+        if segundos >= fator:
+            return f"{segundos / fator:8.2f} {unidade}"
+    return f"{segundos / 1e-9:8.2f} ns"
+
+
+def comparar(resultados, referencia, limite):
+    """Imprime as razões atual/referência e retorna os nomes dos casos que regrediram."""
+    regressoes = []
+    for nome, atual in resultados.items():
+        base = referencia.get(nome)
+        if base is None:
+            continue
+        razao_tempo = atual['tempo_s'] / base['tempo_s'] if base['tempo_s'] else 1.0
+        razao_memoria = atual['pico_bytes'] / base['pico_bytes'] if base['pico_bytes'] else 1.0
+        regrediu = (
+            (razao_tempo > limite and atual['tempo_s'] - base['tempo_s'] > TOLERANCIA_TEMPO_S)
+            or (razao_memoria > limite and atual['pico_bytes'] - base['pico_bytes'] > TOLERANCIA_MEMORIA_BYTES)
+        )
+        if regrediu:
+            regressoes.append(nome)
+        print(f"{nome:<48} tempo x{razao_tempo:5.2f}  memória x{razao_memoria:5.2f}{'  <-- REGRESSÃO' if regrediu else ''}")
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks da calculadora de preços.")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=list(TAMANHOS_PADRAO), help="Linhas de insumos/materiais por caso.")
+    parser.add_argument('--repeticoes', type=int, default=5, help="Repetições por caso (padrão: 5).")
+    parser.add_argument('--filtro', help="Roda só os casos cujo nome contém este texto.")
+    parser.add_argument('--sem-app', action='store_true', help="Não roda a execução completa via AppTest.")
+    parser.add_argument('--salvar', help="Grava os resultados em JSON (para usar como referência).")
+    parser.add_argument('--comparar', help="JSON de referência gerado com --salvar.")
+    parser.add_argument('--limite', type=float, default=1.25, help="Razão máxima atual/referência antes de acusar regressão.")
+    args = parser.parse_args(argv)
+
+    resultados = {}
+    print(f"{'caso':<48} {'menor':>11} {'mediana':>11} {'pico mem.':>12}")
+    for nome, funcao in casos(args.tamanhos, incluir_app=not args.sem_app, filtro=args.filtro):
+        menor, mediana, pico = medir(funcao, args.repeticoes)
+        resultados[nome] = {'tempo_s': menor, 'mediana_s': mediana, 'pico_bytes': pico}
+        print(f"{nome:<48} {formatar_tempo(menor)} {formatar_tempo(mediana)} {pico / 1024:9.1f} KiB")
+
+    if args.salvar:
+        with open(args.salvar, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            referencia = json.load(f)
+        print()
+        regressoes = comparar(resultados, referencia, args.limite)
+        if regressoes:
+            print(f"\n{len(regressoes)} caso(s) acima do limite de x{args.limite:.2f}.", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
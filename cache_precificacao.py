@@ -0,0 +1,97 @@
+# --- Cache LRU de Precificação (compartilhado pelo processo) ---
+#
+# As mesmas combinações de custo de materiais, taxas e lucro desejado se
+# repetem entre reruns e entre usuários. Este módulo memoiza
+# `calcular_lucro_real` e `calcular_preco_sugerido_lucro_fixo` num cache LRU
+# limitado, no nível do módulo: todas as sessões do Streamlit rodam no mesmo
+# processo e importam o módulo uma única vez, então o cache é compartilhado.
+# A chave é uma forma canônica dos argumentos (o dict `taxas_mp` aninhado vira
+# uma tupla ordenada, via `congelar`).
+
+import threading
+from collections import OrderedDict
+
+from grafo_calculo import congelar
+from precificacao import COMPONENTES_MP, calcular_lucro_real, calcular_preco_sugerido_lucro_fixo
+
+TAMANHO_MAXIMO = 4096
+
+
+class CacheLRU:
+    """Cache LRU thread-safe com contadores de acertos, faltas e descartes."""
+
+    def __init__(self, tamanho_maximo=TAMANHO_MAXIMO):
+        self.tamanho_maximo = tamanho_maximo
+        self._dados = OrderedDict()
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+        self.descartes = 0
+
+    def obter(self, chave, calcular):
+        """Devolve o valor em cache para `chave` ou chama `calcular()` e guarda o resultado."""
+        with self._trava:
+            if chave in self._dados:
+                self._dados.move_to_end(chave)
+                self.acertos += 1
+                return self._dados[chave]
+            self.faltas += 1
+
+        # Calcula fora da trava: outras sessões não esperam por este cálculo
+        valor = calcular()
+        with self._trava:
+            self._dados[chave] = valor
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.tamanho_maximo:
+                self._dados.popitem(last=False)
+                self.descartes += 1
+        return valor
+
+    def limpar(self):
+        with self._trava:
+            self._dados.clear()
+            self.acertos = self.faltas = self.descartes = 0
+
+    def estatisticas(self):
+        with self._trava:
+            total = self.acertos + self.faltas
+            return {
+                'itens': len(self._dados),
+                'tamanho_maximo': self.tamanho_maximo,
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'descartes': self.descartes,
+                'taxa_acerto': self.acertos / total if total else 0.0,
+            }
+
+
+cache_precificacao = CacheLRU()
+
+
+def chave_canonica(nome_funcao, *argumentos):
+    """Chave hashable e estável para os argumentos (dicts aninhados incluídos)."""
+    return (nome_funcao,) + tuple(congelar(arg) for arg in argumentos)
+
+
+def _taxas_relevantes(taxas_mp):
+    # `custos_venda` carrega outros campos (preco_venda, custo fixo...) que não
+    # entram no cálculo das taxas; deixá-los fora da chave aumenta os acertos.
+    return {componente: taxas_mp[componente] for componente in COMPONENTES_MP}
+
+
+def calcular_lucro_real_cache(venda, custo_material_total, custo_fixo_mo_embalagem, tx_imposto, taxas_mp):
+    """`calcular_lucro_real` memoizado no cache do processo."""
+    argumentos = (venda, custo_material_total, custo_fixo_mo_embalagem, tx_imposto, taxas_mp)
+    return cache_precificacao.obter(
+        chave_canonica('lucro_real', *argumentos[:4], _taxas_relevantes(taxas_mp)),
+        lambda: calcular_lucro_real(*argumentos)
+    )
+
+
+def calcular_preco_sugerido_cache(custo_material_total, custo_fixo_mo_embalagem, tx_imposto, taxas_mp, lucro_fixo_desejado):
+    """`calcular_preco_sugerido_lucro_fixo` memoizado no cache do processo."""
+    argumentos = (custo_material_total, custo_fixo_mo_embalagem, tx_imposto, taxas_mp, lucro_fixo_desejado)
+    return cache_precificacao.obter(
+        chave_canonica('preco_sugerido', *argumentos[:3], _taxas_relevantes(taxas_mp), lucro_fixo_desejado),
+        lambda: calcular_preco_sugerido_lucro_fixo(*argumentos)
+    )
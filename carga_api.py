@@ -0,0 +1,163 @@
+"""Teste de carga da API de precificação (api_precificacao.py) em localhost.
+
+Abre N conexões HTTP/1.1 persistentes (asyncio, só biblioteca padrão) e
+dispara requisições em sequência em cada uma durante o tempo pedido. Mede
+requisições/s, produtos/s e latência (p50/p95/p99).
+
+Exemplos:
+    python api_precificacao.py --perfis perfis.json --workers 4 &
+    python carga_api.py --conexoes 64 --duracao 10
+    python carga_api.py --rota /precos --lote 1000 --conexoes 8
+    python carga_api.py --iniciar --workers 2      # sobe a API por conta própria
+
+Com --iniciar, a API é iniciada num subprocesso com um perfil de exemplo
+(ou --perfis) e encerrada ao fim.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+PERFIL_EXEMPLO = {
+    'nome': 'padrao',
+    'taxa_imposto': 4.0,
+    'custo_fixo_mo_embalagem': 2.0,
+    'taxa_comissao': {'tipo': 'percentual', 'valor': 15.0},
+    'taxa_por_item': {'tipo': 'fixo', 'valor': 3.0},
+    'custo_frete': {'tipo': 'fixo', 'valor': 15.0},
+}
+
+
+def _produto(i):
+    return {'sku': f'SKU{i}', 'custo_material_total': round(random.uniform(1, 200), 2), 'lucro_fixo_desejado': 5.0}
+
+
+def _requisicao(host, rota, corpo):
+    return (
+        f"POST {rota} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(corpo)}\r\n\r\n"
+    ).encode() + corpo
+
+
+async def _ler_resposta(leitor):
+    cabecalho = await leitor.readuntil(b'\r\n\r\n')
+    status = int(cabecalho.split(b' ', 2)[1])
+    tamanho = 0
+    for linha in cabecalho.split(b'\r\n')[1:]:
+        if linha.lower().startswith(b'content-length:'):
+            tamanho = int(linha.split(b':', 1)[1])
+    await leitor.readexactly(tamanho)
+    return status
+
+
+async def _conexao(host, porta, requisicoes, fim, latencias, falhas):
+    leitor, escritor = await asyncio.open_connection(host, porta)
+    try:
+        while time.perf_counter() < fim:
+            inicio = time.perf_counter()
+            escritor.write(random.choice(requisicoes))
+            await escritor.drain()
+            status = await _ler_resposta(leitor)
+            latencias.append(time.perf_counter() - inicio)
+            if status != 200:
+                falhas.append(status)
+    finally:
+        escritor.close()
+
+
+async def executar(url, rota, conexoes, duracao, lote):
+    """Dispara a carga e retorna um dict com as estatísticas."""
+    partes = urlsplit(url)
+    host, porta = partes.hostname, partes.port or 80
+    # Corpos pré-montados: o cliente gasta o mínimo possível por requisição
+    if rota == '/preco':
+        requisicoes = [_requisicao(host, rota, json.dumps(_produto(i)).encode()) for i in range(256)]
+        produtos_por_requisicao = 1
+    else:
+        requisicoes = [_requisicao(host, rota, json.dumps([_produto(i) for i in range(lote)]).encode()) for _ in range(8)]
+        produtos_por_requisicao = lote
+
+    latencias, falhas = [], []
+    inicio = time.perf_counter()
+    fim = inicio + duracao
+    await asyncio.gather(*(_conexao(host, porta, requisicoes, fim, latencias, falhas) for _ in range(conexoes)))
+    total_s = time.perf_counter() - inicio
+
+    latencias.sort()
+    quantil = lambda q: latencias[min(int(q * len(latencias)), len(latencias) - 1)] * 1000
+    return {
+        'requisicoes': len(latencias),
+        'falhas': len(falhas),
+        'req_por_s': len(latencias) / total_s,
+        'produtos_por_s': len(latencias) * produtos_por_requisicao / total_s,
+        'latencia_media_ms': statistics.fmean(latencias) * 1000 if latencias else 0.0,
+        'p50_ms': quantil(0.50) if latencias else 0.0,
+        'p95_ms': quantil(0.95) if latencias else 0.0,
+        'p99_ms': quantil(0.99) if latencias else 0.0,
+    }
+
+
+def _aguardar_api(url, tempo_limite=20.0):
+    partes = urlsplit(url)
+    limite = time.perf_counter() + tempo_limite
+    while time.perf_counter() < limite:
+        try:
+            with socket.create_connection((partes.hostname, partes.port or 80), timeout=1.0):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga da API de precificação.")
+    parser.add_argument('--url', default='http://127.0.0.1:8600')
+    parser.add_argument('--rota', choices=['/preco', '/precos'], default='/preco')
+    parser.add_argument('--conexoes', type=int, default=64, help="Conexões simultâneas.")
+    parser.add_argument('--duracao', type=float, default=10.0, help="Segundos de carga.")
+    parser.add_argument('--lote', type=int, default=1000, help="Produtos por requisição em /precos.")
+    parser.add_argument('--iniciar', action='store_true', help="Sobe a API num subprocesso durante o teste.")
+    parser.add_argument('--workers', type=int, default=1, help="Processos da API iniciada com --iniciar.")
+    parser.add_argument('--perfis', help="Perfis da API iniciada com --iniciar (padrão: um perfil de exemplo).")
+    args = parser.parse_args(argv)
+
+    servidor = None
+    try:
+        if args.iniciar:
+            perfis = args.perfis
+            if not perfis:
+                arquivo = tempfile.NamedTemporaryFile('w', suffix='.json', delete=False)
+                json.dump([PERFIL_EXEMPLO], arquivo)
+                arquivo.close()
+                perfis = arquivo.name
+            servidor = subprocess.Popen([
+                sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api_precificacao.py'),
+                '--perfis', perfis, '--porta', str(urlsplit(args.url).port or 80), '--workers', str(args.workers),
+            ])
+            if not _aguardar_api(args.url):
+                print("Erro: a API não respondeu.", file=sys.stderr)
+                return 1
+
+        resultado = asyncio.run(executar(args.url, args.rota, args.conexoes, args.duracao, args.lote))
+    finally:
+        if servidor is not None:
+            servidor.terminate()
+            servidor.wait()
+
+    print(f"{resultado['requisicoes']} requisições em {args.duracao:.0f}s, {resultado['falhas']} falhas")
+    print(f"{resultado['req_por_s']:,.0f} req/s, {resultado['produtos_por_s']:,.0f} produtos/s")
+    print(f"latência média {resultado['latencia_media_ms']:.2f} ms | p50 {resultado['p50_ms']:.2f} | "
+          f"p95 {resultado['p95_ms']:.2f} | p99 {resultado['p99_ms']:.2f} ms")
+    return 1 if resultado['falhas'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+# --- Catálogo Indexado de Insumos ---
+#
+# Envolve a lista `insumos_base` (mesmos dicts usados no backup) com um índice
+# nome -> posição e os custos unitários em cache. Só a entrada editada é
+# recalculada; a lista original continua sendo a fonte de verdade.
+
+import numpy as np
+
+from precificacao import calcular_custo_unitario_insumo
+
+OPCAO_MANUAL = "Outro (Manual)"
+
+
+class CatalogoInsumos:
+    """Lista de insumos com busca por nome em O(1) e custo unitário em cache."""
+
+    def __init__(self, insumos=None):
+        self.insumos = insumos if insumos is not None else []
+        self._custos = [calcular_custo_unitario_insumo(insumo) for insumo in self.insumos]
+        self._reindexar()
+
+    def _reindexar(self):
+        # Nomes repetidos: vale o último, como no antigo dict `insumos_unitarios`.
+        self._indice = {insumo['nome']: i for i, insumo in enumerate(self.insumos)}
+        self._opcoes = None
+
+    # --- Consulta ---
+
+    def __len__(self):
+        return len(self.insumos)
+
+    def __iter__(self):
+        return iter(self.insumos)
+
+    def __contains__(self, nome):
+        return nome in self._indice
+
+    def posicao(self, nome):
+        """Posição do insumo na lista, ou None se não existir."""
+        return self._indice.get(nome)
+
+    def custo_unitario(self, nome, padrao=0.0):
+        i = self._indice.get(nome)
+        return self._custos[i] if i is not None else padrao
+
+    def custo_unitario_posicao(self, i):
+        return self._custos[i]
+
+    def unidade(self, nome, padrao='UN'):
+        i = self._indice.get(nome)
+        return self.insumos[i].get('unidade', padrao) if i is not None else padrao
+
+    def custos_unitarios(self):
+        """Dict nome -> custo unitário (compatível com `calcular_insumos_unitarios`)."""
+        return {nome: self._custos[i] for nome, i in self._indice.items()}
+
+    def aplicar_custos(self, materiais):
+        """Reaplica o custo unitário do catálogo em todos os materiais que usam um insumo cadastrado.
+
+        Tabelas colunares são atualizadas de uma vez pela coluna de custos (um
+        acesso ao índice por nome distinto). Retorna quantas linhas mudaram.
+        """
+        if not hasattr(materiais, 'mapear_texto'):
+            alterados = 0
+            for material in materiais:
+                custo = self.custo_unitario(material['nome'], None)
+                if custo is not None and custo != material['custo_unidade']:
+                    material['custo_unidade'] = custo
+                    alterados += 1
+            return alterados
+        custos = materiais.mapear_texto('nome', lambda nome: self.custo_unitario(nome, np.nan))
+        coluna = materiais.coluna('custo_unidade')
+        mudou = ~np.isnan(custos) & (custos != coluna)
+        coluna[mudou] = custos[mudou]
+        return int(mudou.sum())
+
+    def opcoes(self):
+        """Nomes para o seletor de materiais, seguidos da opção manual (em cache)."""
+        if self._opcoes is None:
+            self._opcoes = list(self._indice) + [OPCAO_MANUAL]
+            self._indice_opcoes = {nome: i for i, nome in enumerate(self._opcoes)}
+        return self._opcoes
+
+    def indice_opcao(self, nome):
+        """Índice de `nome` em `opcoes()`; nomes desconhecidos caem na opção manual."""
+        opcoes = self.opcoes()
+        return self._indice_opcoes.get(nome, len(opcoes) - 1)
+
+    # --- Edição ---
+
+    def atualizar(self, i, **campos):
+        """Aplica `campos` ao insumo da posição i. Retorna True se algo mudou."""
+        insumo = self.insumos[i]
+        alterados = {k: v for k, v in campos.items() if insumo.get(k) != v}
+        if not alterados:
+            return False
+
+        nome_antigo = insumo['nome']
+        insumo.update(alterados)
+        if 'valor_pacote' in alterados or 'qtd_pacote' in alterados:
+            self._custos[i] = calcular_custo_unitario_insumo(insumo)
+        if 'nome' in alterados and nome_antigo != insumo['nome']:
+            self._reindexar()
+        return True
+
+    def adicionar(self, insumo):
+        self.insumos.append(insumo)
+        self._custos.append(calcular_custo_unitario_insumo(insumo))
+        if insumo['nome'] in self._indice:
+            self._reindexar()
+        else:
+            self._indice[insumo['nome']] = len(self.insumos) - 1
+            self._opcoes = None
+
+    def remover_ultimo(self):
+        self.insumos.pop()
+        self._custos.pop()
+        self._reindexar()
+
+    def substituir(self, i, insumo):
+        """Troca o insumo inteiro da posição i (ex.: resetar o exemplo inicial)."""
+        self.insumos[i] = insumo
+        self._custos[i] = calcular_custo_unitario_insumo(insumo)
+        self._reindexar()
@@ -0,0 +1,108 @@
+# --- Comparação de Cenários (E se...?) ---
+#
+# Um cenário é um conjunto nomeado de sobreposições sobre a situação atual:
+#   {
+#       'nome': 'Comissão 18% + frete R$ 2',
+#       'custos_venda': {'taxa_comissao': {'tipo': 'percentual', 'valor': 18.0},
+#                        'custo_frete': {'tipo': 'fixo', 'valor': 17.0}},
+#       'precos_insumos': {'Papel Pacote': 30.0},   # novo valor do pacote
+#   }
+# Todos os cenários são avaliados de uma vez contra todos os produtos: as taxas
+# de cada cenário são compiladas no modelo afim (precificacao.py) e o custo de
+# materiais só é refeito para os insumos que algum cenário altera.
+
+import numpy as np
+
+from precificacao import calcular_custo_unitario_insumo, compilar_modelo_taxas
+
+NOME_ATUAL = 'Atual'
+
+
+def aplicar_cenario(custos_venda, cenario):
+    """`custos_venda` com as sobreposições do cenário (componentes são trocados por inteiro)."""
+    return {**custos_venda, **cenario.get('custos_venda', {})}
+
+
+def avaliar_cenarios(catalogo, bom_sku, bom_insumo, bom_qtd, n_produtos, custos_venda, cenarios,
+                     lucro_fixo_desejado, custo_material_extra=0.0, preco_atual=None):
+    """Preço sugerido e lucro de cada produto em cada cenário, numa única passada.
+
+    `catalogo` é o CatalogoInsumos; a lista de materiais vem em triplas
+    paralelas (`bom_sku`, `bom_insumo` = posição no catálogo, `bom_qtd`), como em
+    precificacao_paralela.py. `custo_material_extra` (n,) soma materiais de
+    custo manual. `preco_atual` (n,) é o preço praticado hoje; sem ele, vale o
+    preço sugerido da situação atual.
+
+    Retorna um dict com `cenarios` (nomes, o primeiro é a situação atual) e
+    arrays (cenários, produtos): `custo_material_total`, `preco_sugerido`,
+    `valido`, `lucro_no_preco_atual`, `margem_no_preco_atual`, `delta_preco` e
+    `delta_lucro` (diferenças para a situação atual).
+    """
+    cenarios = [{'nome': NOME_ATUAL}] + list(cenarios)
+    s = len(cenarios)
+    bom_sku = np.asarray(bom_sku, dtype=np.int64)
+    bom_insumo = np.asarray(bom_insumo, dtype=np.int64)
+    bom_qtd = np.asarray(bom_qtd, dtype=np.float64)
+    lucro_fixo_desejado = np.broadcast_to(np.asarray(lucro_fixo_desejado, dtype=np.float64), (n_produtos,))
+
+    # 1. Custo de materiais: base + diferença só nos insumos alterados por algum cenário
+    custos_unitarios = np.array([catalogo.custo_unitario_posicao(i) for i in range(len(catalogo))])
+    base = np.bincount(bom_sku, weights=bom_qtd * custos_unitarios[bom_insumo], minlength=n_produtos)
+    base = base + np.broadcast_to(np.asarray(custo_material_extra, dtype=np.float64), (n_produtos,))
+
+    alterados = {}  # posição no catálogo -> coluna
+    for cenario in cenarios:
+        for nome in cenario.get('precos_insumos', {}):
+            i = catalogo.posicao(nome)
+            if i is None:
+                raise KeyError(f"Insumo '{nome}' do cenário '{cenario.get('nome', '')}' não existe no catálogo.")
+            alterados.setdefault(i, len(alterados))
+
+    custo_material = np.repeat(base[None, :], s, axis=0)
+    if alterados:
+        colunas = np.full(len(catalogo), -1)
+        colunas[list(alterados)] = list(alterados.values())
+        usa = colunas[bom_insumo] >= 0
+        quantidades = np.zeros((n_produtos, len(alterados)))
+        np.add.at(quantidades, (bom_sku[usa], colunas[bom_insumo[usa]]), bom_qtd[usa])
+
+        variacoes = np.zeros((s, len(alterados)))
+        for k, cenario in enumerate(cenarios):
+            for nome, valor_pacote in cenario.get('precos_insumos', {}).items():
+                i = catalogo.posicao(nome)
+                novo = calcular_custo_unitario_insumo({**catalogo.insumos[i], 'valor_pacote': valor_pacote})
+                variacoes[k, alterados[i]] = novo - custos_unitarios[i]
+        custo_material += variacoes @ quantidades.T
+
+    # 2. Taxas: coeficientes afins por cenário -> preço em forma fechada para toda a grade
+    proporcional, fixo, custo_fixo = np.empty(s), np.empty(s), np.empty(s)
+    for k, cenario in enumerate(cenarios):
+        custos = aplicar_cenario(custos_venda, cenario)
+        proporcional[k], fixo[k] = compilar_modelo_taxas(custos['taxa_imposto'], custos)
+        custo_fixo[k] = custos['custo_fixo_mo_embalagem']
+
+    custo_base = custo_material + custo_fixo[:, None]
+    denominador = (1 - proporcional)[:, None]
+    valido = np.broadcast_to(denominador > 0, (s, n_produtos))
+    preco_sugerido = np.divide(
+        custo_base + fixo[:, None] + lucro_fixo_desejado[None, :], denominador,
+        out=np.zeros((s, n_produtos)), where=valido
+    )
+
+    # 3. Lucro se o preço de hoje for mantido
+    if preco_atual is None:
+        preco_atual = preco_sugerido[0]
+    preco_atual = np.broadcast_to(np.asarray(preco_atual, dtype=np.float64), (n_produtos,))
+    lucro = preco_atual[None, :] * denominador - fixo[:, None] - custo_base
+    margem = np.divide(lucro * 100, preco_atual[None, :], out=np.zeros((s, n_produtos)), where=preco_atual[None, :] > 0)
+
+    return {
+        'cenarios': [cenario.get('nome', f'Cenário {k}') for k, cenario in enumerate(cenarios)],
+        'custo_material_total': custo_material,
+        'preco_sugerido': preco_sugerido,
+        'valido': valido,
+        'lucro_no_preco_atual': lucro,
+        'margem_no_preco_atual': margem,
+        'delta_preco': preco_sugerido - preco_sugerido[0],
+        'delta_lucro': lucro - lucro[0],
+    }
@@ -0,0 +1,96 @@
+# --- Exportação e Leitura de Backups (sem Streamlit) ---
+#
+# Serialização usada pela Aba 4: backup JSON, leitura de backups (JSON ou
+# binário) e o resumo de custos em CSV. Fica fora de Calculadora.py para ser
+# usada pela CLI e pelo benchmark sem subir o Streamlit.
+
+import io
+import json
+
+import pandas as pd
+
+from backup_binario import carregar_backup_binario, e_backup_binario
+from tabela_colunar import tabela_insumos, tabela_materiais
+
+
+def criar_backup_json(insumos_base, materiais_produto, custos_venda):
+    """Compila os dados importantes do session state em uma string JSON."""
+    backup_data = {
+        'insumos_base': insumos_base,
+        'materiais_produto': materiais_produto,
+        'custos_venda': custos_venda
+    }
+    # Retorna o JSON formatado em string (tabelas colunares viram listas de dicts)
+    return json.dumps(backup_data, indent=4, default=_para_json)
+
+
+def _para_json(obj):
+    if hasattr(obj, 'para_dicts'):
+        return obj.para_dicts()
+    raise TypeError(f"Objeto do tipo {type(obj).__name__} não é serializável em JSON")
+
+
+def ler_backup(arquivo):
+    """Lê um backup (JSON ou binário) de um arquivo binário aberto ou UploadedFile.
+
+    Retorna um dict com 'insumos_base' e 'materiais_produto' (tabelas colunares)
+    e 'custos_venda'.
+    """
+    arquivo.seek(0)
+    binario = e_backup_binario(arquivo.read(6))
+    arquivo.seek(0)
+    if binario:
+        # Backup binário: lido em blocos direto para as tabelas colunares
+        return carregar_backup_binario(arquivo)
+
+    data = json.load(arquivo)
+    return {
+        'insumos_base': tabela_insumos(data.get('insumos_base', [])),
+        'materiais_produto': tabela_materiais(data.get('materiais_produto', [])),
+        'custos_venda': data.get('custos_venda', {}),
+    }
+
+
+# --- FUNÇÃO PARA CONVERTER O RESULTADO EM CSV ---
+def convert_data_to_csv(data_dict, preco_sugerido, margem_real):
+    df_data = {
+        'Metrica': [
+            'Preco Sugerido (Venda)',
+            'Custo Total da Venda',
+            'Custo de Producao (Base)',
+            'Lucro Real (Desejado)',
+            'Margem Real (%)',
+            'Custo: Materiais',
+            'Custo: Imposto',
+            'Custo: Comissao Marketplace',
+            'Custo: Taxa por Item + Frete'
+        ],
+        'Valor': [
+            preco_sugerido,
+            data_dict['custo_total_sugerido'],
+            data_dict['custo_producao_base_sugerido'],
+            data_dict['lucro_real_sugerido'],
+            margem_real,
+            data_dict['custo_material_total'],
+            data_dict['valor_imposto_sugerido'],
+            data_dict['valor_comissao_sugerida'],
+            data_dict['valor_item_sugerido'] + data_dict['valor_frete_sugerido']
+        ]
+    }
+    df = pd.DataFrame(df_data)
+
+    # Gera o CSV e codifica em UTF-8
+    buffer = io.StringIO()
+    escrever_csv_ptbr(df, buffer)
+    return buffer.getvalue().encode('utf-8')
+
+
+def escrever_csv_ptbr(df, destino, **opcoes):
+    """Grava `df` em CSV no padrão PT-BR (';' e vírgula decimal, 2 casas).
+
+    A vírgula decimal é aplicada pelo escritor de CSV do pandas na conversão dos
+    números, sem pós-processar o texto célula a célula.
+    """
+    # Usando ';' como separador para melhor compatibilidade com Excel em PT-BR
+    opcoes = {'index': False, 'sep': ';', 'decimal': ',', 'float_format': '%.2f', **opcoes}
+    df.to_csv(destino, **opcoes)
@@ -0,0 +1,68 @@
+# --- Grafo de Cálculo Incremental ---
+#
+# Pequeno grafo reativo: entradas (valores vindos do session state / widgets) e
+# nós derivados (funções puras das dependências). Cada nó guarda o resultado
+# junto com as versões das dependências usadas; só é recalculado quando alguma
+# delas muda. Assim, mudar o lucro desejado não refaz o total de materiais nem
+# o cálculo mock da Aba 3.
+
+
+def congelar(valor):
+    """Cópia imutável e comparável de dicts/listas (o session state é editado in-place)."""
+    if hasattr(valor, 'congelar'):
+        return valor.congelar()
+    if isinstance(valor, dict):
+        return tuple(sorted((k, congelar(v)) for k, v in valor.items()))
+    if isinstance(valor, (list, tuple)):
+        return tuple(congelar(v) for v in valor)
+    return valor
+
+
+class GrafoCalculo:
+    """Entradas versionadas e nós memoizados pelas versões das dependências."""
+
+    def __init__(self):
+        self._entradas = {}   # nome -> (valor, valor congelado)
+        self._nos = {}        # nome -> (funcao, dependencias)
+        self._cache = {}      # nome -> (chave de versões, resultado)
+        self._versoes = {}
+        self.recalculos = {}  # nome -> quantas vezes o nó foi executado
+
+    def no(self, nome, funcao, dependencias):
+        """Registra um nó derivado: `funcao(*valores das dependencias)`."""
+        self._nos[nome] = (funcao, tuple(dependencias))
+        self._cache.pop(nome, None)
+
+    def entrada(self, nome, valor):
+        """Define o valor de uma entrada. A versão só muda se o conteúdo mudou."""
+        congelado = congelar(valor)
+        atual = self._entradas.get(nome)
+        if atual is None or atual[1] != congelado:
+            self._versoes[nome] = self._versoes.get(nome, 0) + 1
+        self._entradas[nome] = (valor, congelado)
+
+    def versao(self, nome):
+        if nome in self._nos:
+            self.valor(nome)
+        return self._versoes.get(nome, 0)
+
+    def valor(self, nome):
+        """Valor atual de uma entrada ou nó, recalculando só o que estiver desatualizado."""
+        if nome in self._entradas:
+            return self._entradas[nome][0]
+        if nome not in self._nos:
+            raise KeyError(f"Nó '{nome}' não registrado.")
+
+        funcao, dependencias = self._nos[nome]
+        argumentos = [self.valor(dep) for dep in dependencias]
+        chave = tuple(self._versoes.get(dep, 0) for dep in dependencias)
+
+        em_cache = self._cache.get(nome)
+        if em_cache is not None and em_cache[0] == chave:
+            return em_cache[1]
+
+        resultado = funcao(*argumentos)
+        self._cache[nome] = (chave, resultado)
+        self._versoes[nome] = self._versoes.get(nome, 0) + 1
+        self.recalculos[nome] = self.recalculos.get(nome, 0) + 1
+        return resultado
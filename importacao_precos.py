@@ -0,0 +1,208 @@
+# --- Importação de Listas de Preços de Fornecedores ---
+#
+# Lê listas de preços (CSV ou XLSX) em blocos, mapeia as colunas do
+# fornecedor para nome/valor_pacote/qtd_pacote/unidade e faz upsert por nome
+# no CatalogoInsumos: uma busca no índice por linha, só os insumos que de fato
+# mudaram têm o custo recalculado. Depois, só os materiais/produtos que usam
+# esses insumos são atualizados.
+
+import csv
+import io
+
+import pandas as pd
+
+CAMPOS = ('nome', 'valor_pacote', 'qtd_pacote', 'unidade')
+TAMANHO_BLOCO = 10_000
+QTD_PACOTE_MINIMA = 1.0  # mesmo mínimo do campo Qtd/Pacote da Aba 2: nada importado deixa de ser editável
+
+# Nomes de coluna reconhecidos automaticamente (comparação sem maiúsculas/espaços nas pontas)
+SINONIMOS = {
+    'nome': ('nome', 'produto', 'descricao', 'descrição', 'item', 'material'),
+    'valor_pacote': ('valor_pacote', 'valor', 'preco', 'preço', 'valor pacote', 'preço pacote', 'preco pacote'),
+    'qtd_pacote': ('qtd_pacote', 'qtd', 'quantidade', 'qtd pacote', 'embalagem'),
+    'unidade': ('unidade', 'un', 'und', 'medida'),
+}
+
+
+def detectar_mapeamento(colunas):
+    """Sugere {campo: coluna do arquivo} a partir dos cabeçalhos. Campos não achados ficam de fora."""
+    normalizadas = {str(c).strip().casefold(): c for c in colunas}
+    mapeamento = {}
+    for campo, sinonimos in SINONIMOS.items():
+        for sinonimo in sinonimos:
+            if sinonimo in normalizadas:
+                mapeamento[campo] = normalizadas[sinonimo]
+                break
+    return mapeamento
+
+
+def _numeros(serie, decimal):
+    """Converte uma coluna para float; aceita 'R$ 1.234,56' quando `decimal` é ','.
+
+    Os pontos de milhar só são removidos dos valores que têm a vírgula decimal
+    ('27.50' continua 27,5 num CSV com ';'). Células que já são números (XLSX
+    com tipos mistos na coluna) são usadas como estão.
+    """
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype('float64')
+    e_texto = serie.map(lambda valor: isinstance(valor, str)).astype(bool)
+    nativos = pd.to_numeric(serie.mask(e_texto), errors='coerce')
+    texto = serie.where(e_texto).astype('string').str.replace('R$', '', regex=False).str.strip()
+    if decimal == ',':
+        com_virgula = texto.str.contains(',', regex=False).fillna(False).astype(bool)
+        texto = texto.mask(com_virgula, texto.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    return pd.to_numeric(texto, errors='coerce').fillna(nativos)
+
+
+def _normalizar_bloco(bloco, mapeamento, decimal):
+    """Renomeia para os campos do catálogo e converte tipos. Linhas inválidas viram NaN/None no nome."""
+    if 'nome' not in mapeamento or 'valor_pacote' not in mapeamento:
+        raise KeyError("Mapeie pelo menos as colunas de 'nome' e 'valor_pacote'.")
+    saida = pd.DataFrame(index=bloco.index)
+    saida['nome'] = bloco[mapeamento['nome']].astype('string').str.strip()
+    saida['valor_pacote'] = _numeros(bloco[mapeamento['valor_pacote']], decimal)
+    if 'qtd_pacote' in mapeamento:
+        saida['qtd_pacote'] = _numeros(bloco[mapeamento['qtd_pacote']], decimal).fillna(1.0)
+    else:
+        saida['qtd_pacote'] = 1.0
+    if 'unidade' in mapeamento:
+        saida['unidade'] = bloco[mapeamento['unidade']].astype('string').str.strip().str.upper().fillna('UN')
+    else:
+        saida['unidade'] = 'UN'
+    return saida
+
+
+def _detectar_csv(amostra):
+    """Separador e decimal de um CSV pelo início do arquivo (padrão PT-BR: ';' e ',').
+
+    Com decimal ',' valores como '27.50' continuam aceitos: veja `_numeros`.
+    """
+    try:
+        separador = csv.Sniffer().sniff(amostra, delimiters=';,\t').delimiter
+    except csv.Error:
+        separador = ';'
+    return separador, (',' if separador != ',' else '.')
+
+
+def _e_xlsx(arquivo, nome_arquivo):
+    nome_arquivo = nome_arquivo or getattr(arquivo, 'name', None) or str(arquivo)
+    return nome_arquivo.lower().endswith('.xlsx')
+
+
+def _formato_csv(arquivo, separador, decimal):
+    if hasattr(arquivo, 'read'):
+        arquivo.seek(0)
+        amostra = arquivo.read(64 * 1024)
+        arquivo.seek(0)
+    else:
+        with open(arquivo, 'rb') as f:
+            amostra = f.read(64 * 1024)
+    separador_detectado, decimal_detectado = _detectar_csv(amostra.decode('utf-8-sig', errors='replace'))
+    return separador or separador_detectado, decimal or decimal_detectado
+
+
+def colunas_lista_precos(arquivo, nome_arquivo=None, separador=None):
+    """Cabeçalho do arquivo (para montar o mapeamento de colunas na interface)."""
+    if _e_xlsx(arquivo, nome_arquivo):
+        return list(next(_blocos_xlsx(arquivo, 1), pd.DataFrame()).columns)
+    separador, _ = _formato_csv(arquivo, separador, None)
+    colunas = list(pd.read_csv(arquivo, sep=separador, nrows=0, encoding='utf-8-sig').columns)
+    if hasattr(arquivo, 'seek'):
+        arquivo.seek(0)
+    return colunas
+
+
+def ler_lista_precos(arquivo, mapeamento=None, nome_arquivo=None, tamanho_bloco=TAMANHO_BLOCO, separador=None, decimal=None):
+    """Gera blocos (DataFrames) com as colunas de CAMPOS, lendo o arquivo aos poucos.
+
+    `arquivo` é um caminho ou arquivo binário aberto (ex.: UploadedFile). XLSX
+    depende do `openpyxl` (lido em modo streaming); qualquer outro formato é
+    tratado como CSV. Sem `mapeamento`, as colunas são detectadas pelo cabeçalho.
+    """
+    if _e_xlsx(arquivo, nome_arquivo):
+        blocos = _blocos_xlsx(arquivo, tamanho_bloco)
+        decimal = decimal or ','
+    else:
+        separador, decimal = _formato_csv(arquivo, separador, decimal)
+        blocos = pd.read_csv(arquivo, sep=separador, dtype=str, chunksize=tamanho_bloco, encoding='utf-8-sig')
+
+    for bloco in blocos:
+        if mapeamento is None:
+            mapeamento = detectar_mapeamento(bloco.columns)
+        yield _normalizar_bloco(bloco, mapeamento, decimal)
+
+
+def _blocos_xlsx(arquivo, tamanho_bloco):
+    try:
+        from openpyxl import load_workbook
+    except ImportError as exc:
+        raise ImportError("Importar XLSX requer o pacote 'openpyxl' (pip install openpyxl).") from exc
+
+    if hasattr(arquivo, 'read'):
+        arquivo.seek(0)
+        arquivo = io.BytesIO(arquivo.read())
+    planilha = load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        linhas = planilha.active.iter_rows(values_only=True)
+        cabecalho = [str(c) if c is not None else '' for c in next(linhas, ())]
+        bloco = []
+        for linha in linhas:
+            bloco.append(linha)
+            if len(bloco) >= tamanho_bloco:
+                yield pd.DataFrame(bloco, columns=cabecalho)
+                bloco = []
+        if bloco:
+            yield pd.DataFrame(bloco, columns=cabecalho)
+    finally:
+        planilha.close()
+
+
+def importar_lista_precos(catalogo, blocos, unidades_validas=('UN', 'ML'), progresso=None):
+    """Upsert dos blocos no catálogo, por nome. Retorna o resumo da importação.
+
+    O resumo traz 'novos', 'alterados', 'sem_mudanca', 'invalidas' (contagens)
+    e 'insumos_alterados' (nomes novos ou com custo/unidade diferente), para
+    recalcular só o que depende deles. `progresso(linhas lidas)` é chamado a
+    cada bloco (ex.: `Tarefa.progresso`, que também interrompe se cancelada).
+    """
+    linhas = 0
+    resumo = {'novos': 0, 'alterados': 0, 'sem_mudanca': 0, 'invalidas': 0, 'insumos_alterados': set()}
+    for bloco in blocos:
+        validas = (
+            bloco['nome'].notna() & (bloco['nome'] != '')
+            & bloco['valor_pacote'].notna() & (bloco['valor_pacote'] >= 0)
+            & (bloco['qtd_pacote'] >= QTD_PACOTE_MINIMA)
+            & bloco['unidade'].isin(unidades_validas)
+        ).fillna(False).astype(bool)
+        resumo['invalidas'] += int((~validas).sum())
+        bloco = bloco[validas]
+        for nome, valor_pacote, qtd_pacote, unidade in zip(
+            bloco['nome'].tolist(), bloco['valor_pacote'].tolist(), bloco['qtd_pacote'].tolist(), bloco['unidade'].tolist()
+        ):
+            i = catalogo.posicao(nome)
+            if i is None:
+                catalogo.adicionar({'nome': nome, 'valor_pacote': valor_pacote, 'qtd_pacote': qtd_pacote, 'unidade': unidade})
+                resumo['novos'] += 1
+                resumo['insumos_alterados'].add(nome)
+            elif catalogo.atualizar(i, valor_pacote=valor_pacote, qtd_pacote=qtd_pacote, unidade=unidade):
+                resumo['alterados'] += 1
+                resumo['insumos_alterados'].add(nome)
+            else:
+                resumo['sem_mudanca'] += 1
+        linhas += len(validas)
+        if progresso is not None:
+            progresso(linhas)
+    return resumo
+
+
+def atualizar_materiais(materiais, catalogo, nomes):
+    """Reaplica o custo unitário do catálogo nos materiais que usam algum dos `nomes`.
+
+    `materiais` é a tabela/lista de materiais do produto (dicts com 'nome' e
+    'custo_unidade'). Retorna as posições atualizadas.
+    """
+    nomes = set(nomes)
+    posicoes = [i for i, material in enumerate(materiais) if material['nome'] in nomes]
+    for i in posicoes:
+        materiais[i]['custo_unidade'] = catalogo.custo_unitario(materiais[i]['nome'])
+    return posicoes
@@ -0,0 +1,168 @@
+# --- Instrumentação do Rerun (opcional) ---
+#
+# Mede o tempo de cada fase de um rerun (cálculos, renderização das abas,
+# serialização das exportações) e mantém contadores do processo (reruns,
+# linhas processadas, acertos de cache). Desligada por padrão: nesse caso
+# `fase()` devolve um context manager vazio compartilhado e os contadores
+# retornam na primeira linha, então o custo é uma checagem de booleano.
+#
+# Ativação: variável de ambiente CALC_INSTRUMENTACAO=1 (ou `ativar(True)`).
+# Com CALC_METRICAS_PORTA=<porta>, as métricas ficam disponíveis em texto no
+# formato do Prometheus em http://localhost:<porta>/metrics.
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger('calculadora.desempenho')
+
+_ativo = os.environ.get('CALC_INSTRUMENTACAO', '') not in ('', '0', 'false')
+_NULO = nullcontext()
+
+_trava = threading.Lock()
+_contadores = {}     # (nome, rótulos ordenados) -> valor
+_fases_soma = {}     # fase -> segundos acumulados
+_fases_contagem = {}
+_coletores = {}      # nome -> função sem argumentos que devolve {métrica: valor}
+_local = threading.local()  # fases do rerun atual (cada sessão roda em sua thread)
+_servidor = None
+
+
+def ativo():
+    return _ativo
+
+
+def ativar(valor=True):
+    global _ativo
+    _ativo = bool(valor)
+
+
+# --- Rerun e fases ---
+
+class _Fase:
+    __slots__ = ('nome', 'inicio')
+
+    def __init__(self, nome):
+        self.nome = nome
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duracao = time.perf_counter() - self.inicio
+        fases = getattr(_local, 'fases', None)
+        if fases is not None:
+            fases.append((self.nome, duracao))
+        with _trava:
+            _fases_soma[self.nome] = _fases_soma.get(self.nome, 0.0) + duracao
+            _fases_contagem[self.nome] = _fases_contagem.get(self.nome, 0) + 1
+        return False
+
+
+def fase(nome):
+    """Context manager que cronometra `nome` (vazio quando a instrumentação está desligada)."""
+    if not _ativo:
+        return _NULO
+    return _Fase(nome)
+
+
+def medido(nome, funcao):
+    """Envolve `funcao` para que cada chamada seja cronometrada como a fase `nome`."""
+    def chamar(*args, **kwargs):
+        with fase(nome):
+            return funcao(*args, **kwargs)
+    return chamar
+
+
+def iniciar_rerun():
+    if not _ativo:
+        return
+    _local.fases = []
+    _local.inicio = time.perf_counter()
+    incrementar('reruns')
+
+
+def finalizar_rerun():
+    """Fecha o rerun atual, registra um log estruturado e devolve [(fase, segundos), ...]."""
+    if not _ativo or getattr(_local, 'fases', None) is None:
+        return []
+    fases = _local.fases
+    total = time.perf_counter() - _local.inicio
+    _local.fases = None
+    fases.append(('rerun_total', total))
+    logger.info(json.dumps({'evento': 'rerun', 'fases': {nome: round(s, 6) for nome, s in fases}}))
+    return fases
+
+
+# --- Contadores ---
+
+def incrementar(nome, valor=1, **rotulos):
+    if not _ativo:
+        return
+    chave = (nome, tuple(sorted(rotulos.items())))
+    with _trava:
+        _contadores[chave] = _contadores.get(chave, 0) + valor
+
+
+def registrar_coletor(nome, coletor):
+    """Registra (ou substitui) uma função que fornece métricas extras, ex.: estatísticas de cache."""
+    _coletores[nome] = coletor
+
+
+def texto_prometheus():
+    """Métricas no formato de texto do Prometheus."""
+    linhas = []
+    with _trava:
+        contadores = dict(_contadores)
+        soma, contagem = dict(_fases_soma), dict(_fases_contagem)
+
+    for (nome, rotulos), valor in sorted(contadores.items()):
+        rotulos_txt = ','.join(f'{k}="{v}"' for k, v in rotulos)
+        linhas.append(f"calculadora_{nome}_total{{{rotulos_txt}}} {valor}" if rotulos else f"calculadora_{nome}_total {valor}")
+
+    if soma:
+        linhas.append("# TYPE calculadora_fase_segundos summary")
+    for nome in sorted(soma):
+        linhas.append(f'calculadora_fase_segundos_sum{{fase="{nome}"}} {soma[nome]:.6f}')
+        linhas.append(f'calculadora_fase_segundos_count{{fase="{nome}"}} {contagem[nome]}')
+
+    for nome_coletor, coletor in sorted(_coletores.items()):
+        for metrica, valor in coletor().items():
+            linhas.append(f"calculadora_{nome_coletor}_{metrica} {valor}")
+    return '\n'.join(linhas) + '\n'
+
+
+# --- Endpoint HTTP ---
+
+class _MetricasHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip('/') != '/metrics':
+            self.send_error(404)
+            return
+        corpo = texto_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def iniciar_servidor_metricas(porta=None):
+    """Sobe (uma vez por processo) o endpoint /metrics numa thread daemon. Retorna a porta ou None."""
+    global _servidor
+    porta = porta if porta is not None else os.environ.get('CALC_METRICAS_PORTA')
+    if not porta:
+        return None
+    with _trava:
+        if _servidor is None:
+            _servidor = ThreadingHTTPServer(('127.0.0.1', int(porta)), _MetricasHandler)
+            threading.Thread(target=_servidor.serve_forever, daemon=True).start()
+    return _servidor.server_address[1]
@@ -0,0 +1,148 @@
+# --- Lista de Materiais (BOM) de Vários Produtos ---
+#
+# Cada produto é uma receita de itens que apontam para insumos do
+# CatalogoInsumos (pelo nome, que é o identificador usado em todo o app), para
+# outros produtos (kits/submontagens) ou para um custo manual, como a opção
+# "Outro (Manual)" da Aba 2. Índices reversos insumo -> produtos e
+# produto -> kits que o usam permitem reprecificar só o que foi afetado.
+
+from catalogo_insumos import CatalogoInsumos
+
+
+class ListaMateriais:
+    """Receitas de produtos com custo de materiais recalculado de forma incremental.
+
+    Formato dos itens de uma receita:
+        {'insumo': nome, 'qtd_usada': q}                   insumo do catálogo
+        {'produto': id, 'qtd_usada': q}                    submontagem / kit
+        {'nome': ..., 'custo_unidade': c, 'qtd_usada': q}  custo manual
+    """
+
+    def __init__(self, catalogo=None):
+        self.catalogo = catalogo if catalogo is not None else CatalogoInsumos()
+        self.produtos = {}
+        self._custos = {}
+        self._sujos = set()
+        self._usos_insumo = {}   # nome do insumo -> ids de produtos que o usam
+        self._usos_produto = {}  # id do produto -> ids de kits que o usam
+
+    # --- Receitas ---
+
+    def definir_produto(self, id_produto, itens):
+        """Cria ou substitui a receita de `id_produto`."""
+        itens = list(itens)
+        for item in itens:
+            filho = item.get('produto')
+            if filho is not None and (filho == id_produto or id_produto in self._dependencias(filho)):
+                raise ValueError(f"Ciclo na lista de materiais: '{id_produto}' -> '{filho}'.")
+
+        if id_produto in self.produtos:
+            self._desindexar(id_produto)
+        self.produtos[id_produto] = itens
+        for item in itens:
+            if 'insumo' in item:
+                self._usos_insumo.setdefault(item['insumo'], set()).add(id_produto)
+            elif 'produto' in item:
+                self._usos_produto.setdefault(item['produto'], set()).add(id_produto)
+        self._invalidar({id_produto})
+
+    def remover_produto(self, id_produto):
+        if self._usos_produto.get(id_produto):
+            raise ValueError(f"Produto '{id_produto}' é usado em outros kits.")
+        self._desindexar(id_produto)
+        del self.produtos[id_produto]
+        self._custos.pop(id_produto, None)
+        self._sujos.discard(id_produto)
+        self._usos_produto.pop(id_produto, None)
+
+    def _desindexar(self, id_produto):
+        for item in self.produtos[id_produto]:
+            if 'insumo' in item:
+                self._usos_insumo.get(item['insumo'], set()).discard(id_produto)
+            elif 'produto' in item:
+                self._usos_produto.get(item['produto'], set()).discard(id_produto)
+
+    def _dependencias(self, id_produto):
+        """Todos os produtos (diretos ou indiretos) usados na receita de `id_produto`."""
+        vistos = set()
+        pendentes = [id_produto]
+        while pendentes:
+            for item in self.produtos.get(pendentes.pop(), ()):
+                filho = item.get('produto')
+                if filho is not None and filho not in vistos:
+                    vistos.add(filho)
+                    pendentes.append(filho)
+        return vistos
+
+    # --- Invalidação ---
+
+    def _invalidar(self, ids):
+        """Marca `ids` e todos os kits que os contêm como sujos. Retorna o conjunto afetado."""
+        afetados = set()
+        pendentes = list(ids)
+        while pendentes:
+            id_produto = pendentes.pop()
+            if id_produto in afetados:
+                continue
+            afetados.add(id_produto)
+            pendentes.extend(self._usos_produto.get(id_produto, ()))
+        self._sujos |= afetados
+        return afetados
+
+    def insumo_alterado(self, *nomes):
+        """Avisa que o custo de um ou mais insumos mudou. Retorna os produtos afetados."""
+        diretos = set()
+        for nome in nomes:
+            diretos |= self._usos_insumo.get(nome, set())
+        return self._invalidar(diretos)
+
+    def atualizar_insumo(self, nome, /, **campos):
+        """Edita um insumo do catálogo e invalida só os produtos que dependem dele.
+
+        Com `nome=...` em `campos` o insumo é renomeado: as receitas que o usam
+        passam a apontar para o novo nome.
+        """
+        i = self.catalogo.posicao(nome)
+        if i is None:
+            raise KeyError(f"Insumo '{nome}' não encontrado.")
+        if not self.catalogo.atualizar(i, **campos):
+            return set()
+        novo_nome = campos.get('nome', nome)
+        if novo_nome != nome:
+            self._renomear_insumo(nome, novo_nome)
+        return self.insumo_alterado(novo_nome)
+
+    def _renomear_insumo(self, nome, novo_nome):
+        usos = self._usos_insumo.pop(nome, set())
+        for id_produto in usos:
+            self.produtos[id_produto] = [
+                dict(item, insumo=novo_nome) if item.get('insumo') == nome else item
+                for item in self.produtos[id_produto]
+            ]
+        self._usos_insumo.setdefault(novo_nome, set()).update(usos)
+
+    # --- Custos ---
+
+    def custo_material(self, id_produto):
+        """Custo de materiais de uma unidade do produto (kits incluem o custo dos filhos)."""
+        if id_produto in self._sujos or id_produto not in self._custos:
+            custo_total = 0.0
+            for item in self.produtos[id_produto]:
+                if 'insumo' in item:
+                    custo_unidade = self.catalogo.custo_unitario(item['insumo'])
+                elif 'produto' in item:
+                    custo_unidade = self.custo_material(item['produto'])
+                else:
+                    custo_unidade = item.get('custo_unidade', 0.00)
+                custo_total += custo_unidade * item.get('qtd_usada', 0.00)
+            self._custos[id_produto] = custo_total
+            self._sujos.discard(id_produto)
+        return self._custos[id_produto]
+
+    def custos_materiais(self):
+        """Dict id -> custo de materiais de todos os produtos (recalcula só os sujos)."""
+        return {id_produto: self.custo_material(id_produto) for id_produto in self.produtos}
+
+    def pendentes(self):
+        """Produtos cujo custo ainda precisa ser recalculado."""
+        return set(self._sujos)
@@ -0,0 +1,167 @@
+# --- Perfis de Taxas por Marketplace (Faixas e Tetos) ---
+#
+# Generaliza os três componentes de `custos_venda` (taxa_comissao,
+# taxa_por_item, custo_frete) para regras por faixa de preço, com mínimo e
+# teto em R$. Um perfil no formato antigo (só 'tipo'/'valor') continua válido.
+#
+# Exemplo de perfil:
+#   {
+#       'nome': 'Marketplace X',
+#       'taxa_imposto': 4.0,
+#       'taxa_comissao': {'tipo': 'percentual', 'valor': 16.0, 'maximo': 100.0},
+#       'taxa_por_item': {'faixas': [{'ate': 79.0, 'tipo': 'fixo', 'valor': 6.0},
+#                                    {'ate': None, 'tipo': 'fixo', 'valor': 0.0}]},
+#       'custo_frete':   {'faixas': [{'ate': 79.0, 'tipo': 'fixo', 'valor': 0.0},
+#                                    {'ate': None, 'tipo': 'fixo', 'valor': 22.0}]},
+#   }
+# Cada faixa vale para preços abaixo de 'ate' (a última, com 'ate': None, não
+# tem limite). 'minimo'/'maximo' limitam o valor em R$ do componente. Faixas e
+# componentes também aceitam a forma afim {'percentual': p, 'fixo': f}.
+#
+# Com faixas e tetos o lucro deixa de ter inversa em forma fechada, mas continua
+# afim por trechos: entre dois pontos de quebra (limites de faixa e preços em
+# que um teto/mínimo passa a valer), lucro(p) = a*p + b. O preço sugerido é o
+# menor preço com lucro >= desejado, resolvido trecho a trecho de uma vez para
+# todos os SKUs e perfis.
+
+import numpy as np
+
+from precificacao import termos_componente
+from precificacao_lote import COMPONENTES_MP, _como_array, _tamanho_lote
+
+
+def _faixas(componente):
+    """Normaliza um componente em arrays (limites, percentual, fixo, mínimo, máximo).
+
+    Cada faixa (ou o componente inteiro, sem faixas) segue o modelo afim de
+    precificacao.py: percentual% x preço + fixo.
+    """
+    faixas = componente.get('faixas') or [{**componente, 'ate': None}]
+    limites = np.array([np.inf if f.get('ate') is None else float(f['ate']) for f in faixas])
+    if np.any(np.diff(limites) <= 0) or limites[-1] != np.inf:
+        raise ValueError("Faixas devem ter limites crescentes e terminar com 'ate': None.")
+    termos = [termos_componente(f) if ('tipo' in f or 'percentual' in f or 'fixo' in f) else (0.0, 0.0) for f in faixas]
+    percentual = np.array([t[0] for t in termos])
+    fixo = np.array([t[1] for t in termos])
+    minimo = componente.get('minimo')
+    maximo = componente.get('maximo')
+    minimo = -np.inf if minimo is None else float(minimo)
+    maximo = np.inf if maximo is None else float(maximo)
+    return limites, percentual, fixo, minimo, maximo
+
+
+def _valor_componente(venda, faixas):
+    limites, percentual, fixo, minimo, maximo = faixas
+    faixa = np.searchsorted(limites, venda, side='right')
+    bruto = venda * (percentual[faixa] / 100) + fixo[faixa]
+    return np.clip(bruto, minimo, maximo)
+
+
+def _pontos_quebra(faixas):
+    """Preços em que o componente muda de regra (limites de faixa e início de mínimo/teto)."""
+    limites, percentual, fixo, minimo, maximo = faixas
+    pontos = list(limites[:-1])
+    inicio = np.concatenate([[0.0], limites[:-1]])
+    for i in np.flatnonzero(percentual > 0):
+        for limite_rs in (minimo, maximo):
+            if np.isfinite(limite_rs):
+                p = (limite_rs - fixo[i]) * 100 / percentual[i]
+                if inicio[i] < p < limites[i]:
+                    pontos.append(p)
+    return pontos
+
+
+class PerfilTaxas:
+    """Perfil de taxas de um marketplace, pré-processado para avaliação vetorizada."""
+
+    def __init__(self, perfil):
+        self.nome = perfil.get('nome', '')
+        self.tx_imposto = float(perfil.get('taxa_imposto', 0.0))
+        self._componentes = {c: _faixas(perfil[c]) for c in COMPONENTES_MP}
+
+        pontos = {0.0}
+        for faixas in self._componentes.values():
+            pontos.update(p for p in _pontos_quebra(faixas) if p > 0)
+        self.inicios = np.array(sorted(pontos))
+        self.fins = np.append(self.inicios[1:], np.inf)
+
+        # Receita líquida de taxas g(p) = p - imposto - taxas_mp(p), afim em cada trecho
+        g_inicio = self._receita_liquida(self.inicios)
+        amostra = np.where(np.isfinite(self.fins), (self.inicios + self.fins) / 2, self.inicios + 1.0)
+        self.inclinacoes = (self._receita_liquida(amostra) - g_inicio) / (amostra - self.inicios)
+        self.g_inicio = g_inicio
+
+    def taxas(self, venda):
+        """Valores em R$ de cada componente e do imposto para os preços `venda`."""
+        venda = np.asarray(venda, dtype=np.float64)
+        return {
+            'valor_taxa_comissao': _valor_componente(venda, self._componentes['taxa_comissao']),
+            'valor_taxa_por_item': _valor_componente(venda, self._componentes['taxa_por_item']),
+            'valor_custo_frete': _valor_componente(venda, self._componentes['custo_frete']),
+            'valor_taxa_imposto': venda * (self.tx_imposto / 100),
+        }
+
+    def _receita_liquida(self, venda):
+        return venda - sum(self.taxas(venda).values())
+
+    def lucro_real(self, venda, custo_material_total, custo_fixo_mo_embalagem):
+        """Versão por faixas de `calcular_lucro_real_lote` (retorna um dict de arrays)."""
+        venda = np.asarray(venda, dtype=np.float64)
+        taxas = self.taxas(venda)
+        custo_producao_base = np.asarray(custo_material_total, dtype=np.float64) + custo_fixo_mo_embalagem
+        custo_total_venda = custo_producao_base + sum(taxas.values())
+        return {
+            'custo_total_venda': custo_total_venda,
+            'lucro_bruto': venda - custo_producao_base,
+            'lucro_real': venda - custo_total_venda,
+            'custo_producao_base': custo_producao_base,
+            **taxas,
+        }
+
+    def preco_sugerido(self, custo_producao_base, lucro_fixo_desejado):
+        """Menor preço com lucro real >= desejado. Retorna (preco, valido) por SKU."""
+        alvo = np.atleast_1d(np.asarray(custo_producao_base, dtype=np.float64) + lucro_fixo_desejado)
+        # (SKUs x trechos): g(p) = g_inicio + a*(p - inicio) precisa alcançar `alvo`
+        falta = alvo[:, None] - self.g_inicio[None, :]
+        a = self.inclinacoes[None, :]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            p = np.where(falta <= 0, self.inicios, np.where(a > 0, self.inicios + falta / a, np.inf))
+        p = np.where(p < self.fins, p, np.inf)
+        preco = p.min(axis=1)
+        valido = np.isfinite(preco)
+        return np.where(valido, preco, 0.0), valido
+
+
+def precificar_multicanal(custo_material_total, custo_fixo_mo_embalagem, perfis, lucro_fixo_desejado):
+    """Preço sugerido de cada SKU em cada marketplace, numa única chamada.
+
+    `perfis` é uma lista de dicts de perfil (ou PerfilTaxas). Retorna um dict com
+    arrays (SKUs x perfis) de `preco_sugerido`, `valido`, `lucro_real` e
+    `margem_real`, além de `melhor_canal` (SKUs,): o índice do perfil com menor
+    preço para o mesmo lucro (-1 se nenhum perfil for viável).
+    """
+    perfis = [p if isinstance(p, PerfilTaxas) else PerfilTaxas(p) for p in perfis]
+    n = _tamanho_lote(custo_material_total, custo_fixo_mo_embalagem, lucro_fixo_desejado)
+    custo_material_total = _como_array(custo_material_total, n)
+    custo_base = custo_material_total + _como_array(custo_fixo_mo_embalagem, n)
+    lucro_fixo_desejado = _como_array(lucro_fixo_desejado, n)
+
+    precos = np.empty((n, len(perfis)))
+    validos = np.empty((n, len(perfis)), dtype=bool)
+    lucros = np.empty((n, len(perfis)))
+    for j, perfil in enumerate(perfis):
+        precos[:, j], validos[:, j] = perfil.preco_sugerido(custo_base, lucro_fixo_desejado)
+        lucros[:, j] = perfil.lucro_real(precos[:, j], custo_base, 0.0)['lucro_real']
+
+    margem_real = np.divide(lucros * 100, precos, out=np.zeros_like(precos), where=precos > 0)
+    melhor_canal = np.where(validos, precos, np.inf).argmin(axis=1)
+    melhor_canal = np.where(validos.any(axis=1), melhor_canal, -1)
+
+    return {
+        'canais': [perfil.nome for perfil in perfis],
+        'preco_sugerido': precos,
+        'valido': validos,
+        'lucro_real': lucros,
+        'margem_real': margem_real,
+        'melhor_canal': melhor_canal,
+    }
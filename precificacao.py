@@ -0,0 +1,155 @@
+# --- Núcleo de Precificação (sem Streamlit) ---
+#
+# Funções puras usadas pela interface (Calculadora.py), pela CLI e por workers.
+# Este módulo não importa Streamlit nem pandas, para carregar em milissegundos.
+
+COMPONENTES_MP = ('taxa_comissao', 'taxa_por_item', 'custo_frete')
+
+# --- Modelo Afim de Taxas ---
+#
+# Todo custo de venda tem a forma  percentual% x preço + fixo  (R$). Um
+# componente de marketplace pode declarar um dos termos ou os dois:
+#   {'tipo': 'percentual', 'valor': 16.0}      formato da Aba 3 (só um termo)
+#   {'tipo': 'fixo', 'valor': 3.0}
+#   {'percentual': 20.0, 'fixo': 4.0}          os dois termos (ex.: 20% + R$ 4 por venda)
+
+def termos_componente(componente):
+    """(percentual em %, fixo em R$) de um componente de taxa."""
+    if 'tipo' in componente:
+        if componente['tipo'] == 'percentual':
+            return float(componente['valor']), 0.0
+        return 0.0, float(componente['valor'])
+    return float(componente.get('percentual', 0.0)), float(componente.get('fixo', 0.0))
+
+
+def compilar_modelo_taxas(tx_imposto, taxas_mp):
+    """Reduz imposto + marketplace a (proporcional, fixo): custos de venda = proporcional x preço + fixo.
+
+    `proporcional` é uma fração (0.19 = 19%). Compilado uma vez, o preço para
+    um lucro desejado sai direto: (custo base + fixo + lucro) / (1 - proporcional).
+    """
+    proporcional = tx_imposto / 100
+    fixo = 0.0
+    for componente in COMPONENTES_MP:
+        percentual, valor_fixo = termos_componente(taxas_mp[componente])
+        proporcional += percentual / 100
+        fixo += valor_fixo
+    return proporcional, fixo
+
+
+def percentuais_taxas(tx_imposto, taxas_mp):
+    """{componente: percentual em %} de todos os termos proporcionais ao preço, imposto incluído.
+
+    A soma é o `proporcional` de `compilar_modelo_taxas` (em %): com 100% ou mais
+    o cálculo reverso é inválido.
+    """
+    percentuais = {'taxa_imposto': float(tx_imposto)}
+    for componente in COMPONENTES_MP:
+        percentuais[componente] = termos_componente(taxas_mp[componente])[0]
+    return percentuais
+
+
+# --- Função de Cálculo Principal (Direto) ---
+
+def calcular_lucro_real(venda, custo_material_total, custo_fixo_mo_embalagem, tx_imposto, taxas_mp):
+    
+    def calcular_custo_flexivel(componente, venda):
+        percentual, fixo = termos_componente(componente)
+        return venda * (percentual / 100) + fixo
+    
+    valor_taxa_comissao = calcular_custo_flexivel(taxas_mp['taxa_comissao'], venda)
+    valor_taxa_por_item = calcular_custo_flexivel(taxas_mp['taxa_por_item'], venda)
+    # CHAVE CORRIGIDA: 'custo_frete'
+    valor_custo_frete = calcular_custo_flexivel(taxas_mp['custo_frete'], venda)
+    
+    valor_taxa_imposto = venda * (tx_imposto / 100) 
+    custos_marketplace_total = valor_taxa_comissao + valor_taxa_por_item + valor_custo_frete
+    custo_producao_base = custo_material_total + custo_fixo_mo_embalagem 
+    custo_total_venda = custo_producao_base + custos_marketplace_total + valor_taxa_imposto
+    lucro_bruto = venda - custo_producao_base
+    lucro_real = venda - custo_total_venda
+    
+    return (
+        custo_total_venda, 
+        lucro_bruto, 
+        lucro_real, 
+        valor_taxa_imposto,
+        custo_producao_base,
+        valor_taxa_comissao,
+        valor_taxa_por_item,
+        valor_custo_frete
+    )
+
+# --- Função de Cálculo Reverso (Lucro Fixo Desejado) ---
+
+def calcular_preco_sugerido_lucro_fixo(custo_material_total, custo_fixo_mo_embalagem, tx_imposto, taxas_mp, lucro_fixo_desejado):
+    """Calcula o preço de venda ideal baseado em um lucro fixo desejado (R$).
+
+    Todos os termos percentuais (imposto, comissão, taxa por item e frete)
+    entram no denominador; todos os fixos, no numerador.
+    """
+    proporcional, custos_fixos_venda = compilar_modelo_taxas(tx_imposto, taxas_mp)
+
+    # Numerador: Custo total fixo a ser coberto + Lucro desejado
+    numerador = custo_material_total + custo_fixo_mo_embalagem + custos_fixos_venda + lucro_fixo_desejado
+
+    # Denominador (Percentuais que reduzem a receita)
+    denominador = 1 - proporcional
+    
+    if denominador <= 0:
+        return 0.0, 'inválido'
+        
+    preco_sugerido = numerador / denominador
+    
+    return preco_sugerido, 'ok'
+
+
+def verificar_modelo_taxas(custo_material_total, custo_fixo_mo_embalagem, tx_imposto, taxas_mp, lucro_fixo_desejado, tolerancia=1e-6):
+    """Confere o cálculo reverso contra o direto: o preço sugerido deve render o lucro desejado.
+
+    Retorna (consistente, diferença em R$). Casos inválidos (percentuais >= 100%) retornam (True, 0.0).
+    """
+    preco, status = calcular_preco_sugerido_lucro_fixo(
+        custo_material_total, custo_fixo_mo_embalagem, tx_imposto, taxas_mp, lucro_fixo_desejado
+    )
+    if status != 'ok':
+        return True, 0.0
+    lucro_real = calcular_lucro_real(preco, custo_material_total, custo_fixo_mo_embalagem, tx_imposto, taxas_mp)[2]
+    diferenca = lucro_real - lucro_fixo_desejado
+    return abs(diferenca) <= tolerancia * max(1.0, abs(preco)), diferenca
+
+
+# --- Cálculo de Insumos Base ---
+
+def calcular_custo_unitario_insumo(insumo):
+    """Custo por unidade (UN) ou mililitro (ML) de um insumo comprado em pacote."""
+    qtd_pacote = insumo.get('qtd_pacote', 1.0)
+    if qtd_pacote > 0:
+        return insumo['valor_pacote'] / qtd_pacote
+    return 0.0
+
+def calcular_insumos_unitarios(insumos_base):
+    """Mapeia o nome de cada insumo ao seu custo unitário."""
+    insumos_unitarios = {}
+    for insumo in insumos_base:
+        insumos_unitarios[insumo['nome']] = calcular_custo_unitario_insumo(insumo)
+    return insumos_unitarios
+
+def calcular_custo_total_materiais(materiais_produto):
+    """Soma custo_unidade x qtd_usada de todos os materiais do produto."""
+    if hasattr(materiais_produto, 'coluna'):
+        # Tabela colunar (tabela_colunar.py): produto escalar direto sobre as colunas
+        return float(materiais_produto.coluna('custo_unidade') @ materiais_produto.coluna('qtd_usada'))
+    custo_total = 0.0
+    for material in materiais_produto:
+        custo_total += material.get('custo_unidade', 0.00) * material.get('qtd_usada', 0.00)
+    return custo_total
+
+
+# --- Função de Formatação (Padrão BRL) ---
+
+# Troca ',' <-> '.' numa única passada (padrão en-US do format -> PT-BR)
+_SEPARADORES_BRL = str.maketrans({',': '.', '.': ','})
+
+def formatar_brl(valor):
+    return f"R$ {valor:,.2f}".translate(_SEPARADORES_BRL)
@@ -0,0 +1,235 @@
+import numpy as np
+
+from precificacao_lote import COMPONENTES_MP, _argumentos_componente, _como_array, _mascara_percentual, _tamanho_lote
+
+# --- Precificação Exata em Centavos (Vetorizada) ---
+#
+# Modo exato para conciliações: valores em R$ viram centavos (int64) e
+# percentuais viram pontos-base (centésimos de ponto percentual, 15,5% -> 1550)
+# uma única vez, na entrada. Cada taxa percentual é arredondada para o centavo
+# por uma regra explícita, com aritmética inteira; assim o lucro real recalculado
+# a partir do preço sugerido bate centavo a centavo, sem o custo de `Decimal`.
+
+ESCALA_PERCENTUAL = 100 * 100  # pontos-base por 100%
+
+# Regras de arredondamento aceitas por componente
+MEIO_PARA_CIMA = 'meio_para_cima'  # 0,5 centavo sobe (arredondamento comercial)
+MEIO_PAR = 'meio_par'              # 0,5 centavo vai para o par (bancário)
+PARA_CIMA = 'para_cima'            # qualquer fração sobe (teto)
+PARA_BAIXO = 'para_baixo'          # qualquer fração é descartada (piso)
+
+REGRAS_PADRAO = {
+    'taxa_imposto': MEIO_PARA_CIMA,
+    'taxa_comissao': MEIO_PARA_CIMA,
+    'taxa_por_item': MEIO_PARA_CIMA,
+    'custo_frete': MEIO_PARA_CIMA,
+}
+
+CAMPOS_MONETARIOS = (
+    'preco_sugerido', 'custo_material_total', 'custo_total_venda', 'lucro_bruto', 'lucro_real',
+    'valor_taxa_imposto', 'custo_producao_base', 'valor_taxa_comissao', 'valor_taxa_por_item', 'valor_custo_frete',
+)
+
+
+def para_centavos(valor):
+    """R$ (float ou array) -> centavos int64, arredondando a meio centavo."""
+    return np.round(np.asarray(valor, dtype=np.float64) * 100).astype(np.int64)
+
+
+def para_pontos_base(percentual):
+    """Percentual (15.5) -> pontos-base int64 (1550)."""
+    return np.round(np.asarray(percentual, dtype=np.float64) * 100).astype(np.int64)
+
+
+def para_reais(centavos):
+    return np.asarray(centavos, dtype=np.int64) / 100
+
+
+def dividir_arredondando(numerador, denominador, regra):
+    """Divisão inteira com a regra de arredondamento dada (numerador >= 0, denominador > 0)."""
+    quociente, resto = np.divmod(numerador, denominador)
+    if regra == PARA_BAIXO:
+        return quociente
+    if regra == PARA_CIMA:
+        return quociente + (resto > 0)
+    dobro = 2 * resto
+    if regra == MEIO_PARA_CIMA:
+        return quociente + (dobro >= denominador)
+    if regra == MEIO_PAR:
+        return quociente + ((dobro > denominador) | ((dobro == denominador) & (quociente % 2 == 1)))
+    raise ValueError(f"Regra de arredondamento desconhecida: '{regra}'.")
+
+
+def _regras(regras):
+    return {**REGRAS_PADRAO, **(regras or {})}
+
+
+def calcular_lucro_real_centavos(venda, custo_material_total, custo_fixo_mo_embalagem, imposto_pb,
+                                 comissao_percentual, comissao_valor,
+                                 item_percentual, item_valor,
+                                 frete_percentual, frete_valor,
+                                 comissao_fixo=0, item_fixo=0, frete_fixo=0,
+                                 regras=None):
+    """Versão exata de `calcular_lucro_real_lote`.
+
+    Valores monetários em centavos (int64); `imposto_pb` e os valores de
+    componentes percentuais em pontos-base, os de componentes fixos (e os
+    `*_fixo` extras) em centavos. Retorna um dict de arrays int64 (centavos).
+    """
+    regras = _regras(regras)
+    n = _tamanho_lote(venda, custo_material_total, custo_fixo_mo_embalagem, imposto_pb,
+                      comissao_valor, item_valor, frete_valor)
+    venda = _inteiros(venda, n)
+
+    def custo_flexivel(componente, percentual, valor, fixo):
+        percentual = _mascara_percentual(percentual, n)
+        valor = _inteiros(valor, n)
+        proporcional = dividir_arredondando(venda * valor, ESCALA_PERCENTUAL, regras[componente])
+        return np.where(percentual, proporcional, valor) + _inteiros(fixo, n)
+
+    valor_taxa_comissao = custo_flexivel('taxa_comissao', comissao_percentual, comissao_valor, comissao_fixo)
+    valor_taxa_por_item = custo_flexivel('taxa_por_item', item_percentual, item_valor, item_fixo)
+    valor_custo_frete = custo_flexivel('custo_frete', frete_percentual, frete_valor, frete_fixo)
+    valor_taxa_imposto = dividir_arredondando(venda * _inteiros(imposto_pb, n), ESCALA_PERCENTUAL, regras['taxa_imposto'])
+
+    custo_producao_base = _inteiros(custo_material_total, n) + _inteiros(custo_fixo_mo_embalagem, n)
+    custo_total_venda = custo_producao_base + valor_taxa_comissao + valor_taxa_por_item + valor_custo_frete + valor_taxa_imposto
+
+    return {
+        'custo_total_venda': custo_total_venda,
+        'lucro_bruto': venda - custo_producao_base,
+        'lucro_real': venda - custo_total_venda,
+        'valor_taxa_imposto': valor_taxa_imposto,
+        'custo_producao_base': custo_producao_base,
+        'valor_taxa_comissao': valor_taxa_comissao,
+        'valor_taxa_por_item': valor_taxa_por_item,
+        'valor_custo_frete': valor_custo_frete,
+    }
+
+
+def calcular_preco_sugerido_centavos(custo_material_total, custo_fixo_mo_embalagem, imposto_pb,
+                                     comissao_percentual, comissao_valor,
+                                     item_percentual, item_valor,
+                                     frete_percentual, frete_valor,
+                                     lucro_fixo_desejado,
+                                     comissao_fixo=0, item_fixo=0, frete_fixo=0, regras=None):
+    """Menor preço em centavos cujo lucro real (calculado em centavos) atinge o desejado.
+
+    Mesmas unidades de `calcular_lucro_real_centavos`. Retorna (preco, valido);
+    linhas inválidas (percentuais somando 100% ou mais) recebem preço 0.
+    Todos os componentes percentuais entram no cálculo.
+    """
+    n = _tamanho_lote(custo_material_total, custo_fixo_mo_embalagem, imposto_pb,
+                      comissao_valor, item_valor, frete_valor, lucro_fixo_desejado)
+    taxas = []
+    percentual_total = _inteiros(imposto_pb, n).copy()
+    fixos = np.zeros(n, dtype=np.int64)
+    extras = {'comissao_fixo': _inteiros(comissao_fixo, n), 'item_fixo': _inteiros(item_fixo, n), 'frete_fixo': _inteiros(frete_fixo, n)}
+    for percentual, valor, extra in ((comissao_percentual, comissao_valor, extras['comissao_fixo']),
+                                     (item_percentual, item_valor, extras['item_fixo']),
+                                     (frete_percentual, frete_valor, extras['frete_fixo'])):
+        percentual = _mascara_percentual(percentual, n)
+        valor = _inteiros(valor, n)
+        percentual_total += np.where(percentual, valor, 0)
+        fixos += np.where(percentual, 0, valor) + extra
+        taxas += [percentual, valor]
+
+    base = _inteiros(custo_material_total, n) + _inteiros(custo_fixo_mo_embalagem, n)
+    alvo = _inteiros(lucro_fixo_desejado, n)
+    valido = percentual_total < ESCALA_PERCENTUAL
+    restante = np.where(valido, ESCALA_PERCENTUAL - percentual_total, 1)
+
+    # Estimativa contínua e ponto de partida abaixo da resposta: cada uma das 4
+    # taxas arredondadas desvia no máximo 1 centavo, o que move o preço em até
+    # 4 / (1 - percentual total) centavos.
+    numerador = (base + fixos + alvo) * ESCALA_PERCENTUAL
+    folga = dividir_arredondando(5 * ESCALA_PERCENTUAL, restante, PARA_CIMA)
+    preco = np.maximum(numerador // restante - folga, 0)
+
+    # Sobe centavo a centavo só nas linhas que ainda não atingiram o lucro
+    imposto_pb = _inteiros(imposto_pb, n)
+    pendentes = np.flatnonzero(valido)
+    while pendentes.size:
+        lucro = calcular_lucro_real_centavos(
+            preco[pendentes], base[pendentes], 0, imposto_pb[pendentes],
+            *(t[pendentes] for t in taxas),
+            **{nome: extra[pendentes] for nome, extra in extras.items()}, regras=regras,
+        )['lucro_real']
+        atingiu = lucro >= alvo[pendentes]
+        pendentes = pendentes[~atingiu]
+        preco[pendentes] += 1
+
+    return np.where(valido, preco, 0), valido
+
+
+def _inteiros(valor, n):
+    arr = np.asarray(valor, dtype=np.int64)
+    if arr.ndim == 0:
+        return np.full(n, int(arr), dtype=np.int64)
+    return arr
+
+
+def _taxas_centavos(dados, taxas_mp, n):
+    """Tipo e valor de cada componente, com valores percentuais em pontos-base e fixos em centavos.
+
+    Retorna (argumentos posicionais, dict com os `*_fixo` extras em centavos).
+    """
+    argumentos, fixos = [], {}
+    for componente, nome_fixo in zip(COMPONENTES_MP, ('comissao_fixo', 'item_fixo', 'frete_fixo')):
+        col_tipo, col_valor, col_fixo = f'{componente}_tipo', f'{componente}_valor', f'{componente}_fixo'
+        if col_valor in dados:
+            tipo = dados[col_tipo] if col_tipo in dados else 'fixo'
+            valor = dados[col_valor]
+            fixo = dados[col_fixo] if col_fixo in dados else 0.0
+        elif taxas_mp is not None:
+            tipo, valor, fixo = _argumentos_componente(taxas_mp[componente])
+        else:
+            raise KeyError(f"Coluna '{col_valor}' ausente e nenhum 'taxas_mp' padrão informado.")
+        percentual = _mascara_percentual(np.asarray(tipo), n)
+        valor = _como_array(np.asarray(valor), n)
+        # Pontos-base e centavos usam o mesmo fator 100
+        argumentos += [percentual, np.round(valor * 100).astype(np.int64)]
+        fixos[nome_fixo] = para_centavos(_como_array(np.asarray(fixo), n))
+    return argumentos, fixos
+
+
+def precificar_catalogo_centavos(dados, taxas_mp=None, regras=None):
+    """Modo exato de `precificar_catalogo`: mesmas colunas de entrada, em R$ e %.
+
+    Converte para centavos/pontos-base na entrada e retorna um dict com as
+    mesmas chaves de `precificar_catalogo`, com os valores monetários em
+    centavos (int64; use `para_reais` para exibir). `regras` sobrepõe
+    REGRAS_PADRAO por componente.
+    """
+    custo_material = para_centavos(dados['custo_material_total'])
+    n = len(custo_material)
+
+    def coluna(nome):
+        if nome in dados:
+            return _como_array(np.asarray(dados[nome]), n)
+        if taxas_mp is not None and nome in taxas_mp:
+            return _como_array(taxas_mp[nome], n)
+        raise KeyError(f"Coluna '{nome}' ausente.")
+
+    custo_fixo = para_centavos(coluna('custo_fixo_mo_embalagem'))
+    imposto = para_pontos_base(coluna('taxa_imposto'))
+    lucro_desejado = para_centavos(coluna('lucro_fixo_desejado'))
+    taxas, fixos = _taxas_centavos(dados, taxas_mp, n)
+
+    preco_sugerido, valido = calcular_preco_sugerido_centavos(
+        custo_material, custo_fixo, imposto, *taxas, lucro_desejado, **fixos, regras=regras
+    )
+    detalhamento = calcular_lucro_real_centavos(
+        preco_sugerido, custo_material, custo_fixo, imposto, *taxas, **fixos, regras=regras
+    )
+    margem_real = np.divide(
+        detalhamento['lucro_real'] * 100.0, preco_sugerido,
+        out=np.zeros(n), where=preco_sugerido > 0
+    )
+    return {
+        'preco_sugerido': preco_sugerido,
+        'valido': valido,
+        'margem_real': margem_real,
+        'custo_material_total': custo_material,
+        **detalhamento,
+    }
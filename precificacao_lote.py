@@ -0,0 +1,371 @@
+import numpy as np
+
+from precificacao import COMPONENTES_MP, formatar_brl, termos_componente
+
+# --- Precificação em Lote (Vetorizada) ---
+#
+# Mesma matemática de `calcular_lucro_real` e `calcular_preco_sugerido_lucro_fixo`
+# (precificacao.py), mas operando sobre arrays NumPy: cada SKU é uma posição do
+# array e os ramos 'percentual'/'fixo' viram máscaras booleanas. Componentes
+# com os dois termos (ex.: 20% + R$ 4) passam o fixo em `<componente>_fixo`.
+
+def _como_array(valor, n):
+    """Converte escalar ou sequência em array float64 de tamanho n."""
+    arr = np.asarray(valor, dtype=np.float64)
+    if arr.ndim == 0:
+        return np.full(n, float(arr))
+    return arr
+
+
+def _mascara_percentual(tipo, n):
+    """Converte o tipo ('percentual'/'fixo' ou booleano) em máscara booleana."""
+    arr = np.asarray(tipo)
+    if arr.dtype != np.bool_:
+        arr = arr == 'percentual'
+    if arr.ndim == 0:
+        return np.full(n, bool(arr))
+    return arr
+
+
+def _tamanho_lote(*valores):
+    """Descobre o tamanho do lote a partir do primeiro argumento não escalar."""
+    for valor in valores:
+        if np.ndim(valor) > 0:
+            return len(valor)
+    return 1
+
+
+def calcular_lucro_real_lote(venda, custo_material_total, custo_fixo_mo_embalagem, tx_imposto,
+                             comissao_percentual, comissao_valor,
+                             item_percentual, item_valor,
+                             frete_percentual, frete_valor,
+                             comissao_fixo=0.0, item_fixo=0.0, frete_fixo=0.0):
+    """Versão vetorizada de `calcular_lucro_real`. Retorna um dict de arrays."""
+    n = _tamanho_lote(venda, custo_material_total, custo_fixo_mo_embalagem, tx_imposto,
+                      comissao_valor, item_valor, frete_valor)
+
+    venda = _como_array(venda, n)
+    custo_material_total = _como_array(custo_material_total, n)
+    custo_fixo_mo_embalagem = _como_array(custo_fixo_mo_embalagem, n)
+    tx_imposto = _como_array(tx_imposto, n)
+
+    def custo_flexivel(percentual, valor, fixo):
+        percentual = _mascara_percentual(percentual, n)
+        valor = _como_array(valor, n)
+        return np.where(percentual, venda * (valor / 100), valor) + fixo
+
+    valor_taxa_comissao = custo_flexivel(comissao_percentual, comissao_valor, comissao_fixo)
+    valor_taxa_por_item = custo_flexivel(item_percentual, item_valor, item_fixo)
+    valor_custo_frete = custo_flexivel(frete_percentual, frete_valor, frete_fixo)
+
+    valor_taxa_imposto = venda * (tx_imposto / 100)
+    custos_marketplace_total = valor_taxa_comissao + valor_taxa_por_item + valor_custo_frete
+    custo_producao_base = custo_material_total + custo_fixo_mo_embalagem
+    custo_total_venda = custo_producao_base + custos_marketplace_total + valor_taxa_imposto
+
+    return {
+        'custo_total_venda': custo_total_venda,
+        'lucro_bruto': venda - custo_producao_base,
+        'lucro_real': venda - custo_total_venda,
+        'valor_taxa_imposto': valor_taxa_imposto,
+        'custo_producao_base': custo_producao_base,
+        'valor_taxa_comissao': valor_taxa_comissao,
+        'valor_taxa_por_item': valor_taxa_por_item,
+        'valor_custo_frete': valor_custo_frete,
+    }
+
+
+def compilar_modelo_taxas_lote(tx_imposto, comissao_percentual, comissao_valor,
+                               item_percentual, item_valor,
+                               frete_percentual, frete_valor,
+                               comissao_fixo=0.0, item_fixo=0.0, frete_fixo=0.0):
+    """Versão vetorizada de `compilar_modelo_taxas`: arrays (proporcional, fixo) por SKU."""
+    n = _tamanho_lote(tx_imposto, comissao_valor, item_valor, frete_valor, comissao_fixo, item_fixo, frete_fixo)
+    proporcional = _como_array(tx_imposto, n) / 100
+    fixo = np.zeros(n)
+    for percentual, valor, extra in ((comissao_percentual, comissao_valor, comissao_fixo),
+                                     (item_percentual, item_valor, item_fixo),
+                                     (frete_percentual, frete_valor, frete_fixo)):
+        percentual = _mascara_percentual(percentual, n)
+        valor = _como_array(valor, n)
+        proporcional += np.where(percentual, valor / 100, 0.0)
+        fixo += np.where(percentual, 0.0, valor) + extra
+    return proporcional, fixo
+
+
+def calcular_preco_sugerido_lote(custo_material_total, custo_fixo_mo_embalagem, tx_imposto,
+                                 comissao_percentual, comissao_valor,
+                                 item_percentual, item_valor,
+                                 frete_percentual, frete_valor,
+                                 lucro_fixo_desejado,
+                                 comissao_fixo=0.0, item_fixo=0.0, frete_fixo=0.0):
+    """Versão vetorizada de `calcular_preco_sugerido_lucro_fixo`.
+
+    Retorna (preco_sugerido, valido). Linhas inválidas (percentuais somando 100%
+    ou mais) recebem preço 0.0, como na versão escalar.
+    """
+    n = _tamanho_lote(custo_material_total, custo_fixo_mo_embalagem, tx_imposto,
+                      comissao_valor, item_valor, frete_valor, lucro_fixo_desejado)
+    proporcional, custos_fixos_venda = compilar_modelo_taxas_lote(
+        _como_array(tx_imposto, n), comissao_percentual, comissao_valor,
+        item_percentual, item_valor, frete_percentual, frete_valor,
+        comissao_fixo, item_fixo, frete_fixo,
+    )
+
+    numerador = (
+        _como_array(custo_material_total, n) + _como_array(custo_fixo_mo_embalagem, n)
+        + custos_fixos_venda + _como_array(lucro_fixo_desejado, n)
+    )
+    denominador = 1 - proporcional
+
+    valido = denominador > 0
+    preco_sugerido = np.divide(numerador, denominador, out=np.zeros(n), where=valido)
+
+    return preco_sugerido, valido
+
+
+def _argumentos_componente(componente):
+    """Componente no formato dict (Aba 3 ou afim) -> (é percentual, valor, fixo extra) do lote."""
+    percentual, fixo = termos_componente(componente)
+    if percentual:
+        return True, percentual, fixo
+    return False, fixo, 0.0
+
+
+def _colunas_taxas(dados, taxas_mp, n):
+    """Lê tipo/valor (e o fixo extra) de cada componente das colunas ou do dict `taxas_mp`.
+
+    Retorna (argumentos posicionais, dict com `<comissao|item|frete>_fixo`).
+    """
+    argumentos, fixos = [], {}
+    for componente, nome_fixo in zip(COMPONENTES_MP, ('comissao_fixo', 'item_fixo', 'frete_fixo')):
+        col_tipo, col_valor, col_fixo = f'{componente}_tipo', f'{componente}_valor', f'{componente}_fixo'
+        if col_valor in dados:
+            tipo = dados[col_tipo] if col_tipo in dados else 'fixo'
+            valor = dados[col_valor]
+            fixo = dados[col_fixo] if col_fixo in dados else 0.0
+        elif taxas_mp is not None:
+            tipo, valor, fixo = _argumentos_componente(taxas_mp[componente])
+        else:
+            raise KeyError(f"Coluna '{col_valor}' ausente e nenhum 'taxas_mp' padrão informado.")
+        argumentos.append(_mascara_percentual(np.asarray(tipo), n))
+        argumentos.append(_como_array(np.asarray(valor), n))
+        fixos[nome_fixo] = _como_array(np.asarray(fixo), n)
+    return argumentos, fixos
+
+
+def precificar_catalogo(dados, taxas_mp=None):
+    """Precifica um catálogo inteiro em uma única passada vetorizada.
+
+    `dados` pode ser um pandas DataFrame ou um dict de arrays com as colunas
+    `custo_material_total`, `custo_fixo_mo_embalagem`, `taxa_imposto`,
+    `lucro_fixo_desejado` e, para cada componente de marketplace
+    (`taxa_comissao`, `taxa_por_item`, `custo_frete`), `<componente>_tipo`,
+    `<componente>_valor` e opcionalmente `<componente>_fixo`. Componentes ausentes usam o dict `taxas_mp`
+    (mesmo formato de `st.session_state.custos_venda`), aplicado a todas as linhas.
+
+    Retorna um dict de arrays (ou DataFrame, se a entrada for DataFrame) com o
+    preço sugerido, a margem real e o detalhamento completo de custos.
+    """
+    custo_material = np.asarray(dados['custo_material_total'], dtype=np.float64)
+    n = len(custo_material)
+
+    def coluna(nome):
+        if nome in dados:
+            return _como_array(np.asarray(dados[nome]), n)
+        if taxas_mp is not None and nome in taxas_mp:
+            return _como_array(taxas_mp[nome], n)
+        raise KeyError(f"Coluna '{nome}' ausente.")
+
+    custo_fixo = coluna('custo_fixo_mo_embalagem')
+    tx_imposto = coluna('taxa_imposto')
+    lucro_desejado = coluna('lucro_fixo_desejado')
+    taxas, fixos = _colunas_taxas(dados, taxas_mp, n)
+
+    preco_sugerido, valido = calcular_preco_sugerido_lote(
+        custo_material, custo_fixo, tx_imposto, *taxas, lucro_desejado, **fixos
+    )
+    detalhamento = calcular_lucro_real_lote(
+        preco_sugerido, custo_material, custo_fixo, tx_imposto, *taxas, **fixos
+    )
+
+    margem_real = np.divide(
+        detalhamento['lucro_real'] * 100, preco_sugerido,
+        out=np.zeros(n), where=preco_sugerido > 0
+    )
+
+    resultado = {
+        'preco_sugerido': preco_sugerido,
+        'valido': valido,
+        'margem_real': margem_real,
+        'custo_material_total': custo_material,
+        **detalhamento,
+    }
+
+    # Importa pandas só quando a entrada já é um DataFrame (mantém o módulo leve).
+    if hasattr(dados, 'columns') and hasattr(dados, 'index'):
+        import pandas as pd
+        return pd.DataFrame(resultado, index=dados.index)
+    return resultado
+
+
+# --- Curva de Lucro (Sensibilidade ao Preço) ---
+
+def variar_comissao(taxas_mp, comissoes):
+    """Cópias de `taxas_mp` com a comissão percentual trocada por cada valor de `comissoes`."""
+    return [
+        {**taxas_mp, 'taxa_comissao': {'tipo': 'percentual', 'valor': float(comissao)}}
+        for comissao in comissoes
+    ]
+
+
+def curva_lucro(precos, custo_material_total, custo_fixo_mo_embalagem, tx_imposto, perfis, lucros_desejados=()):
+    """Avalia `calcular_lucro_real` numa grade de preços para um ou mais perfis de taxas.
+
+    `perfis` é um dict de taxas (formato de `custos_venda`) ou uma lista deles.
+    Toda a grade perfis x preços é calculada numa única chamada vetorizada.
+
+    Retorna um dict com `precos` (m,), as curvas (p, m) de `lucro_real`,
+    `margem_real`, `custos_marketplace` e `valor_taxa_imposto`, o
+    `ponto_equilibrio` (p,) de cada perfil (preço com lucro real zero, NaN se
+    as taxas percentuais somam 100% ou mais) e, se houver `lucros_desejados`
+    (k,), os `precos_alvo` (p, k) que atingem cada lucro.
+    """
+    if isinstance(perfis, dict):
+        perfis = [perfis]
+    precos = np.asarray(precos, dtype=np.float64)
+    p, m = len(perfis), len(precos)
+
+    # Uma linha por perfil, repetida ao longo da grade de preços
+    taxas, fixos = [], {}
+    for componente, nome_fixo in zip(COMPONENTES_MP, ('comissao_fixo', 'item_fixo', 'frete_fixo')):
+        percentual, valor, fixo = zip(*(_argumentos_componente(perfil[componente]) for perfil in perfis))
+        taxas += [np.repeat(percentual, m), np.repeat(valor, m)]
+        fixos[nome_fixo] = np.repeat(fixo, m)
+
+    detalhamento = calcular_lucro_real_lote(
+        np.tile(precos, p), custo_material_total, custo_fixo_mo_embalagem, tx_imposto, *taxas, **fixos
+    )
+    lucro_real = detalhamento['lucro_real'].reshape(p, m)
+    margem_real = np.divide(
+        lucro_real * 100, precos,
+        out=np.zeros((p, m)), where=np.broadcast_to(precos > 0, (p, m))
+    )
+    custos_marketplace = (
+        detalhamento['valor_taxa_comissao'] + detalhamento['valor_taxa_por_item'] + detalhamento['valor_custo_frete']
+    ).reshape(p, m)
+
+    # Ponto de equilíbrio e preços-alvo saem do cálculo reverso (forma fechada)
+    lucros = np.concatenate([[0.0], np.asarray(lucros_desejados, dtype=np.float64)])
+    k = len(lucros)
+    precos_reversos, valido = calcular_preco_sugerido_lote(
+        custo_material_total, custo_fixo_mo_embalagem, tx_imposto,
+        *[np.repeat(t[::m], k) for t in taxas],
+        np.tile(lucros, p),
+        **{nome: np.repeat(fixo[::m], k) for nome, fixo in fixos.items()}
+    )
+    precos_reversos = np.where(valido, precos_reversos, np.nan).reshape(p, k)
+
+    return {
+        'precos': precos,
+        'lucro_real': lucro_real,
+        'margem_real': margem_real,
+        'custos_marketplace': custos_marketplace,
+        'valor_taxa_imposto': detalhamento['valor_taxa_imposto'].reshape(p, m),
+        'ponto_equilibrio': precos_reversos[:, 0],
+        'precos_alvo': precos_reversos[:, 1:],
+    }
+
+
+# --- Formatação em Lote (Padrão BRL) ---
+
+BLOCO_FORMATACAO = 65_536
+# Abaixo disso, formatar valor a valor sai mais barato que montar os arrays
+MINIMO_VETORIZADO = 256
+# A partir daqui |valor| x 100 não é mais exato em float64 (2**52 centavos): esses valores,
+# como NaN e infinitos, são formatados um a um por `formatar_brl`
+LIMITE_VETORIZADO = 2.0 ** 52 / 100
+
+
+def _centavos_absolutos(numeros):
+    """|valor| em centavos com o mesmo arredondamento do format '.2f' (valor binário exato, empate para o par)."""
+    absolutos = np.abs(numeros)
+    produto = absolutos * 100
+    # Erro exato do produto (Dekker): só importa quando o produto caiu exatamente num empate x,5
+    divisao = 134217729.0 * absolutos
+    alto = divisao - (divisao - absolutos)
+    erro = (alto * 100 - produto) + (absolutos - alto) * 100
+    piso = np.floor(produto)
+    empate = (produto - piso) == 0.5
+    centavos = np.where(empate & (erro > 0), piso + 1, np.where(empate & (erro < 0), piso, np.round(produto)))
+    return centavos.astype(np.int64)
+
+
+def _formatar_bloco_brl(numeros, prefixo):
+    """Monta os textos de um bloco direto como códigos Unicode (uint32) e os vê como array 'U'."""
+    n = len(numeros)
+    reais, fracao = np.divmod(_centavos_absolutos(numeros), 100)
+    sinal = np.signbit(numeros)
+    max_digitos = max(1, len(str(int(reais.max()))))
+    n_digitos = np.ones(n, dtype=np.int64)
+    for j in range(1, max_digitos):
+        n_digitos += reais >= 10 ** j
+    tam_inteiro = n_digitos + (n_digitos - 1) // 3                   # com os pontos de milhar
+    fim = len(prefixo) + sinal + tam_inteiro + 3                      # + ',' e dois dígitos
+    largura = int(fim.max())
+
+    codigos = np.zeros((n, largura), dtype=np.uint32)
+    linhas = np.arange(n)
+    if prefixo:
+        codigos[:, :len(prefixo)] = [ord(c) for c in prefixo]
+    codigos[sinal, len(prefixo)] = ord('-')
+    codigos[linhas, fim - 1] = 48 + fracao % 10
+    codigos[linhas, fim - 2] = 48 + fracao // 10
+    codigos[linhas, fim - 3] = ord(',')
+
+    # Parte inteira da direita para a esquerda: o dígito j fica j + j//3 casas antes da vírgula
+    resto = reais
+    for j in range(max_digitos):
+        if j and j % 3 == 0:
+            com_ponto = n_digitos > j
+            codigos[linhas[com_ponto], fim[com_ponto] - 4 - (j + j // 3 - 1)] = ord('.')
+        usa = n_digitos > j
+        resto, digito = np.divmod(resto, 10)
+        codigos[linhas[usa], fim[usa] - 4 - (j + j // 3)] = 48 + digito[usa]
+    return codigos.view(f'<U{largura}').ravel()
+
+
+def formatar_brl_lote(valores, prefixo='R$ '):
+    """Versão vetorizada de `formatar_brl`: array (ou Series) de valores -> textos 'R$ 1.234,56'.
+
+    Mesmo resultado de `formatar_brl` valor a valor, mas calculado em centavos
+    inteiros e montado por operações de array, em blocos de BLOCO_FORMATACAO.
+    """
+    indice = valores.index if hasattr(valores, 'iloc') else None
+    numeros = np.asarray(valores, dtype=np.float64)
+    forma = numeros.shape
+    numeros = numeros.ravel()
+    with np.errstate(invalid='ignore'):
+        exatos = np.abs(numeros) < LIMITE_VETORIZADO
+
+    if len(numeros) < MINIMO_VETORIZADO:
+        textos = np.array([formatar_brl(v).replace('R$ ', prefixo, 1) for v in numeros.tolist()], dtype=object)
+    else:
+        textos = np.concatenate([
+            _formatar_bloco_brl(np.where(exatos[i:i + BLOCO_FORMATACAO], numeros[i:i + BLOCO_FORMATACAO], 0.0), prefixo)
+            for i in range(0, len(numeros), BLOCO_FORMATACAO)
+        ])
+        if not exatos.all():
+            textos = textos.astype(object)
+            textos[~exatos] = [formatar_brl(v).replace('R$ ', prefixo, 1) for v in numeros[~exatos].tolist()]
+    textos = textos.reshape(forma)
+
+    if indice is not None:
+        import pandas as pd
+        return pd.Series(textos, index=indice, name=getattr(valores, 'name', None))
+    return textos
+
+
+def formatar_colunas_brl(df, colunas, prefixo='R$ '):
+    """Cópia do DataFrame com as `colunas` monetárias já formatadas em BRL (para relatórios)."""
+    return df.assign(**{coluna: formatar_brl_lote(df[coluna], prefixo) for coluna in colunas})
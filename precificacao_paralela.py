@@ -0,0 +1,140 @@
+# --- Reprecificação Paralela (Vários Núcleos) ---
+#
+# Para a reprecificação noturna completa (SKU x marketplace x lucro desejado).
+# O catálogo é dividido em fatias contíguas de SKUs e processado num pool de
+# processos. Os arrays grandes (custos unitários dos insumos, lista de materiais
+# em triplas sku/insumo/qtd, custos fixos e a saída) ficam em memória
+# compartilhada: cada tarefa recebe só o intervalo de SKUs, nada é serializado
+# por tarefa, e cada worker escreve direto na sua fatia do resultado, que já
+# sai na ordem original.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from perfis_taxas import PerfilTaxas
+
+TAMANHO_FATIA_PADRAO = 50_000
+
+# Estado de cada worker (preenchido pelo initializer do pool)
+_worker = {}
+
+
+def _compartilhar(array, blocos):
+    """Copia `array` para um bloco de memória compartilhada. Retorna (descritor, visão)."""
+    array = np.ascontiguousarray(array)
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    blocos.append(shm)
+    visao = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+    visao[...] = array
+    return (shm.name, array.shape, array.dtype.str), visao
+
+
+def _anexar(descritor):
+    nome, forma, dtype = descritor
+    shm = shared_memory.SharedMemory(name=nome)
+    return shm, np.ndarray(forma, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def _iniciar_worker(descritores, perfis, lucros_desejados):
+    _worker['blocos'] = []
+    _worker['arrays'] = {}
+    for chave, descritor in descritores.items():
+        shm, array = _anexar(descritor)
+        _worker['blocos'].append(shm)
+        _worker['arrays'][chave] = array
+    _worker['perfis'] = [PerfilTaxas(perfil) for perfil in perfis]
+    _worker['lucros'] = np.asarray(lucros_desejados, dtype=np.float64)
+
+
+def _processar_fatia(inicio, fim):
+    """Custo de materiais e preços dos SKUs [inicio, fim), gravados direto na saída compartilhada."""
+    a = _worker['arrays']
+    # Triplas ordenadas por SKU: a fatia da lista de materiais sai por busca binária
+    de, ate = np.searchsorted(a['bom_sku'], [inicio, fim])
+    custo_material = np.bincount(
+        a['bom_sku'][de:ate] - inicio,
+        weights=a['bom_qtd'][de:ate] * a['custos_insumos'][a['bom_insumo'][de:ate]],
+        minlength=fim - inicio,
+    )
+    a['custo_material_total'][inicio:fim] = custo_material
+
+    custo_base = custo_material + a['custo_fixo'][inicio:fim]
+    for j, perfil in enumerate(_worker['perfis']):
+        for k, lucro in enumerate(_worker['lucros']):
+            preco, valido = perfil.preco_sugerido(custo_base, lucro)
+            a['preco_sugerido'][inicio:fim, j, k] = preco
+            a['valido'][inicio:fim, j, k] = valido
+    return fim - inicio
+
+
+def _fechar_worker():
+    blocos = _worker.get('blocos', [])
+    _worker.clear()  # solta as visões antes de fechar os blocos
+    for shm in blocos:
+        shm.close()
+
+
+def reprecificar_paralelo(custos_insumos, bom_sku, bom_insumo, bom_qtd, n_skus,
+                          custo_fixo_mo_embalagem, perfis, lucros_desejados,
+                          processos=None, tamanho_fatia=TAMANHO_FATIA_PADRAO):
+    """Reprecifica o catálogo inteiro em paralelo.
+
+    `custos_insumos` (i,) é o custo unitário de cada insumo. A lista de materiais
+    vem em triplas paralelas `bom_sku`, `bom_insumo`, `bom_qtd` (uma linha por
+    material usado em um SKU). `perfis` são dicts de perfil de taxas
+    (perfis_taxas.py) e `lucros_desejados` os lucros-alvo em R$.
+
+    Retorna um dict com `custo_material_total` (n,), `preco_sugerido` e
+    `valido` (n, perfis, lucros), na ordem dos SKUs. Com `processos=1` roda no
+    próprio processo (mesmo código, sem pool).
+    """
+    perfis = list(perfis)
+    lucros_desejados = np.atleast_1d(np.asarray(lucros_desejados, dtype=np.float64))
+    processos = processos or os.cpu_count() or 1
+
+    bom_sku = np.asarray(bom_sku, dtype=np.int64)
+    ordem = np.argsort(bom_sku, kind='stable')
+    entradas = {
+        'custos_insumos': np.asarray(custos_insumos, dtype=np.float64),
+        'bom_sku': bom_sku[ordem],
+        'bom_insumo': np.asarray(bom_insumo, dtype=np.int64)[ordem],
+        'bom_qtd': np.asarray(bom_qtd, dtype=np.float64)[ordem],
+        'custo_fixo': np.broadcast_to(np.asarray(custo_fixo_mo_embalagem, dtype=np.float64), (n_skus,)),
+        'custo_material_total': np.zeros(n_skus),
+        'preco_sugerido': np.zeros((n_skus, len(perfis), len(lucros_desejados))),
+        'valido': np.zeros((n_skus, len(perfis), len(lucros_desejados)), dtype=bool),
+    }
+
+    blocos = []
+    descritores, visoes = {}, {}
+    try:
+        for chave, array in entradas.items():
+            descritores[chave], visoes[chave] = _compartilhar(array, blocos)
+
+        fatias = [(inicio, min(inicio + tamanho_fatia, n_skus)) for inicio in range(0, n_skus, tamanho_fatia)]
+        if processos == 1 or len(fatias) <= 1:
+            _iniciar_worker(descritores, perfis, lucros_desejados)
+            try:
+                for inicio, fim in fatias:
+                    _processar_fatia(inicio, fim)
+            finally:
+                _fechar_worker()
+        else:
+            with ProcessPoolExecutor(
+                max_workers=min(processos, len(fatias)),
+                initializer=_iniciar_worker,
+                initargs=(descritores, perfis, lucros_desejados),
+            ) as pool:
+                inicios, fins = zip(*fatias)
+                for _ in pool.map(_processar_fatia, inicios, fins):
+                    pass
+
+        return {chave: visoes[chave].copy() for chave in ('custo_material_total', 'preco_sugerido', 'valido')}
+    finally:
+        visoes.clear()
+        for shm in blocos:
+            shm.close()
+            shm.unlink()
@@ -0,0 +1,225 @@
+# --- Preço Ótimo com Modelo de Demanda ---
+#
+# O cálculo reverso (precificacao.py) responde "qual preço dá R$ X de lucro por
+# unidade". Aqui a pergunta é outra: dada uma curva de demanda por SKU (unidades
+# esperadas em função do preço), qual preço maximiza o lucro total
+#     lucro_total(p) = lucro_real(p) x unidades(p),
+# com o lucro por unidade de `calcular_lucro_real` (versão em lote). A busca
+# roda para o catálogo inteiro de uma vez: cada iteração avalia uma grade
+# (SKUs x pontos) numa única chamada vetorizada, como em `curva_lucro`.
+#
+# Modelos de demanda (um valor por SKU):
+#   DemandaElasticidade  unidades = unidades_ref x (p / preco_ref) ^ elasticidade
+#   DemandaTabela        pontos preço -> unidades, interpolados linearmente; a
+#                        busca fica dentro da faixa de preços da tabela
+#
+# Métodos de busca:
+#   'grade'  grade de `pontos` preços no intervalo, depois refina em volta do
+#            melhor ponto. Robusto para curvas com mais de um pico (tabelas).
+#   'aurea'  seção áurea: uma avaliação por iteração; supõe lucro total
+#            unimodal no intervalo (ex.: elasticidade constante, taxas afins).
+
+import numpy as np
+
+from precificacao_lote import (
+    _colunas_taxas,
+    _como_array,
+    calcular_lucro_real_lote,
+    calcular_preco_sugerido_lote,
+)
+
+RAZAO_AUREA = (np.sqrt(5) - 1) / 2
+TOLERANCIA_PRECO = 0.005     # R$: meio centavo
+PONTOS_GRADE = 33
+FATOR_PRECO_MAXIMO = 3.0     # sem tabela nem `preco_maximo`, busca até 3x o preço de referência
+BLOCO_SKUS = 4_096           # SKUs por busca: limita a grade (SKUs x pontos) em memória
+
+
+class DemandaElasticidade:
+    """Demanda de elasticidade constante por SKU (elasticidade < 0: preço maior, menos unidades)."""
+
+    def __init__(self, preco_referencia, unidades_referencia, elasticidade):
+        self.preco_referencia = np.atleast_1d(np.asarray(preco_referencia, dtype=np.float64))
+        n = len(self.preco_referencia)
+        self.unidades_referencia = _como_array(unidades_referencia, n)
+        self.elasticidade = _como_array(elasticidade, n)
+
+    def __len__(self):
+        return len(self.preco_referencia)
+
+    def unidades(self, precos):
+        """Unidades esperadas para a grade de preços (SKUs x pontos)."""
+        relativo = np.maximum(precos, 0.0) / self.preco_referencia[:, None]
+        with np.errstate(divide='ignore'):
+            return self.unidades_referencia[:, None] * relativo ** self.elasticidade[:, None]
+
+    def limites(self):
+        return np.zeros(len(self)), FATOR_PRECO_MAXIMO * self.preco_referencia
+
+    def fatia(self, linhas):
+        return DemandaElasticidade(self.preco_referencia[linhas], self.unidades_referencia[linhas], self.elasticidade[linhas])
+
+
+class DemandaTabela:
+    """Tabela preço -> unidades por SKU (listas de tamanhos diferentes são completadas com o último ponto)."""
+
+    def __init__(self, precos, unidades):
+        precos = [np.asarray(p, dtype=np.float64) for p in precos]
+        unidades = [np.asarray(u, dtype=np.float64) for u in unidades]
+        k = max(len(p) for p in precos)
+        self.precos = np.empty((len(precos), k))
+        self.tabela_unidades = np.empty((len(precos), k))
+        for i, (p, u) in enumerate(zip(precos, unidades)):
+            if len(p) != len(u) or len(p) == 0:
+                raise ValueError(f"SKU {i}: a tabela precisa de preços e unidades em mesmo número (pelo menos um).")
+            ordem = np.argsort(p, kind='stable')
+            self.precos[i, :len(p)], self.precos[i, len(p):] = p[ordem], p[ordem][-1]
+            self.tabela_unidades[i, :len(p)], self.tabela_unidades[i, len(p):] = u[ordem], u[ordem][-1]
+
+    def __len__(self):
+        return len(self.precos)
+
+    def unidades(self, precos):
+        """Interpolação linear por SKU para a grade de preços (SKUs x pontos)."""
+        x = np.clip(precos, self.precos[:, :1], self.precos[:, -1:])
+        k = self.precos.shape[1]
+        if k == 1:
+            return np.broadcast_to(self.tabela_unidades, x.shape).copy()
+        # Trecho de cada ponto: quantos preços da tabela ficam <= x (uma comparação por SKU x ponto x linha)
+        j = np.clip((self.precos[:, None, :] <= x[:, :, None]).sum(axis=2) - 1, 0, k - 2)
+        linhas = np.arange(len(self))[:, None]
+        x0, x1 = self.precos[linhas, j], self.precos[linhas, j + 1]
+        y0, y1 = self.tabela_unidades[linhas, j], self.tabela_unidades[linhas, j + 1]
+        t = np.divide(x - x0, x1 - x0, out=np.zeros_like(x), where=x1 > x0)
+        return y0 + t * (y1 - y0)
+
+    def limites(self):
+        return self.precos[:, 0].copy(), self.precos[:, -1].copy()
+
+    def fatia(self, linhas):
+        parte = DemandaTabela.__new__(DemandaTabela)
+        parte.precos, parte.tabela_unidades = self.precos[linhas], self.tabela_unidades[linhas]
+        return parte
+
+
+def _avaliador(linhas, demanda, custo_material, custo_fixo, tx_imposto, taxas, fixos):
+    """Função grade de preços -> (lucro por unidade, lucro total) para as `linhas` (fatia de SKUs)."""
+    demanda = demanda.fatia(linhas)
+    argumentos = (custo_material[linhas], custo_fixo[linhas], tx_imposto[linhas], [t[linhas] for t in taxas],
+                  {nome: fixo[linhas] for nome, fixo in fixos.items()})
+    return lambda precos: _lucro_total(precos, demanda, *argumentos)
+
+
+def _lucro_total(precos, demanda, custo_material, custo_fixo, tx_imposto, taxas, fixos):
+    """Lucro por unidade (calcular_lucro_real_lote) e lucro total na grade (SKUs x pontos)."""
+    n, m = precos.shape
+    repetir = lambda valores: np.repeat(valores, m)
+    lucro_unitario = calcular_lucro_real_lote(
+        precos.ravel(), repetir(custo_material), repetir(custo_fixo), repetir(tx_imposto),
+        *map(repetir, taxas), **{nome: repetir(fixo) for nome, fixo in fixos.items()}
+    )['lucro_real'].reshape(n, m)
+    return lucro_unitario, lucro_unitario * demanda.unidades(precos)
+
+
+def otimizar_precos(dados, demanda, taxas_mp=None, preco_minimo=None, preco_maximo=None,
+                    metodo='grade', pontos=PONTOS_GRADE, tolerancia=TOLERANCIA_PRECO):
+    """Preço que maximiza o lucro total de cada SKU, para o catálogo inteiro de uma vez.
+
+    `dados` tem as mesmas colunas de custo e taxas de `precificar_catalogo`
+    (sem `lucro_fixo_desejado`); componentes ausentes vêm de `taxas_mp`.
+    `demanda` é um DemandaElasticidade ou DemandaTabela com uma linha por SKU.
+
+    A busca vai do ponto de equilíbrio (lucro por unidade zero) até o limite
+    do modelo de demanda, restrita a [`preco_minimo`, `preco_maximo`] se
+    informados. Retorna um dict de arrays: `preco_otimo`, `unidades`,
+    `lucro_unitario`, `lucro_total`, `margem_real`, o intervalo buscado
+    (`preco_minimo`, `preco_maximo`) e `valido` (há preço com lucro positivo).
+    """
+    custo_material = np.asarray(dados['custo_material_total'], dtype=np.float64)
+    n = len(custo_material)
+    if len(demanda) != n:
+        raise ValueError(f"A demanda tem {len(demanda)} SKUs e os dados, {n}.")
+
+    def coluna(nome):
+        if nome in dados:
+            return _como_array(np.asarray(dados[nome]), n)
+        if taxas_mp is not None and nome in taxas_mp:
+            return _como_array(taxas_mp[nome], n)
+        raise KeyError(f"Coluna '{nome}' ausente.")
+
+    custo_fixo = coluna('custo_fixo_mo_embalagem')
+    tx_imposto = coluna('taxa_imposto')
+    taxas, fixos = _colunas_taxas(dados, taxas_mp, n)
+
+    # Intervalo: do ponto de equilíbrio (cálculo reverso com lucro zero) ao limite da demanda
+    equilibrio, cobre_taxas = calcular_preco_sugerido_lote(custo_material, custo_fixo, tx_imposto, *taxas, 0.0, **fixos)
+    inferior, superior = demanda.limites()
+    inferior = np.maximum(inferior, np.where(cobre_taxas, equilibrio, superior))
+    if preco_minimo is not None:
+        inferior = np.maximum(inferior, _como_array(preco_minimo, n))
+    if preco_maximo is not None:
+        superior = np.minimum(superior, _como_array(preco_maximo, n))
+    inferior = np.minimum(inferior, superior)
+
+    if metodo not in ('grade', 'aurea'):
+        raise ValueError(f"Método de busca desconhecido: '{metodo}'.")
+
+    preco = np.empty(n)
+    for inicio in range(0, n, BLOCO_SKUS):
+        linhas = slice(inicio, min(inicio + BLOCO_SKUS, n))
+        avaliar = _avaliador(linhas, demanda, custo_material, custo_fixo, tx_imposto, taxas, fixos)
+        if metodo == 'grade':
+            preco[linhas] = _busca_grade(avaliar, inferior[linhas], superior[linhas], pontos, tolerancia)
+        else:
+            preco[linhas] = _busca_aurea(avaliar, inferior[linhas], superior[linhas], tolerancia)
+
+    avaliar = _avaliador(slice(None), demanda, custo_material, custo_fixo, tx_imposto, taxas, fixos)
+    lucro_unitario, lucro_total = (v[:, 0] for v in avaliar(preco[:, None]))
+    return {
+        'preco_otimo': preco,
+        'unidades': demanda.unidades(preco[:, None])[:, 0],
+        'lucro_unitario': lucro_unitario,
+        'lucro_total': lucro_total,
+        'margem_real': np.divide(lucro_unitario * 100, preco, out=np.zeros(n), where=preco > 0),
+        'preco_minimo': inferior,
+        'preco_maximo': superior,
+        'valido': cobre_taxas & (lucro_total > 0),
+    }
+
+
+def _busca_grade(avaliar, inferior, superior, pontos, tolerancia):
+    """Grade uniforme e refinamento em volta do melhor ponto até o passo ficar abaixo da tolerância."""
+    fracoes = np.linspace(0.0, 1.0, pontos)
+    linhas = np.arange(len(inferior))
+    a, b = inferior.copy(), superior.copy()
+    while True:
+        grade = a[:, None] + (b - a)[:, None] * fracoes[None, :]
+        melhor = grade[linhas, avaliar(grade)[1].argmax(axis=1)]
+        passo = (b - a) / (pontos - 1)
+        if passo.max(initial=0.0) <= tolerancia:
+            return melhor
+        a = np.maximum(melhor - passo, inferior)
+        b = np.minimum(melhor + passo, superior)
+
+
+def _busca_aurea(avaliar, inferior, superior, tolerancia):
+    """Seção áurea vetorizada: todas as linhas encolhem juntas, uma avaliação por iteração."""
+    lucro = lambda precos: avaliar(precos[:, None])[1][:, 0]
+    a, b = inferior.copy(), superior.copy()
+    c, d = b - RAZAO_AUREA * (b - a), a + RAZAO_AUREA * (b - a)
+    fc, fd = lucro(c), lucro(d)
+    largura = (b - a).max(initial=0.0)
+    iteracoes = int(np.ceil(np.log(tolerancia / largura) / np.log(RAZAO_AUREA))) if largura > tolerancia else 0
+    for _ in range(iteracoes):
+        esquerda = fc >= fd  # máximo em [a, d]: d vira o novo b
+        b = np.where(esquerda, d, b)
+        a = np.where(esquerda, a, c)
+        novo = np.where(esquerda, b - RAZAO_AUREA * (b - a), a + RAZAO_AUREA * (b - a))
+        fnovo = lucro(novo)
+        c, d, fc, fd = (
+            np.where(esquerda, novo, d), np.where(esquerda, c, novo),
+            np.where(esquerda, fnovo, fd), np.where(esquerda, fc, fnovo),
+        )
+    # Lucro monótono no intervalo: o ótimo é uma das pontas
+    candidatos = np.stack([(a + b) / 2, inferior, superior], axis=1)
+    return candidatos[np.arange(len(a)), avaliar(candidatos)[1].argmax(axis=1)]
@@ -0,0 +1,167 @@
+"""Reprecificação em massa via linha de comando.
+
+Lê um CSV de produtos em blocos de tamanho fixo, calcula o preço sugerido e o
+detalhamento de custos de cada linha (mesma matemática da Aba 1) e grava o
+resultado em CSV separado por ';' (padrão PT-BR), no mesmo formato de métricas
+do resumo exportado pela Aba 4.
+
+Colunas de entrada (por SKU):
+    sku                        identificador (opcional, copiado para a saída)
+    custo_material_total       custo de materiais já somado, ou
+    qtd:<nome do insumo>       quantidade usada de cada insumo do backup
+    custo_fixo_mo_embalagem    opcional, padrão vem do backup
+    taxa_imposto               opcional, padrão vem do backup
+    lucro_fixo_desejado        obrigatório se --lucro não for informado
+    <componente>_tipo/_valor   opcional, para taxa_comissao/taxa_por_item/custo_frete
+
+Com --exato, os cálculos são feitos em centavos inteiros (precificacao_centavos.py):
+o preço sugerido e o lucro real do relatório batem centavo a centavo.
+
+Exemplo:
+    python reprecificar.py produtos.csv precos.csv --backup calculadora_backup.json
+"""
+import argparse
+import sys
+import time
+from contextlib import nullcontext
+
+import numpy as np
+import pandas as pd
+
+from exportacao import escrever_csv_ptbr, ler_backup
+from precificacao import calcular_insumos_unitarios
+from precificacao_centavos import CAMPOS_MONETARIOS, para_reais, precificar_catalogo_centavos
+from precificacao_lote import precificar_catalogo
+
+PREFIXO_QTD = 'qtd:'
+
+# Mesmas métricas (e rótulos) de `convert_data_to_csv` em Calculadora.py.
+COLUNAS_RESUMO = {
+    'Preco Sugerido (Venda)': 'preco_sugerido',
+    'Custo Total da Venda': 'custo_total_venda',
+    'Custo de Producao (Base)': 'custo_producao_base',
+    'Lucro Real (Desejado)': 'lucro_real',
+    'Margem Real (%)': 'margem_real',
+    'Custo: Materiais': 'custo_material_total',
+    'Custo: Imposto': 'valor_taxa_imposto',
+    'Custo: Comissao Marketplace': 'valor_taxa_comissao',
+}
+
+
+def carregar_backup(caminho):
+    """Lê um backup da calculadora (JSON ou binário) e retorna (insumos_unitarios, custos_venda)."""
+    with open(caminho, 'rb') as f:
+        data = ler_backup(f)
+    return calcular_insumos_unitarios(data.get('insumos_base', [])), data.get('custos_venda', {})
+
+
+def preparar_bloco(bloco, insumos_unitarios, lucro_padrao):
+    """Resolve o custo de materiais (a partir das colunas qtd:) e o lucro desejado do bloco."""
+    colunas_qtd = [c for c in bloco.columns if c.startswith(PREFIXO_QTD)]
+    if colunas_qtd:
+        nomes = [c[len(PREFIXO_QTD):] for c in colunas_qtd]
+        faltando = [nome for nome in nomes if nome not in insumos_unitarios]
+        if faltando:
+            raise KeyError(f"Insumos sem custo no backup: {', '.join(faltando)}")
+        custos = np.array([insumos_unitarios[nome] for nome in nomes], dtype=np.float64)
+        quantidades = bloco[colunas_qtd].fillna(0.0).to_numpy(dtype=np.float64)
+        custo_materiais = quantidades @ custos
+        if 'custo_material_total' in bloco:
+            custo_materiais = custo_materiais + bloco['custo_material_total'].fillna(0.0).to_numpy()
+        bloco = bloco.drop(columns=colunas_qtd).assign(custo_material_total=custo_materiais)
+    elif 'custo_material_total' not in bloco:
+        raise KeyError("Informe 'custo_material_total' ou colunas 'qtd:<insumo>'.")
+
+    if 'lucro_fixo_desejado' not in bloco:
+        if lucro_padrao is None:
+            raise KeyError("Coluna 'lucro_fixo_desejado' ausente (ou use --lucro).")
+        bloco = bloco.assign(lucro_fixo_desejado=lucro_padrao)
+    return bloco
+
+
+def formatar_resumo(bloco, resultado):
+    """Monta o DataFrame de saída com os rótulos do resumo da Aba 4."""
+    saida = pd.DataFrame(index=bloco.index)
+    if 'sku' in bloco:
+        saida['SKU'] = bloco['sku']
+    for rotulo, coluna in COLUNAS_RESUMO.items():
+        saida[rotulo] = resultado[coluna]
+    saida['Custo: Taxa por Item + Frete'] = resultado['valor_taxa_por_item'] + resultado['valor_custo_frete']
+    saida['Status'] = np.where(resultado['valido'], 'ok', 'inválido')
+    return saida
+
+
+def reprecificar_csv(entrada, saida, custos_venda=None, insumos_unitarios=None, lucro_padrao=None,
+                     tamanho_bloco=50_000, sep_entrada=',', decimal_entrada='.', decimal_saida=',', exato=False,
+                     progresso=None):
+    """Processa `entrada` bloco a bloco e grava em `saida`. Retorna o total de linhas.
+
+    `saida` é um caminho ou arquivo de texto aberto. `progresso(linhas)` é
+    chamado a cada bloco gravado.
+    """
+    insumos_unitarios = insumos_unitarios or {}
+    total = 0
+    leitor = pd.read_csv(entrada, sep=sep_entrada, decimal=decimal_entrada, chunksize=tamanho_bloco)
+    with _abrir_saida(saida) as f:
+        for bloco in leitor:
+            bloco = preparar_bloco(bloco, insumos_unitarios, lucro_padrao)
+            if exato:
+                resultado = precificar_catalogo_centavos(bloco, custos_venda)
+                resultado = {k: para_reais(v) if k in CAMPOS_MONETARIOS else v for k, v in resultado.items()}
+            else:
+                resultado = precificar_catalogo(bloco, custos_venda)
+            escrever_csv_ptbr(formatar_resumo(bloco, resultado), f, decimal=decimal_saida, header=(total == 0))
+            total += len(bloco)
+            if progresso is not None:
+                progresso(total)
+    return total
+
+
+def _abrir_saida(saida):
+    if hasattr(saida, 'write'):
+        return nullcontext(saida)
+    return open(saida, 'w', encoding='utf-8', newline='')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reprecificação em massa de produtos a partir de um CSV.")
+    parser.add_argument('entrada', help="CSV de produtos (um SKU por linha).")
+    parser.add_argument('saida', help="CSV de saída com o detalhamento de custos (separado por ';').")
+    parser.add_argument('--backup', help="Backup da calculadora, .json ou .calcbk (insumos e taxas padrão).")
+    parser.add_argument('--lucro', type=float, help="Lucro fixo desejado (R$) para linhas sem a coluna.")
+    parser.add_argument('--bloco', type=int, default=50_000, help="Linhas por bloco (padrão: 50000).")
+    parser.add_argument('--sep-entrada', default=',', help="Separador de colunas do CSV de entrada.")
+    parser.add_argument('--decimal-entrada', default='.', help="Separador decimal do CSV de entrada.")
+    parser.add_argument('--decimal-saida', default=',', help="Separador decimal do CSV de saída (padrão: ',').")
+    parser.add_argument('--exato', action='store_true', help="Calcula em centavos inteiros (sem diferenças de arredondamento).")
+    args = parser.parse_args(argv)
+
+    insumos_unitarios, custos_venda = {}, None
+    if args.backup:
+        insumos_unitarios, custos_venda = carregar_backup(args.backup)
+
+    inicio = time.perf_counter()
+    try:
+        total = reprecificar_csv(
+            args.entrada, args.saida,
+            custos_venda=custos_venda,
+            insumos_unitarios=insumos_unitarios,
+            lucro_padrao=args.lucro,
+            tamanho_bloco=args.bloco,
+            sep_entrada=args.sep_entrada,
+            decimal_entrada=args.decimal_entrada,
+            decimal_saida=args.decimal_saida,
+            exato=args.exato,
+        )
+    except KeyError as e:
+        print(f"Erro: {e.args[0]}", file=sys.stderr)
+        return 1
+    duracao = time.perf_counter() - inicio
+
+    taxa = total / duracao if duracao > 0 else float('inf')
+    print(f"{total} linhas processadas em {duracao:.2f}s ({taxa:,.0f} linhas/s).", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
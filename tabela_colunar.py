@@ -0,0 +1,271 @@
+# --- Tabela Colunar para o Session State ---
+#
+# Guarda listas grandes de registros (insumos, materiais) em colunas NumPy em
+# vez de uma lista de dicts: campos numéricos em float64, nomes como códigos
+# int32 de uma tabela de strings internadas e campos categóricos (UN/ML) como
+# int8. Para a interface e o backup, a tabela se comporta como uma lista de
+# dicts: `tabela[i]` devolve um registro editável que escreve direto nas colunas.
+
+from collections.abc import MutableMapping, MutableSequence
+
+import numpy as np
+
+CAPACIDADE_INICIAL = 16
+
+
+class RegistroColunar(MutableMapping):
+    """Visão dict de uma linha da tabela (leituras e escritas vão para as colunas)."""
+
+    __slots__ = ('_tabela', '_linha')
+
+    def __init__(self, tabela, linha):
+        self._tabela = tabela
+        self._linha = linha
+
+    def __getitem__(self, campo):
+        return self._tabela.valor(self._linha, campo)
+
+    def __setitem__(self, campo, valor):
+        self._tabela.definir(self._linha, campo, valor)
+
+    def __delitem__(self, campo):
+        raise TypeError("Campos de uma tabela colunar não podem ser removidos.")
+
+    def __iter__(self):
+        return iter(self._tabela.campos)
+
+    def __len__(self):
+        return len(self._tabela.campos)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class TabelaColunar(MutableSequence):
+    """Sequência de registros com schema fixo, armazenada por colunas."""
+
+    def __init__(self, numericos, textos=(), categorias=None, padroes=None, registros=()):
+        self._numericos = tuple(numericos)
+        self._textos = tuple(textos)
+        self._categorias = {campo: tuple(valores) for campo, valores in (categorias or {}).items()}
+        self._codigos_categoria = {
+            campo: {valor: i for i, valor in enumerate(valores)} for campo, valores in self._categorias.items()
+        }
+        self.campos = self._textos + self._numericos + tuple(self._categorias)
+        self._padroes = dict(padroes or {})
+
+        self._strings = []
+        self._codigos_string = {}
+        self._n = 0
+        self._colunas = {}
+        for campo in self._numericos:
+            self._colunas[campo] = np.zeros(CAPACIDADE_INICIAL, dtype=np.float64)
+        for campo in self._textos:
+            self._colunas[campo] = np.zeros(CAPACIDADE_INICIAL, dtype=np.int32)
+        for campo in self._categorias:
+            self._colunas[campo] = np.zeros(CAPACIDADE_INICIAL, dtype=np.int8)
+
+        for registro in registros:
+            self.append(registro)
+
+    # --- Codificação dos campos ---
+
+    def _internar(self, texto):
+        codigo = self._codigos_string.get(texto)
+        if codigo is None:
+            codigo = len(self._strings)
+            self._strings.append(texto)
+            self._codigos_string[texto] = codigo
+        return codigo
+
+    def _codificar(self, campo, valor):
+        if campo in self._numericos:
+            return float(valor)
+        if campo in self._textos:
+            return self._internar(str(valor))
+        if campo in self._categorias:
+            codigo = self._codigos_categoria[campo].get(valor)
+            if codigo is None:
+                raise ValueError(f"Valor '{valor}' inválido para '{campo}' (use {', '.join(self._categorias[campo])}).")
+            return codigo
+        raise KeyError(campo)
+
+    def _decodificar(self, campo, bruto):
+        if campo in self._numericos:
+            return float(bruto)
+        if campo in self._textos:
+            return self._strings[bruto]
+        return self._categorias[campo][bruto]
+
+    def _padrao(self, campo):
+        if campo in self._padroes:
+            return self._padroes[campo]
+        if campo in self._numericos:
+            return 0.0
+        if campo in self._textos:
+            return ''
+        return self._categorias[campo][0]
+
+    # --- Acesso por célula ---
+
+    def _posicao(self, i):
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError("Índice fora da tabela.")
+        return i
+
+    def valor(self, i, campo):
+        if campo not in self._colunas:
+            raise KeyError(campo)
+        return self._decodificar(campo, self._colunas[campo][self._posicao(i)])
+
+    def definir(self, i, campo, valor):
+        self._colunas[campo][self._posicao(i)] = self._codificar(campo, valor)
+
+    def coluna(self, campo):
+        """Array da coluna (visão, sem cópia). Campos de texto/categoria vêm como códigos."""
+        return self._colunas[campo][:self._n]
+
+    def buscar(self, campo, termo):
+        """Posições cujo campo de texto contém `termo` (sem diferenciar maiúsculas).
+
+        O teste é feito uma vez por string distinta da tabela interna, não por linha.
+        """
+        termo = termo.casefold()
+        codigos = [c for c, texto in enumerate(self._strings) if termo in texto.casefold()]
+        return np.flatnonzero(np.isin(self.coluna(campo), codigos))
+
+    def mapear_texto(self, campo, funcao, padrao=np.nan):
+        """Array float por linha com `funcao(texto)` do campo de texto.
+
+        `funcao` é chamada uma vez por string distinta da tabela interna, não por linha.
+        """
+        valores = np.array([funcao(texto) for texto in self._strings] + [padrao], dtype=np.float64)
+        return valores[self.coluna(campo)]
+
+    # --- Protocolo de sequência ---
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._n))]
+        return RegistroColunar(self, self._posicao(i))
+
+    def __setitem__(self, i, registro):
+        i = self._posicao(i)
+        for campo in self.campos:
+            self._colunas[campo][i] = self._codificar(campo, registro.get(campo, self._padrao(campo)))
+
+    def __delitem__(self, i):
+        i = self._posicao(i)
+        for coluna in self._colunas.values():
+            coluna[i:self._n - 1] = coluna[i + 1:self._n]
+        self._n -= 1
+
+    def insert(self, i, registro):
+        i = max(0, min(i + self._n if i < 0 else i, self._n))
+        if self._n == len(next(iter(self._colunas.values()))):
+            for campo, coluna in self._colunas.items():
+                nova = np.zeros(max(CAPACIDADE_INICIAL, 2 * len(coluna)), dtype=coluna.dtype)
+                nova[:self._n] = coluna[:self._n]
+                self._colunas[campo] = nova
+        for coluna in self._colunas.values():
+            coluna[i + 1:self._n + 1] = coluna[i:self._n]
+        self._n += 1
+        self[i] = registro
+
+    def pop(self, i=-1):
+        """Remove e devolve o registro como dict (a visão ficaria apontando para outra linha)."""
+        registro = dict(self[i])
+        del self[i]
+        return registro
+
+    # --- Conversões ---
+
+    def para_dicts(self):
+        """Lista de dicts (formato do backup JSON)."""
+        colunas = {campo: self.coluna(campo).tolist() for campo in self.campos}
+        for campo in self._textos:
+            colunas[campo] = [self._strings[c] for c in colunas[campo]]
+        for campo, valores in self._categorias.items():
+            colunas[campo] = [valores[c] for c in colunas[campo]]
+        return [dict(zip(self.campos, linha)) for linha in zip(*(colunas[c] for c in self.campos))]
+
+    def exportar_colunas(self):
+        """(colunas, strings) com a tabela de strings compactada (só nomes em uso).
+
+        Campos categóricos são exportados pelo valor (ex.: 'UN'), via `categorias`.
+        """
+        colunas = {campo: self.coluna(campo).copy() for campo in self.campos}
+        strings = {}
+        for campo in self._textos:
+            usados, colunas[campo] = np.unique(colunas[campo], return_inverse=True)
+            colunas[campo] = colunas[campo].astype(np.int32)
+            strings[campo] = [self._strings[c] for c in usados]
+        return colunas, strings
+
+    def importar_colunas(self, colunas, strings, categorias=None):
+        """Substitui o conteúdo pelas colunas dadas (inverso de `exportar_colunas`)."""
+        tamanhos = {len(colunas[campo]) for campo in self.campos}
+        if len(tamanhos) != 1:
+            raise ValueError("Colunas com tamanhos diferentes.")
+        n = tamanhos.pop()
+        self._strings, self._codigos_string = [], {}
+        novas = {}
+        for campo in self._numericos:
+            novas[campo] = np.asarray(colunas[campo], dtype=np.float64)
+        for campo in self._textos:
+            remapa = np.array([self._internar(s) for s in strings[campo]], dtype=np.int32)
+            novas[campo] = remapa[np.asarray(colunas[campo])] if n else np.zeros(0, dtype=np.int32)
+        for campo, valores in self._categorias.items():
+            origem = (categorias or {}).get(campo, valores)
+            remapa = np.array([self._codificar(campo, v) for v in origem], dtype=np.int8)
+            novas[campo] = remapa[np.asarray(colunas[campo])] if n else np.zeros(0, dtype=np.int8)
+        for campo, coluna in novas.items():
+            self._colunas[campo] = np.zeros(max(CAPACIDADE_INICIAL, n), dtype=coluna.dtype)
+            self._colunas[campo][:n] = coluna
+        self._n = n
+
+    def categorias(self):
+        return dict(self._categorias)
+
+    def congelar(self):
+        """Assinatura comparável do conteúdo (usada pelo grafo de cálculo), sem percorrer registro a registro.
+
+        Os códigos de texto só valem junto com a tabela de strings: entram também
+        os nomes em uso, senão tabelas com os mesmos números e nomes diferentes
+        teriam a mesma assinatura.
+        """
+        assinatura = tuple(self.coluna(campo).tobytes() for campo in self.campos)
+        if not self._textos:
+            return assinatura
+        usados = np.unique(np.concatenate([self.coluna(campo) for campo in self._textos]))
+        return assinatura + tuple(self._strings[c] for c in usados.tolist())
+
+    def __repr__(self):
+        return f"TabelaColunar({self.para_dicts()!r})"
+
+
+# --- Schemas usados pela calculadora ---
+
+def tabela_insumos(registros=()):
+    """Insumos base: {'nome', 'valor_pacote', 'qtd_pacote', 'unidade'}."""
+    return TabelaColunar(
+        numericos=('valor_pacote', 'qtd_pacote'),
+        textos=('nome',),
+        categorias={'unidade': ('UN', 'ML')},
+        padroes={'qtd_pacote': 1.0},
+        registros=registros,
+    )
+
+
+def tabela_materiais(registros=()):
+    """Materiais do produto: {'nome', 'custo_unidade', 'qtd_usada'}."""
+    return TabelaColunar(
+        numericos=('custo_unidade', 'qtd_usada'),
+        textos=('nome',),
+        registros=registros,
+    )
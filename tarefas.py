@@ -0,0 +1,191 @@
+# --- Tarefas em Segundo Plano ---
+#
+# Operações longas (restaurar um backup grande, importar listas de preços,
+# reprecificar um catálogo) rodam num pool de threads do processo, fora da
+# thread do script do Streamlit: a sessão continua respondendo a edições
+# enquanto a tarefa roda. Cada tarefa fica num registro com estado, progresso
+# e pedido de cancelamento; a interface só consulta o registro (a cada rerun
+# ou num fragmento com `run_every`), nunca espera pelo resultado.
+#
+# A função da tarefa recebe a própria Tarefa como primeiro argumento e chama
+# `tarefa.progresso(feito, total, mensagem)` entre etapas; se o cancelamento
+# foi pedido, essa chamada lança TarefaCancelada. A tarefa trabalha sobre
+# cópias e só devolve o resultado: quem o aplica ao session state é o script,
+# quando vê a tarefa concluída.
+#
+# Threads (e não processos) porque o trabalho pesado já é NumPy/pandas, que
+# liberam o GIL, e os resultados voltam sem serialização. Para a
+# reprecificação em vários núcleos, a função da tarefa pode usar
+# precificacao_paralela.py (pool de processos) por dentro.
+
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import instrumentacao
+
+logger = logging.getLogger('calculadora.tarefas')
+
+PENDENTE = 'pendente'
+EXECUTANDO = 'executando'
+CONCLUIDA = 'concluida'
+CANCELADA = 'cancelada'
+FALHOU = 'falhou'
+FINAIS = (CONCLUIDA, CANCELADA, FALHOU)
+
+TRABALHADORES_PADRAO = min(4, os.cpu_count() or 1)
+RETER_FINALIZADAS = 100  # tarefas finalizadas mantidas no registro antes de descartar as mais antigas
+
+
+class TarefaCancelada(Exception):
+    """Lançada dentro da tarefa quando o cancelamento foi pedido."""
+
+
+class Tarefa:
+    """Uma operação em segundo plano: estado, progresso, resultado e pedido de cancelamento."""
+
+    def __init__(self, nome, dono=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.nome = nome
+        self.dono = dono
+        self.estado = PENDENTE
+        self.feito = 0
+        self.total = None
+        self.mensagem = ''
+        self.resultado = None
+        self.erro = None
+        self.criada = time.time()
+        self.inicio = None
+        self.fim = None
+        self._cancelamento = threading.Event()
+        self._trava = threading.Lock()
+        self._future = None
+
+    # --- Consulta (chamada pela interface) ---
+
+    @property
+    def finalizada(self):
+        return self.estado in FINAIS
+
+    @property
+    def fracao(self):
+        """Progresso em [0, 1], ou None se o total ainda não é conhecido."""
+        with self._trava:
+            if not self.total:
+                return None
+            return min(self.feito / self.total, 1.0)
+
+    @property
+    def duracao(self):
+        if self.inicio is None:
+            return 0.0
+        return (self.fim or time.time()) - self.inicio
+
+    def cancelar(self):
+        """Pede o cancelamento; uma tarefa ainda na fila nem chega a rodar."""
+        self._cancelamento.set()
+        if self._future is not None and self._future.cancel():
+            self._finalizar(CANCELADA)
+
+    # --- Dentro da tarefa ---
+
+    @property
+    def cancelamento_pedido(self):
+        return self._cancelamento.is_set()
+
+    def verificar_cancelamento(self):
+        if self._cancelamento.is_set():
+            raise TarefaCancelada(self.nome)
+
+    def progresso(self, feito, total=None, mensagem=None):
+        """Atualiza o progresso e interrompe a tarefa se o cancelamento foi pedido."""
+        with self._trava:
+            self.feito = feito
+            if total is not None:
+                self.total = total
+            if mensagem is not None:
+                self.mensagem = mensagem
+        self.verificar_cancelamento()
+
+    def _executar(self, funcao, args, kwargs):
+        self.inicio = time.time()
+        self.estado = EXECUTANDO
+        try:
+            self.verificar_cancelamento()
+            self.resultado = funcao(self, *args, **kwargs)
+        except TarefaCancelada:
+            self._finalizar(CANCELADA)
+        except Exception as e:
+            logger.exception("Tarefa '%s' falhou", self.nome)
+            self.erro = e
+            self._finalizar(FALHOU)
+        else:
+            self._finalizar(CONCLUIDA)
+
+    def _finalizar(self, estado):
+        self.fim = time.time()
+        self.estado = estado
+        instrumentacao.incrementar('tarefas', estado=estado)
+
+    def __repr__(self):
+        return f"Tarefa({self.nome!r}, {self.estado}, {self.feito}/{self.total})"
+
+
+class RegistroTarefas:
+    """Pool de threads + registro das tarefas por id (um por processo)."""
+
+    def __init__(self, trabalhadores=None, reter=RETER_FINALIZADAS):
+        self._pool = ThreadPoolExecutor(max_workers=trabalhadores or TRABALHADORES_PADRAO, thread_name_prefix='tarefa')
+        self._tarefas = OrderedDict()
+        self._trava = threading.Lock()
+        self._reter = reter
+
+    def submeter(self, nome, funcao, *args, dono=None, **kwargs):
+        """Agenda `funcao(tarefa, *args, **kwargs)` e retorna a Tarefa (sem esperar)."""
+        tarefa = Tarefa(nome, dono)
+        with self._trava:
+            self._tarefas[tarefa.id] = tarefa
+            self._descartar_antigas()
+        tarefa._future = self._pool.submit(tarefa._executar, funcao, args, kwargs)
+        instrumentacao.incrementar('tarefas_submetidas')
+        return tarefa
+
+    def obter(self, id_tarefa):
+        with self._trava:
+            return self._tarefas.get(id_tarefa)
+
+    def listar(self, dono=None):
+        with self._trava:
+            return [t for t in self._tarefas.values() if dono is None or t.dono == dono]
+
+    def cancelar(self, id_tarefa):
+        tarefa = self.obter(id_tarefa)
+        if tarefa is not None:
+            tarefa.cancelar()
+        return tarefa
+
+    def esquecer(self, id_tarefa):
+        """Remove uma tarefa finalizada do registro (ex.: depois que o resultado foi aplicado)."""
+        with self._trava:
+            tarefa = self._tarefas.get(id_tarefa)
+            if tarefa is not None and tarefa.finalizada:
+                del self._tarefas[id_tarefa]
+
+    def em_andamento(self):
+        with self._trava:
+            return sum(not t.finalizada for t in self._tarefas.values())
+
+    def encerrar(self, esperar=False):
+        """Cancela tudo e fecha o pool."""
+        for tarefa in self.listar():
+            tarefa.cancelar()
+        self._pool.shutdown(wait=esperar, cancel_futures=True)
+
+    def _descartar_antigas(self):
+        finalizadas = [id_tarefa for id_tarefa, t in self._tarefas.items() if t.finalizada]
+        for id_tarefa in finalizadas[:max(len(finalizadas) - self._reter, 0)]:
+            del self._tarefas[id_tarefa]
@@ -0,0 +1,54 @@
+"""Testes da validação de entrada da API de precificação (serviço e rota ASGI)."""
+import asyncio
+import json
+
+import pytest
+
+from api_precificacao import AplicacaoPrecificacao, ErroRequisicao, ServicoPrecificacao
+
+PERFIL = {
+    'taxa_imposto': 4.0,
+    'taxa_comissao': {'tipo': 'percentual', 'valor': 15.0},
+    'taxa_por_item': {'tipo': 'fixo', 'valor': 3.0},
+    'custo_frete': {'tipo': 'fixo', 'valor': 15.0},
+}
+
+
+def requisicao(aplicacao, metodo, caminho, corpo):
+    """Chama a aplicação ASGI com um corpo só; devolve (status, JSON da resposta)."""
+    enviadas = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': corpo, 'more_body': False}
+
+    async def send(mensagem):
+        enviadas.append(mensagem)
+
+    scope = {'type': 'http', 'method': metodo, 'path': caminho, 'headers': []}
+    asyncio.run(aplicacao(scope, receive, send))
+    return enviadas[0]['status'], json.loads(enviadas[1]['body'])
+
+
+@pytest.mark.parametrize('campo, valor', [
+    ('custo_material_total', 'nan'),
+    ('custo_material_total', float('inf')),
+    ('lucro_fixo_desejado', '-inf'),
+    ('custo_fixo_mo_embalagem', float('nan')),
+])
+def test_valores_nao_finitos_sao_recusados(campo, valor):
+    servico = ServicoPrecificacao({'loja': PERFIL})
+    item = {'custo_material_total': 10.0, 'lucro_fixo_desejado': 5.0, campo: valor}
+    with pytest.raises(ErroRequisicao):
+        servico.precificar(item)
+    assert 'erro' in servico.precificar_lote([item])[0]
+
+
+def test_rota_preco_com_nan_no_json_responde_400():
+    aplicacao = AplicacaoPrecificacao({'loja': PERFIL})
+    status, corpo = requisicao(aplicacao, 'POST', '/preco', b'{"custo_material_total": NaN, "lucro_fixo_desejado": 5}')
+    assert status == 400
+    assert 'erro' in corpo
+
+    status, corpo = requisicao(aplicacao, 'POST', '/preco', b'{"custo_material_total": 12.5, "lucro_fixo_desejado": 5}')
+    assert status == 200
+    assert corpo['valido'] and corpo['preco_sugerido'] > 0
@@ -0,0 +1,56 @@
+"""Testes da leitura de listas de preços (separador, decimal e células numéricas)."""
+import io
+
+import pandas as pd
+import pytest
+
+from importacao_precos import _normalizar_bloco, ler_lista_precos
+
+MAPEAMENTO = {'nome': 'nome', 'valor_pacote': 'valor', 'qtd_pacote': 'qtd', 'unidade': 'unidade'}
+
+
+def ler_csv(texto):
+    arquivo = io.BytesIO(texto.encode('utf-8'))
+    return pd.concat(list(ler_lista_precos(arquivo, nome_arquivo='lista.csv')), ignore_index=True)
+
+
+def test_csv_ponto_e_virgula_com_decimal_ponto():
+    lido = ler_csv("nome;valor;qtd\nPapel;27.50;50\nCola;8.9;1\n")
+    assert lido['valor_pacote'].tolist() == [27.5, 8.9]
+    assert lido['qtd_pacote'].tolist() == [50.0, 1.0]
+
+
+def test_csv_ponto_e_virgula_com_decimal_virgula_e_milhar():
+    lido = ler_csv("nome;valor;qtd\nPapel;R$ 1.234,56;50\nCola;27,50;1,5\nFita;27.50;2\n")
+    assert lido['valor_pacote'].tolist() == [1234.56, 27.5, 27.5]
+    assert lido['qtd_pacote'].tolist() == [50.0, 1.5, 2.0]
+
+
+def test_csv_virgula_com_decimal_ponto():
+    lido = ler_csv("nome,valor,qtd\nPapel,1234.56,50\n")
+    assert lido['valor_pacote'].tolist() == [1234.56]
+
+
+def test_celulas_numericas_do_xlsx_nao_sao_reinterpretadas():
+    # Bloco como o de `_blocos_xlsx`: coluna de tipos mistos (número nativo e texto PT-BR)
+    bloco = pd.DataFrame(
+        [('Papel', 27.5, 50, 'UN'), ('Cola', 'R$ 1.234,56', '2,5', 'ml'), ('Fita', 1234, 3.75, None)],
+        columns=['nome', 'valor', 'qtd', 'unidade'],
+    )
+    normalizado = _normalizar_bloco(bloco, MAPEAMENTO, ',')
+    assert normalizado['valor_pacote'].tolist() == [27.5, 1234.56, 1234.0]
+    assert normalizado['qtd_pacote'].tolist() == [50.0, 2.5, 3.75]
+    assert normalizado['unidade'].tolist() == ['UN', 'ML', 'UN']
+
+
+def test_xlsx_com_numeros_nativos():
+    openpyxl = pytest.importorskip('openpyxl')
+    planilha = openpyxl.Workbook()
+    planilha.active.append(['nome', 'valor', 'qtd', 'unidade'])
+    planilha.active.append(['Papel', 27.5, 50, 'UN'])
+    planilha.active.append(['Cola', 'R$ 1.234,56', 2, 'UN'])
+    arquivo = io.BytesIO()
+    planilha.save(arquivo)
+
+    lido = pd.concat(list(ler_lista_precos(arquivo, nome_arquivo='lista.xlsx')), ignore_index=True)
+    assert lido['valor_pacote'].tolist() == [27.5, 1234.56]
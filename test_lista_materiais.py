@@ -0,0 +1,43 @@
+"""Testes da lista de materiais incremental (edição e renomeação de insumos)."""
+import pytest
+
+from catalogo_insumos import CatalogoInsumos
+from lista_materiais import ListaMateriais
+
+
+def lista():
+    catalogo = CatalogoInsumos([
+        {'nome': 'Papel', 'valor_pacote': 10.0, 'qtd_pacote': 10.0, 'unidade': 'UN'},
+        {'nome': 'Cola', 'valor_pacote': 6.0, 'qtd_pacote': 2.0, 'unidade': 'UN'},
+    ])
+    materiais = ListaMateriais(catalogo)
+    materiais.definir_produto('caderno', [{'insumo': 'Papel', 'qtd_usada': 5}, {'insumo': 'Cola', 'qtd_usada': 1}])
+    materiais.definir_produto('bloco', [{'insumo': 'Cola', 'qtd_usada': 2}])
+    materiais.definir_produto('kit', [{'produto': 'caderno', 'qtd_usada': 2}, {'produto': 'bloco', 'qtd_usada': 1}])
+    materiais.custos_materiais()
+    return materiais
+
+
+def test_atualizar_insumo_invalida_so_os_dependentes():
+    materiais = lista()
+    assert materiais.atualizar_insumo('Papel', valor_pacote=20.0) == {'caderno', 'kit'}
+    assert materiais.custo_material('caderno') == 13.0
+    assert materiais.atualizar_insumo('Papel', valor_pacote=20.0) == set()
+    with pytest.raises(KeyError):
+        materiais.atualizar_insumo('Tinta', valor_pacote=1.0)
+
+
+def test_renomear_insumo_mantem_receitas_e_indice():
+    materiais = lista()
+    item_original = materiais.produtos['caderno'][1]  # dict passado em definir_produto
+
+    assert materiais.atualizar_insumo('Cola', nome='Cola branca') == {'caderno', 'bloco', 'kit'}
+    assert 'Cola' not in materiais.catalogo and 'Cola branca' in materiais.catalogo
+    assert {'insumo': 'Cola branca', 'qtd_usada': 1} in materiais.produtos['caderno']
+    assert materiais.custos_materiais() == {'caderno': 8.0, 'bloco': 6.0, 'kit': 22.0}
+    assert item_original == {'insumo': 'Cola', 'qtd_usada': 1}
+
+    # O índice reverso segue o novo nome
+    assert materiais.atualizar_insumo('Cola branca', valor_pacote=12.0) == {'caderno', 'bloco', 'kit'}
+    assert materiais.custo_material('kit') == 2 * 11.0 + 12.0
+    assert materiais.insumo_alterado('Cola') == set()
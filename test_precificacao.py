@@ -0,0 +1,41 @@
+"""Testes do núcleo escalar: o cálculo reverso tem que render o lucro do cálculo direto."""
+import pytest
+
+import precificacao
+from precificacao import calcular_preco_sugerido_lucro_fixo, verificar_modelo_taxas
+
+
+def taxas(comissao, item, frete):
+    return {'taxa_comissao': comissao, 'taxa_por_item': item, 'custo_frete': frete}
+
+
+PERCENTUAL = {'tipo': 'percentual', 'valor': 15.0}
+FIXO = {'tipo': 'fixo', 'valor': 3.0}
+
+
+@pytest.mark.parametrize('custo_material, custo_fixo, tx_imposto, taxas_mp, lucro', [
+    (12.34, 2.50, 4.0, taxas(PERCENTUAL, FIXO, {'tipo': 'fixo', 'valor': 15.0}), 5.0),
+    (0.0, 0.0, 0.0, taxas(FIXO, FIXO, FIXO), 0.0),
+    (99.99, 1.11, 6.5, taxas(PERCENTUAL, {'tipo': 'percentual', 'valor': 2.5}, {'percentual': 3.0, 'fixo': 4.0}), 7.77),
+    (1_234_567.89, 250.0, 8.0, taxas({'percentual': 20.0, 'fixo': 4.0}, FIXO, FIXO), 100_000.0),
+    (45.0, 5.0, 4.0, taxas(PERCENTUAL, FIXO, FIXO), -10.0),
+    (12.34, 2.50, 9.99, taxas({'tipo': 'percentual', 'valor': 90.0}, FIXO, FIXO), 5.0),   # percentuais perto de 100%
+])
+def test_modelo_de_taxas_consistente(custo_material, custo_fixo, tx_imposto, taxas_mp, lucro):
+    consistente, diferenca = verificar_modelo_taxas(custo_material, custo_fixo, tx_imposto, taxas_mp, lucro)
+    assert consistente
+    assert abs(diferenca) < 1e-6 * max(1.0, calcular_preco_sugerido_lucro_fixo(custo_material, custo_fixo, tx_imposto, taxas_mp, lucro)[0])
+
+
+def test_percentuais_de_100_ou_mais_nao_sao_conferidos():
+    assert verificar_modelo_taxas(10.0, 1.0, 10.0, taxas({'tipo': 'percentual', 'valor': 90.0}, FIXO, FIXO), 5.0) == (True, 0.0)
+
+
+def test_detecta_calculo_reverso_divergente(monkeypatch):
+    original = precificacao.calcular_preco_sugerido_lucro_fixo
+    monkeypatch.setattr(
+        precificacao, 'calcular_preco_sugerido_lucro_fixo', lambda *argumentos: (original(*argumentos)[0] + 1.0, 'ok')
+    )
+    consistente, diferenca = verificar_modelo_taxas(12.34, 2.50, 4.0, taxas(PERCENTUAL, FIXO, FIXO), 5.0)
+    assert not consistente
+    assert diferenca == pytest.approx(1 - 0.19)   # R$ 1 a mais no preço, menos imposto e comissão
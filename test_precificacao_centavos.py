@@ -0,0 +1,153 @@
+"""Testes do modo exato em centavos contra as funções escalares de precificacao.py."""
+import math
+
+import numpy as np
+import pytest
+
+from precificacao import calcular_lucro_real, calcular_preco_sugerido_lucro_fixo
+from precificacao_centavos import (
+    MEIO_PAR,
+    MEIO_PARA_CIMA,
+    PARA_BAIXO,
+    PARA_CIMA,
+    calcular_lucro_real_centavos,
+    dividir_arredondando,
+    para_centavos,
+    para_pontos_base,
+    precificar_catalogo_centavos,
+)
+
+
+def taxas(comissao=15.0, item=3.0, frete=15.0, tipo_item='fixo', tipo_frete='fixo'):
+    return {
+        'taxa_comissao': {'tipo': 'percentual', 'valor': comissao},
+        'taxa_por_item': {'tipo': tipo_item, 'valor': item},
+        'custo_frete': {'tipo': tipo_frete, 'valor': frete},
+    }
+
+
+def argumentos_centavos(taxas_mp):
+    """Argumentos posicionais de `calcular_lucro_real_centavos` para as taxas do formato da Aba 3."""
+    argumentos = []
+    for componente in ('taxa_comissao', 'taxa_por_item', 'custo_frete'):
+        percentual = taxas_mp[componente]['tipo'] == 'percentual'
+        argumentos += [np.array([percentual]), np.array([round(taxas_mp[componente]['valor'] * 100)])]
+    return argumentos
+
+
+def lucro_centavos(preco, custo_material, custo_fixo, tx_imposto, taxas_mp):
+    return int(calcular_lucro_real_centavos(
+        np.array([preco]), para_centavos([custo_material]), para_centavos([custo_fixo]), para_pontos_base([tx_imposto]),
+        *argumentos_centavos(taxas_mp),
+    )['lucro_real'][0])
+
+
+def conferir_contra_escalar(custo_material, custo_fixo, tx_imposto, taxas_mp, lucro):
+    """Preço exato: mínimo que atinge o lucro e perto do preço do cálculo reverso escalar."""
+    resultado = precificar_catalogo_centavos(
+        {'custo_material_total': [custo_material], 'custo_fixo_mo_embalagem': custo_fixo,
+         'taxa_imposto': tx_imposto, 'lucro_fixo_desejado': lucro},
+        taxas_mp,
+    )
+    assert resultado['valido'][0]
+    preco = int(resultado['preco_sugerido'][0])
+
+    alvo = int(para_centavos(lucro))
+    assert lucro_centavos(preco, custo_material, custo_fixo, tx_imposto, taxas_mp) >= alvo
+    assert lucro_centavos(preco - 1, custo_material, custo_fixo, tx_imposto, taxas_mp) < alvo
+
+    # Escalar com as mesmas entradas já em centavos: a diferença vem só do arredondamento
+    # das quatro taxas (até meio centavo cada, 2 centavos no lucro)
+    custo_material, custo_fixo, lucro = (float(para_centavos(v)) / 100 for v in (custo_material, custo_fixo, lucro))
+    preco_escalar, status = calcular_preco_sugerido_lucro_fixo(custo_material, custo_fixo, tx_imposto, taxas_mp, lucro)
+    assert status == 'ok'
+    restante = 1 - (tx_imposto + sum(t['valor'] for t in taxas_mp.values() if t['tipo'] == 'percentual')) / 100
+    assert abs(preco - preco_escalar * 100) <= 2 / restante + 1
+
+    lucro_escalar = calcular_lucro_real(preco / 100, custo_material, custo_fixo, tx_imposto, taxas_mp)[2]
+    assert abs(resultado['lucro_real'][0] - lucro_escalar * 100) <= 2 + 1e-6
+    return preco
+
+
+# --- Arredondamento ---
+
+@pytest.mark.parametrize('numerador, esperado', [
+    # numerador / 10: empates em x,5
+    (5, {MEIO_PARA_CIMA: 1, MEIO_PAR: 0, PARA_CIMA: 1, PARA_BAIXO: 0}),
+    (15, {MEIO_PARA_CIMA: 2, MEIO_PAR: 2, PARA_CIMA: 2, PARA_BAIXO: 1}),
+    (25, {MEIO_PARA_CIMA: 3, MEIO_PAR: 2, PARA_CIMA: 3, PARA_BAIXO: 2}),
+    (24, {MEIO_PARA_CIMA: 2, MEIO_PAR: 2, PARA_CIMA: 3, PARA_BAIXO: 2}),
+    (26, {MEIO_PARA_CIMA: 3, MEIO_PAR: 3, PARA_CIMA: 3, PARA_BAIXO: 2}),
+    (30, {MEIO_PARA_CIMA: 3, MEIO_PAR: 3, PARA_CIMA: 3, PARA_BAIXO: 3}),
+])
+def test_dividir_arredondando_empates(numerador, esperado):
+    for regra, valor in esperado.items():
+        assert dividir_arredondando(np.int64(numerador), 10, regra) == valor
+
+
+def test_dividir_arredondando_regra_desconhecida():
+    with pytest.raises(ValueError):
+        dividir_arredondando(np.int64(5), 10, 'para_o_lado')
+
+
+def test_taxa_meio_centavo_sobe():
+    # 5% de R$ 10,10 = 50,5 centavos: meio para cima cobra 51, o bancário 50
+    argumentos = [np.array([True]), np.array([500]), np.array([False]), np.array([0]), np.array([False]), np.array([0])]
+    comum = calcular_lucro_real_centavos(np.array([1010]), 0, 0, 0, *argumentos)
+    bancario = calcular_lucro_real_centavos(np.array([1010]), 0, 0, 0, *argumentos, regras={'taxa_comissao': MEIO_PAR})
+    assert comum['valor_taxa_comissao'][0] == 51
+    assert bancario['valor_taxa_comissao'][0] == 50
+
+
+def test_conversao_centavos_negativos_e_grandes():
+    assert para_centavos([-12.34, 12.34, 1_234_567.89, -9_876_543.21]).tolist() == [-1234, 1234, 123456789, -987654321]
+    assert para_pontos_base([15.5, 99.99]).tolist() == [1550, 9999]
+
+
+# --- Preço sugerido contra o escalar ---
+
+@pytest.mark.parametrize('custo_material, custo_fixo, tx_imposto, taxas_mp, lucro', [
+    (12.34, 2.50, 4.0, taxas(), 5.0),
+    (0.0, 0.0, 0.0, taxas(comissao=0.0, item=0.0, frete=0.0), 0.0),
+    (10.005, 0.015, 4.0, taxas(comissao=12.5), 0.005),                       # valores em meio centavo
+    (99.99, 1.11, 6.5, taxas(comissao=16.0, item=2.5, tipo_item='percentual'), 7.77),
+    (1_234_567.89, 250.0, 8.0, taxas(comissao=11.0, frete=3.5, tipo_frete='percentual'), 100_000.0),
+    (45.0, 5.0, 4.0, taxas(), -10.0),                                        # lucro negativo (queima de estoque)
+])
+def test_preco_sugerido_centavos_contra_escalar(custo_material, custo_fixo, tx_imposto, taxas_mp, lucro):
+    conferir_contra_escalar(custo_material, custo_fixo, tx_imposto, taxas_mp, lucro)
+
+
+@pytest.mark.parametrize('tx_imposto, comissao', [(9.5, 90.0), (4.9, 95.0), (0.9, 99.0)])
+def test_preco_sugerido_percentuais_perto_de_100(tx_imposto, comissao):
+    conferir_contra_escalar(12.34, 2.50, tx_imposto, taxas(comissao=comissao), 5.0)
+
+
+@pytest.mark.parametrize('tx_imposto, comissao', [(10.0, 90.0), (10.01, 90.0), (50.0, 60.0)])
+def test_percentuais_de_100_ou_mais_sao_invalidos(tx_imposto, comissao):
+    resultado = precificar_catalogo_centavos(
+        {'custo_material_total': [12.34], 'custo_fixo_mo_embalagem': 2.5, 'taxa_imposto': tx_imposto, 'lucro_fixo_desejado': 5.0},
+        taxas(comissao=comissao),
+    )
+    assert calcular_preco_sugerido_lucro_fixo(12.34, 2.5, tx_imposto, taxas(comissao=comissao), 5.0) == (0.0, 'inválido')
+    assert not resultado['valido'][0]
+    assert resultado['preco_sugerido'][0] == 0
+
+
+def test_catalogo_centavos_em_lote_igual_linha_a_linha():
+    rng = np.random.default_rng(7)
+    n = 500
+    dados = {
+        'custo_material_total': rng.uniform(0, 2_000_000, n).round(2),
+        'custo_fixo_mo_embalagem': rng.uniform(0, 20, n).round(2),
+        'taxa_imposto': rng.uniform(0, 20, n).round(2),
+        'lucro_fixo_desejado': rng.uniform(-5, 50, n).round(3),
+    }
+    lote = precificar_catalogo_centavos(dados, taxas())
+    for i in range(0, n, 50):
+        preco = conferir_contra_escalar(
+            float(dados['custo_material_total'][i]), float(dados['custo_fixo_mo_embalagem'][i]),
+            float(dados['taxa_imposto'][i]), taxas(), float(dados['lucro_fixo_desejado'][i]),
+        )
+        assert lote['preco_sugerido'][i] == preco
+    assert math.isclose(lote['margem_real'][0], lote['lucro_real'][0] * 100 / lote['preco_sugerido'][0])
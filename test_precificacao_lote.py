@@ -0,0 +1,58 @@
+"""Testes da formatação BRL em lote contra a função escalar `formatar_brl`."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from precificacao import formatar_brl
+from precificacao_lote import LIMITE_VETORIZADO, MINIMO_VETORIZADO, formatar_brl_lote, formatar_colunas_brl
+
+
+def conferir(valores, prefixo='R$ '):
+    """O lote (caminho vetorizado e valor a valor) tem que dar o mesmo texto que `formatar_brl`."""
+    valores = np.asarray(valores, dtype=np.float64)
+    esperado = [formatar_brl(v).replace('R$ ', prefixo, 1) for v in valores.tolist()]
+    repeticoes = -(-MINIMO_VETORIZADO // max(len(valores), 1))
+    assert formatar_brl_lote(valores, prefixo).tolist() == esperado
+    assert formatar_brl_lote(np.tile(valores, repeticoes), prefixo).tolist() == esperado * repeticoes
+
+
+@pytest.mark.parametrize('valores', [
+    [0.005, 0.015, 0.025, 0.045, 1.005, 2.675, 123.455, 1_000.005],     # meio centavo em decimal (binário fica perto)
+    [0.125, 0.375, 2.5 / 100, 1.125, 1_048_576.125],                    # empates exatos em binário: vai para o par
+    [-0.005, -0.004, -0.0, -2.675, -0.125, -1_234.565],                  # negativos (inclui -0,00 como o format)
+    [999_999.995, 1e6, 1_234_567.89, -9_876_543_210.5, 1e12, 45e12],     # separadores de milhar
+    [0.0, 0.01, 0.1, 9.99, 10.0, 99.995, 100.0, 5e-324],
+])
+def test_formatar_brl_lote_igual_ao_escalar(valores):
+    conferir(valores)
+
+
+def test_formatar_brl_lote_aleatorio():
+    rng = np.random.default_rng(3)
+    n = 50_000
+    valores = np.concatenate([
+        rng.uniform(-1, 1, n) * 10.0 ** rng.integers(-3, 13, n),
+        (rng.integers(-10**9, 10**9, n) * 10 + 5) / 1000,   # terceira casa 5: empates de meio centavo
+        rng.integers(-2**20, 2**20, n) / 8,                 # múltiplos de 1/8: empates exatos
+    ])
+    conferir(valores)
+
+
+def test_formatar_brl_lote_valores_enormes_e_nao_finitos():
+    # Acima de LIMITE_VETORIZADO os centavos não cabem exatos em float64: vão para formatar_brl
+    conferir([1e15 + 0.5, -1e15 - 0.5, LIMITE_VETORIZADO, np.nextafter(LIMITE_VETORIZADO, 0), 1e300, np.nan, np.inf, -np.inf])
+
+
+def test_formatar_brl_lote_prefixo_forma_e_series():
+    conferir([1_234.5, -0.5], prefixo='')
+    matriz = np.arange(600, dtype=np.float64).reshape(20, 30) * 1_000.123
+    assert formatar_brl_lote(matriz).shape == (20, 30)
+
+    serie = pd.Series([1_500.0, -2.5], index=['a', 'b'], name='Preço')
+    formatada = formatar_brl_lote(serie)
+    assert formatada.tolist() == ['R$ 1.500,00', 'R$ -2,50']
+    assert list(formatada.index) == ['a', 'b'] and formatada.name == 'Preço'
+
+    df = formatar_colunas_brl(pd.DataFrame({'preco': [10.005, 1e6], 'qtd': [1, 2]}), ['preco'])
+    assert df['preco'].tolist() == [formatar_brl(10.005), 'R$ 1.000.000,00']
+    assert df['qtd'].tolist() == [1, 2]
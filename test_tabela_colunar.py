@@ -0,0 +1,38 @@
+"""Testes da assinatura (`congelar`) das tabelas colunares usadas no session state."""
+from grafo_calculo import GrafoCalculo, congelar
+from tabela_colunar import tabela_insumos, tabela_materiais
+
+
+def insumos(*nomes):
+    return tabela_insumos([{'nome': nome, 'valor_pacote': 10.0, 'qtd_pacote': 2.0, 'unidade': 'UN'} for nome in nomes])
+
+
+def test_congelar_diferencia_tabelas_que_so_mudam_nos_nomes():
+    # Mesmos códigos internos (0, 1) e mesmos números: só os nomes diferem
+    assert congelar(insumos('Papel', 'Cola')) != congelar(insumos('Tecido', 'Linha'))
+    assert congelar(tabela_materiais([{'nome': 'A', 'custo_unidade': 1.0, 'qtd_usada': 1.0}])) != \
+        congelar(tabela_materiais([{'nome': 'B', 'custo_unidade': 1.0, 'qtd_usada': 1.0}]))
+    assert congelar(insumos('Papel', 'Cola')) == congelar(insumos('Papel', 'Cola'))
+
+
+def test_congelar_ignora_strings_fora_de_uso():
+    tabela = insumos('Papel')
+    antes = congelar(tabela)
+    tabela[0]['nome'] = 'Papel kraft'
+    assert congelar(tabela) != antes
+    tabela[0]['nome'] = 'Papel'
+    assert congelar(tabela) == antes
+
+
+def test_renomear_muda_a_versao_no_grafo():
+    tabela = insumos('Papel', 'Cola')
+    grafo = GrafoCalculo()
+    grafo.entrada('insumos', tabela)
+    versao = grafo.versao('insumos')
+
+    grafo.entrada('insumos', tabela)
+    assert grafo.versao('insumos') == versao
+
+    tabela[1]['nome'] = 'Cola quente'
+    grafo.entrada('insumos', tabela)
+    assert grafo.versao('insumos') == versao + 1